@@ -51,7 +51,7 @@ def create_llm_client() -> AzureOpenAIChatCompletionClient:
 
 def setup_tools() -> Dict[str, List[Any]]:
     """Configura las herramientas para cada agente"""
-    from tools import github_tools as gh
+    from tools import github_async_tools as gh   # async: llamadas concurrentes
     from tools import policy_tools as pol
     from tools import posture_tools as pos
     from tools import bicep_tools as bicep
@@ -61,20 +61,40 @@ def setup_tools() -> Dict[str, List[Any]]:
             gh.create_branch, 
             gh.list_repositories, 
             gh.get_repository,
+            gh.get_repositories_batch,
             gh.get_file_content, 
             gh.create_pull_request, 
-            gh.list_pull_requests
+            gh.list_pull_requests,
+            gh.search_pull_requests,
+            gh.audit_org_zero_trust,
+            gh.publish_landing_zone
         ],
         "policy": [
             pol.get_policy_definition, 
             pol.list_policy_definitions,
+            pol.search_policy_definitions,
             pol.assign_policy, 
-            pol.list_policy_assignments
+            pol.bulk_assign_policies,
+            pol.precheck_landing_zone,
+            pol.list_policy_assignments,
+            pol.list_scope_policy_assignments,
+            pol.summarize_policy_compliance,
+            pol.query_policy_states,
+            pol.sync_policy_catalog,
+            pol.sync_policy_changes,
+            pol.get_policy_changes
         ],
         "posture": [
             pos.get_secure_score, 
             pos.list_posture_recommendations,
-            pos.get_detailed_recommendation
+            pos.get_detailed_recommendation,
+            pos.get_recommendation_details,
+            pos.query_resource_graph,
+            pos.record_posture_snapshot,
+            pos.refresh_posture,
+            pos.get_score_trend,
+            pos.get_control_trend,
+            pos.get_new_findings
         ],
         "bicep": [
             bicep.generate_landing_zone,
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+Benchmark de latencia por llamada de tools.github_tools contra un stub local.
+
+Compara:
+  • antes   – `requests.get` por llamada (conexión nueva cada vez)
+  • después – sesión compartida de `github_tools` (pool keep‑alive)
+
+Uso:
+    python test/bench_github_session.py [--calls 200] [--delay-ms 0]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+# Añadir el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Responde /repos/{owner}/{repo} con un JSON fijo, manteniendo keep‑alive."""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    delay = 0.0
+
+    def do_GET(self):
+        if self.delay:
+            time.sleep(self.delay)
+        body = json.dumps({"name": self.path.rsplit("/", 1)[-1],
+                           "full_name": self.path[len("/repos/"):],
+                           "default_branch": "main"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _stats(samples: list[float]) -> str:
+    ms = sorted(s * 1000 for s in samples)
+    p95 = ms[int(len(ms) * 0.95) - 1]
+    return f"media {statistics.mean(ms):7.3f} ms · p50 {statistics.median(ms):7.3f} ms · p95 {p95:7.3f} ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--delay-ms", type=float, default=0.0,
+                        help="latencia artificial del servidor por petición")
+    args = parser.parse_args()
+
+    _StubHandler.delay = args.delay_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api = f"http://127.0.0.1:{server.server_port}"
+
+    os.environ.update({"GITHUB_API_URL": api, "GITHUB_OWNER": "bench", "GITHUB_PAT": "x"})
+    from tools import github_tools as gh
+
+    hdr = gh._headers("x")
+    before, after = [], []
+    for i in range(args.calls):
+        t0 = time.perf_counter()
+        requests.get(f"{api}/repos/bench/repo{i}", headers=hdr, timeout=15).json()
+        before.append(time.perf_counter() - t0)
+
+    for i in range(args.calls):
+        t0 = time.perf_counter()
+        gh.get_repository(f"repo{i}")
+        after.append(time.perf_counter() - t0)
+
+    server.shutdown()
+    print(f"llamadas: {args.calls}")
+    print(f"antes   (requests.get) : {_stats(before)}")
+    print(f"después (sesión pool)  : {_stats(after)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Cliente ARM contra un servidor ARM falso local (reintentos, límites y paginación)."""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import arm_client  # noqa: E402
+
+STATE = {"calls": defaultdict(int), "inflight": defaultdict(int),
+         "peak": defaultdict(int), "auth": set(), "base": ""}
+LOCK = threading.Lock()
+
+
+class _FakeArm(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=None, **headers):
+        data = json.dumps(body or {}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in headers.items():
+            self.send_header(k.replace("_", "-"), str(v))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url   = urlparse(self.path)
+        parts = url.path.strip("/").split("/")          # subscriptions/<sub>/<op>
+        sub, op = parts[1], parts[2]
+        with LOCK:
+            STATE["auth"].add(self.headers.get("Authorization"))
+            STATE["calls"][op] += 1
+            n = STATE["calls"][op]
+
+        if op == "slow":
+            with LOCK:
+                STATE["inflight"][sub] += 1
+                STATE["peak"][sub] = max(STATE["peak"][sub], STATE["inflight"][sub])
+            time.sleep(0.05)
+            with LOCK:
+                STATE["inflight"][sub] -= 1
+            return self._reply(200, {"sub": sub})
+        if op == "throttle" and n == 1:
+            return self._reply(429, {"error": {"code": "TooManyRequests"}}, Retry_After="0.3")
+        if op == "flaky" and n <= 2:
+            return self._reply(503, {"error": {"code": "ServiceUnavailable"}})
+        if op == "low":
+            return self._reply(200, {}, x_ms_ratelimit_remaining_subscription_reads=5)
+        if op == "items":
+            page = int(parse_qs(url.query).get("page", ["1"])[0])
+            body = {"value": [{"id": f"{page}-{i}"} for i in range(3)]}
+            if page < 3:
+                body["nextLink"] = (f"{STATE['base']}/subscriptions/{sub}/items"
+                                    f"?api-version=2022-01-01&page={page + 1}")
+            return self._reply(200, body)
+        return self._reply(200, {"ok": True})
+
+
+@pytest.fixture(scope="module")
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _FakeArm)
+    STATE["base"] = f"http://127.0.0.1:{srv.server_address[1]}"
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield STATE["base"]
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture(autouse=True)
+def arm(server, monkeypatch):
+    for key in ("calls", "inflight", "peak"):
+        STATE[key].clear()
+    STATE["auth"].clear()
+    monkeypatch.setenv("ARM_ENDPOINT", server)
+    monkeypatch.setenv("ARM_LOW_WATERMARK", "10")
+    monkeypatch.setattr(arm_client, "_LOOPS", weakref.WeakKeyDictionary())
+    monkeypatch.setattr(arm_client, "_PAUSE_UNTIL", {})
+    monkeypatch.setattr(arm_client, "_STATS", {"requests": 0, "retries": 0, "throttled": 0,
+                                               "transport_errors": 0, "slept_s": 0.0})
+    arm_client.set_token_provider(lambda: "fake-token")
+    yield
+    arm_client.set_token_provider(None)
+
+
+def test_token_inyectado_y_arm_token(monkeypatch):
+    asyncio.run(arm_client.get_json("/subscriptions/s1/ok"))
+    arm_client.set_token_provider(None)
+    monkeypatch.setenv("ARM_TOKEN", "env-token")
+    monkeypatch.setattr(arm_client, "get_token", lambda: pytest.fail("no debe pedir token a AAD"))
+    asyncio.run(arm_client.get_json("/subscriptions/s1/ok"))
+    assert STATE["auth"] == {"Bearer fake-token", "Bearer env-token"}
+
+
+def test_429_respeta_retry_after():
+    started = time.monotonic()
+    assert asyncio.run(arm_client.get_json("/subscriptions/s1/throttle")) == {"ok": True}
+    assert STATE["calls"]["throttle"] == 2
+    assert time.monotonic() - started >= 0.3
+    stats = arm_client.get_client_stats()
+    assert (stats["throttled"], stats["retries"]) == (1, 1)
+    assert stats["slept_s"] == pytest.approx(0.3, abs=0.05)
+
+
+def test_5xx_reintenta_con_backoff(monkeypatch):
+    attempts = []
+    monkeypatch.setattr(arm_client, "_backoff", lambda n: attempts.append(n) or 0.01)
+    assert asyncio.run(arm_client.get_json("/subscriptions/s1/flaky")) == {"ok": True}
+    assert attempts == [0, 1]
+    assert arm_client.get_client_stats()["throttled"] == 0
+
+
+def test_5xx_agota_reintentos_y_devuelve_la_respuesta(monkeypatch):
+    monkeypatch.setenv("ARM_MAX_RETRIES", "1")
+    monkeypatch.setattr(arm_client, "_backoff", lambda n: 0.01)
+    rsp = asyncio.run(arm_client.request("GET", "/subscriptions/s1/flaky"))
+    assert rsp.status_code == 503
+    assert STATE["calls"]["flaky"] == 2
+
+
+def test_backoff_acotado():
+    assert all(0.1 <= arm_client._backoff(n) <= 30.0 for n in range(12) for _ in range(20))
+
+
+def test_concurrencia_limitada_por_suscripcion(monkeypatch):
+    monkeypatch.setenv("ARM_MAX_CONCURRENCY_PER_SUB", "2")
+
+    async def main():
+        await asyncio.gather(*[arm_client.get_json(f"/subscriptions/{sub}/slow")
+                               for sub in ["a"] * 6 + ["b"] * 6])
+
+    asyncio.run(main())
+    assert STATE["calls"]["slow"] == 12
+    assert STATE["peak"]["a"] == 2 and STATE["peak"]["b"] == 2
+
+
+def test_cupo_bajo_frena_la_suscripcion():
+    async def main():
+        await arm_client.get_json("/subscriptions/s1/low")
+        paused = arm_client._PAUSE_UNTIL["s1"] - time.time()
+        await arm_client.get_json("/subscriptions/s2/ok")     # otra suscripción: sin freno
+        slept_other = arm_client.get_client_stats()["slept_s"]
+        await arm_client.get_json("/subscriptions/s1/ok")
+        return paused, slept_other
+
+    paused, slept_other = asyncio.run(main())
+    assert paused == pytest.approx(0.5, abs=0.05)            # (10 - 5) · 0.1 s
+    assert slept_other == 0
+    assert arm_client.get_client_stats()["slept_s"] >= 0.4
+
+
+def test_paginate_sigue_next_link():
+    async def main():
+        return [item["id"] async for item in arm_client.paginate(
+            "/subscriptions/s1/items", params={"api-version": "2022-01-01"})]
+
+    ids = asyncio.run(main())
+    assert ids == [f"{p}-{i}" for p in (1, 2, 3) for i in range(3)]
+    assert STATE["calls"]["items"] == 3
+
+
+def test_paginate_corte_no_sigue_pidiendo():
+    async def main():
+        out = []
+        async for item in arm_client.paginate("/subscriptions/s1/items"):
+            out.append(item["id"])
+            if len(out) == 2:
+                break
+        await asyncio.sleep(0.1)
+        return out
+
+    assert asyncio.run(main()) == ["1-0", "1-1"]
+    assert STATE["calls"]["items"] <= 2                     # como mucho la precargada
@@ -0,0 +1,81 @@
+"""Proveedor de tokens de `azure_auth` con una credencial simulada."""
+
+import os
+import sys
+import time
+import types
+
+import pytest
+from azure.core.credentials import AccessTokenInfo
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import azure_auth  # noqa: E402
+
+
+@pytest.fixture
+def issued(monkeypatch):
+    """Lista de tokens que irá devolviendo la credencial (el último se repite)."""
+    tokens = []
+    calls = []
+
+    def get_token_info(scope):
+        calls.append(scope)
+        return tokens[min(len(calls), len(tokens)) - 1]
+
+    cred = types.SimpleNamespace(get_token_info=get_token_info)
+    monkeypatch.setattr(azure_auth, "_credential", lambda: cred)
+    azure_auth._TOKENS.clear()
+    for key in azure_auth._STATS:
+        azure_auth._STATS[key] = 0
+    yield tokens
+    for timer in azure_auth._TIMERS.values():
+        timer.cancel()
+    azure_auth._TIMERS.clear()
+    azure_auth._TOKENS.clear()
+
+
+def _token(name, expires_in, refresh_on=None):
+    return AccessTokenInfo(name, int(time.time() + expires_in), refresh_on=refresh_on)
+
+
+def test_refresco_dentro_de_la_ventana_de_la_credencial(issued):
+    issued.append(_token("a", 3600))
+    assert azure_auth.get_token() == "a"
+    assert azure_auth.get_token() == "a"
+    timer = azure_auth._TIMERS[azure_auth.ARM_SCOPE]
+    # azure-identity sólo pide un token nuevo en los últimos 300 s
+    assert 3600 - 300 <= timer.interval <= 3600 - azure_auth._MARGIN_S
+    assert azure_auth.get_token_stats()["acquisitions"] == 1
+    assert azure_auth.get_token_stats()["cache_hits"] == 1
+
+
+def test_refresh_on_adelanta_el_refresco(issued):
+    issued.append(_token("a", 7200, refresh_on=int(time.time() + 3600)))
+    azure_auth.get_token()
+    assert azure_auth._TIMERS[azure_auth.ARM_SCOPE].interval <= 3600 + 5
+
+
+def test_mismo_token_no_cuenta_como_refresco(issued):
+    issued.append(_token("a", 3600))
+    azure_auth.get_token()
+    azure_auth._background_refresh(azure_auth.ARM_SCOPE)
+    stats = azure_auth.get_token_stats()
+    assert stats["acquisitions"] == 1
+    assert stats["background_refreshes"] == 0
+    assert azure_auth._TIMERS[azure_auth.ARM_SCOPE].interval == pytest.approx(
+        azure_auth._RETRY_S, abs=1)
+
+    issued.append(_token("b", 3600 + 60))
+    azure_auth._background_refresh(azure_auth.ARM_SCOPE)
+    stats = azure_auth.get_token_stats()
+    assert stats["acquisitions"] == 2
+    assert stats["background_refreshes"] == 1
+    assert azure_auth.get_token() == "b"
+
+
+def test_token_casi_caducado_se_renueva_en_primer_plano(issued):
+    issued.extend([_token("a", azure_auth._MARGIN_S - 10), _token("b", 3600)])
+    assert azure_auth.get_token() == "a"
+    assert azure_auth.get_token() == "b"
+    assert azure_auth.get_token_stats()["acquisitions"] == 2
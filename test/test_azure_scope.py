@@ -0,0 +1,93 @@
+"""Resolución de scopes (`azure_scope`) con respuestas de ARM con la forma real."""
+
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import arm_client, azure_scope, resource_graph  # noqa: E402
+
+MG = "/providers/Microsoft.Management/managementGroups"
+
+# GET .../managementGroups/lz/descendants?api-version=2020-05-01
+DESCENDANTS = {"value": [
+    {"id": f"{MG}/lz-corp", "type": "Microsoft.Management/managementGroups", "name": "lz-corp",
+     "properties": {"displayName": "Corp", "parent": {"id": f"{MG}/lz"}}},
+    {"id": f"{MG}/lz/descendants/11111111-1111-1111-1111-111111111111",
+     "type": "/subscriptions", "name": "11111111-1111-1111-1111-111111111111",
+     "properties": {"displayName": "Corp prod", "parent": {"id": f"{MG}/lz-corp"}}},
+    {"id": f"{MG}/lz/descendants/22222222-2222-2222-2222-222222222222",
+     "type": "/subscriptions", "name": "22222222-2222-2222-2222-222222222222",
+     "properties": {"displayName": "Sandbox", "parent": {"id": f"{MG}/lz"}}}]}
+
+EMPTY_MG = {"value": [
+    {"id": f"{MG}/empty-child", "type": "Microsoft.Management/managementGroups",
+     "name": "empty-child", "properties": {"displayName": "Vacío", "parent": {"id": f"{MG}/empty"}}}]}
+
+
+def _run(coro_fn):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.url.path == f"{MG}/lz/descendants":
+            return httpx.Response(200, json=DESCENDANTS)
+        if request.url.path == f"{MG}/empty/descendants":
+            return httpx.Response(200, json=EMPTY_MG)
+        if request.url.path == "/subscriptions":
+            return httpx.Response(200, json={"value": [
+                {"subscriptionId": "s1", "state": "Enabled"},
+                {"subscriptionId": "s2", "state": "Disabled"}]})
+        return httpx.Response(200, json={"data": [{"id": "x"}]})
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        arm_client._LOOPS[loop] = {"client": client, "sems": {}}
+        try:
+            return await coro_fn()
+        finally:
+            await client.aclose()
+    return asyncio.run(main()), requests
+
+
+@pytest.fixture(autouse=True)
+def arm():
+    azure_scope._RESOLVED.clear()
+    arm_client.set_token_provider(lambda: "fake")
+    yield
+    arm_client.set_token_provider(None)
+    azure_scope._RESOLVED.clear()
+
+
+def test_grupo_devuelve_solo_suscripciones_descendientes():
+    subs, requests = _run(lambda: azure_scope.resolve_subscriptions("mg:lz"))
+    assert subs == ["11111111-1111-1111-1111-111111111111", "22222222-2222-2222-2222-222222222222"]
+    assert requests[0].url.params["api-version"] == "2020-05-01"
+
+    again, requests = _run(lambda: azure_scope.resolve_subscriptions("mg:lz"))
+    assert again == subs and requests == []                  # caché del scope
+
+
+def test_all_omite_suscripciones_deshabilitadas():
+    subs, _ = _run(lambda: azure_scope.resolve_subscriptions("all"))
+    assert subs == ["s1"]
+
+
+@pytest.mark.parametrize("scope", ["mg:empty", [], ","])
+def test_scope_sin_suscripciones_falla(scope):
+    with pytest.raises(ValueError, match="ninguna suscripción"):
+        _run(lambda: azure_scope.resolve_subscriptions(scope))
+    assert "mg:empty" not in azure_scope._RESOLVED
+
+
+def test_lista_vacia_no_consulta_todo_el_tenant():
+    async def rows():
+        return [r async for r in resource_graph.query("resources", subscriptions=[])]
+
+    result, requests = _run(rows)
+    assert result == [] and requests == []
@@ -0,0 +1,32 @@
+"""Filtros de fecha compartidos (`date_filters.parse_date_filter`)."""
+
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.date_filters import parse_date_filter  # noqa: E402
+
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def test_dias_naturales():
+    today = parse_date_filter("today")
+    assert today == datetime(*_now().timetuple()[:3]) and today.tzinfo is None
+    assert parse_date_filter(" Yesterday ") == today - timedelta(days=1)
+
+
+@pytest.mark.parametrize("text, days", [("last week", 7), ("last 1 day", 1),
+                                        ("last 30 days", 30), ("last 2 months", 60)])
+def test_periodos_relativos(text, days):
+    assert abs(_now() - timedelta(days=days) - parse_date_filter(text)) < timedelta(seconds=5)
+
+
+@pytest.mark.parametrize("text", [None, "", "pronto", "last days"])
+def test_no_reconocido(text):
+    assert parse_date_filter(text) is None
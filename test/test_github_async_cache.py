@@ -0,0 +1,69 @@
+"""Caché ETag de `github_async_tools._get`: 304 servido desde la caché."""
+
+import asyncio
+import gzip
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import github_tools, github_async_tools  # noqa: E402
+
+URL = "https://api.github.test/repos/o/r"
+BODY = b'{"name": "r"}'
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("GITHUB_CACHE", "1")
+    monkeypatch.setenv("GITHUB_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(github_tools, "_CACHE_DB", None)
+    yield tmp_path
+    if github_tools._CACHE_DB is not None:
+        github_tools._CACHE_DB.close()
+
+
+def _run(handler, calls: int) -> list[httpx.Response]:
+    async def main():
+        loop = asyncio.get_running_loop()
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        github_async_tools._CLIENTS[loop] = client
+        try:
+            return [await github_async_tools._get(URL, {"Authorization": "token t"})
+                    for _ in range(calls)]
+        finally:
+            await client.aclose()
+    return asyncio.run(main())
+
+
+def test_304_se_sirve_desde_cache_aunque_traiga_content_encoding(cache_dir):
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304, headers={"ETag": '"v1"', "Content-Encoding": "gzip",
+                                                "Content-Length": "0"})
+        return httpx.Response(200, headers={"ETag": '"v1"', "Content-Encoding": "gzip",
+                                            "Link": '<https://api.github.test/p2>; rel="next"'},
+                              content=gzip.compress(BODY))
+
+    first, second = _run(handler, 2)
+    assert seen == [None, '"v1"']
+    assert first.json() == second.json() == {"name": "r"}
+    assert second.status_code == 200
+    assert second.links["next"]["url"] == "https://api.github.test/p2"
+
+
+def test_sin_validadores_no_se_guarda(cache_dir):
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("If-None-Match"))
+        return httpx.Response(200, content=BODY)
+
+    _run(handler, 2)
+    assert seen == [None, None]
@@ -0,0 +1,104 @@
+"""Caché de respuestas de GitHub: GET condicional con ETag y respuestas 304."""
+
+import json
+import os
+import sys
+
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import github_tools  # noqa: E402
+
+API = "https://api.github.test"
+HDR = {"Authorization": "Bearer t0k3n", "Accept": "application/vnd.github+json"}
+BODY = [{"name": "r0"}, {"name": "r1"}]
+LINK = f'<{API}/repos?page=2>; rel="next"'
+
+
+class _FakeSession:
+    """Servidor con ETag: responde 304 si `If-None-Match` coincide."""
+
+    def __init__(self, etag='"v1"'):
+        self.etag = etag
+        self.sent = []
+
+    def request(self, method, url, headers=None, timeout=None, params=None, **kw):
+        full = requests.Request(method, url, params=params).prepare().url
+        self.sent.append((full, dict(headers or {})))
+        rsp = requests.Response()
+        rsp.url = full
+        if (headers or {}).get("If-None-Match") == self.etag:
+            rsp.status_code, rsp._content = 304, b""
+            rsp.headers = CaseInsensitiveDict({"ETag": self.etag})
+        else:
+            rsp.status_code, rsp._content = 200, json.dumps(BODY).encode()
+            rsp.headers = CaseInsensitiveDict({"Content-Type": "application/json",
+                                               "ETag": self.etag, "Link": LINK})
+        return rsp
+
+    def get(self, url, **kw):
+        return self.request("GET", url, **kw)
+
+
+@pytest.fixture
+def session(monkeypatch, tmp_path):
+    monkeypatch.setenv("GITHUB_CACHE", "1")
+    monkeypatch.setenv("GITHUB_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(github_tools, "_CACHE_DB", None)
+    monkeypatch.setattr(github_tools, "_CACHE_STATS",
+                        {"hits": 0, "misses": 0, "stores": 0, "evictions": 0})
+    fake = _FakeSession()
+    monkeypatch.setattr(github_tools, "_http", lambda: fake)
+    yield fake
+    if github_tools._CACHE_DB is not None:
+        github_tools._CACHE_DB.close()
+
+
+def test_primera_peticion_guarda_y_no_es_condicional(session):
+    rsp = github_tools._get(f"{API}/repos", HDR, {"per_page": 2})
+    assert rsp.status_code == 200 and rsp.json() == BODY
+    assert "If-None-Match" not in session.sent[0][1]
+    stats = github_tools.get_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["stores"], stats["entries"]) == (0, 1, 1, 1)
+
+
+def test_304_devuelve_cuerpo_y_link_guardados(session):
+    github_tools._get(f"{API}/repos", HDR, {"per_page": 2})
+    rsp = github_tools._get(f"{API}/repos", HDR, {"per_page": 2})
+
+    assert session.sent[1][1]["If-None-Match"] == '"v1"'
+    assert session.sent[1][0] == session.sent[0][0]
+    assert rsp.status_code == 200
+    assert rsp.json() == BODY
+    assert rsp.links["next"]["url"] == f"{API}/repos?page=2"
+    stats = github_tools.get_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (1, 1, 0.5)
+
+
+def test_etag_cambiado_refresca_la_entrada(session):
+    github_tools._get(f"{API}/repos", HDR)
+    session.etag = '"v2"'
+    rsp = github_tools._get(f"{API}/repos", HDR)
+    assert rsp.status_code == 200 and rsp.json() == BODY
+    rsp = github_tools._get(f"{API}/repos", HDR)
+    assert session.sent[2][1]["If-None-Match"] == '"v2"'
+    stats = github_tools.get_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 1)
+
+
+def test_la_clave_separa_identidades(session):
+    github_tools._get(f"{API}/repos", HDR)
+    github_tools._get(f"{API}/repos", {**HDR, "Authorization": "Bearer otro"})
+    assert "If-None-Match" not in session.sent[1][1]
+    assert github_tools.get_cache_stats()["entries"] == 2
+
+
+def test_cache_desactivada_no_envia_validadores(session, monkeypatch):
+    monkeypatch.setenv("GITHUB_CACHE", "0")
+    github_tools._get(f"{API}/repos", HDR)
+    github_tools._get(f"{API}/repos", HDR)
+    assert all("If-None-Match" not in h for _, h in session.sent)
+    assert github_tools._CACHE_DB is None
@@ -0,0 +1,53 @@
+"""`github_async_tools.commit_files` contra un transporte simulado."""
+
+import asyncio
+import json
+import os
+import sys
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import github_async_tools  # noqa: E402
+
+
+def test_modo_de_archivos_existentes_se_conserva(monkeypatch):
+    monkeypatch.setenv("GITHUB_CACHE", "0")
+    monkeypatch.setattr(github_async_tools, "_github_env",
+                        lambda: ("https://api.github.test", "o", "t"))
+    trees = []
+
+    def handler(request):
+        path = request.url.path
+        if path.endswith("/git/ref/heads/lz"):
+            return httpx.Response(200, json={"object": {"sha": "head"}})
+        if path.endswith("/git/commits/head"):
+            return httpx.Response(200, json={"tree": {"sha": "t0"}})
+        if path.endswith("/git/trees/t0"):
+            return httpx.Response(200, json={"tree": [
+                {"path": "deploy.sh", "mode": "100644", "type": "blob", "sha": "old"}]})
+        if path.endswith("/git/blobs"):
+            return httpx.Response(201, json={"sha": "blob"})
+        if path.endswith("/git/trees"):
+            trees.append(json.loads(request.content)["tree"])
+            return httpx.Response(201, json={"sha": "t1"})
+        if path.endswith("/git/commits"):
+            return httpx.Response(201, json={"sha": "c1"})
+        return httpx.Response(200, json={})
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        github_async_tools._CLIENTS[loop] = client
+        try:
+            return await github_async_tools.commit_files(
+                "r", {"deploy.sh": "echo a\n", "nuevo.sh": "echo b\n", "main.bicep": ""},
+                branch="lz", message="lz")
+        finally:
+            await client.aclose()
+
+    result = asyncio.run(main())
+    assert result["commit"] == "c1"
+    modes = {e["path"]: e["mode"] for e in trees[0]}
+    assert modes == {"deploy.sh": "100644", "nuevo.sh": "100755", "main.bicep": "100644"}
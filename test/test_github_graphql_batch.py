@@ -0,0 +1,134 @@
+"""Lotes GraphQL con alias: orden de entrada, errores parciales y troceado."""
+
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+
+import httpx
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import github_async_tools, github_tools  # noqa: E402
+
+API = "https://api.github.test"
+MISSING = {"ghost"}
+
+
+def _node(owner, name):
+    return {
+        "databaseId": hash(name) & 0xFFFF, "name": name, "nameWithOwner": f"{owner}/{name}",
+        "owner": {"login": owner, "__typename": "Organization"},
+        "isPrivate": False, "isFork": False, "isArchived": False, "visibility": "PUBLIC",
+        "description": None, "url": f"https://github.test/{owner}/{name}",
+        "primaryLanguage": {"name": "Bicep"},
+        "createdAt": "2024-01-01T00:00:00Z", "updatedAt": "2024-01-02T00:00:00Z",
+        "pushedAt": "2024-01-02T00:00:00Z", "stargazerCount": 1, "forkCount": 0,
+        "openIssues": {"totalCount": 2}, "openPullRequests": {"totalCount": 1},
+        "defaultBranchRef": {"name": "main", "branchProtectionRule": None},
+    }
+
+
+def _answer(body):
+    """Responde como GitHub: un alias por repo, null + `errors` si no existe."""
+    variables = body["variables"]
+    aliases = re.findall(r"(r\d+): repository\(owner: \$o(\d+), name: \$n(\d+)\)", body["query"])
+    data, errors = {}, []
+    for alias, i, _ in aliases:
+        owner, name = variables[f"o{i}"], variables[f"n{i}"]
+        if name in MISSING:
+            data[alias] = None
+            errors.append({"type": "NOT_FOUND", "path": [alias],
+                           "message": f"Could not resolve to a Repository with the name '{owner}/{name}'."})
+        else:
+            data[alias] = _node(owner, name)
+    payload = {"data": data}
+    if errors:
+        payload["errors"] = errors
+    return payload, len(aliases)
+
+
+@pytest.fixture(autouse=True)
+def env(monkeypatch):
+    monkeypatch.setenv("GITHUB_API_URL", API)
+    monkeypatch.setenv("GITHUB_OWNER", "contoso")
+    monkeypatch.setenv("GITHUB_PAT", "t0k3n")
+    monkeypatch.setenv("GITHUB_GRAPHQL_BATCH", "2")
+    monkeypatch.setattr(github_tools, "_RATE", {})
+
+
+@pytest.fixture
+def sizes(monkeypatch):
+    """Sesión falsa; el primer lote tarda más para desordenar las respuestas."""
+    seen = []
+
+    class _Session:
+        def request(self, method, url, **kw):
+            assert (method, url) == ("POST", f"{API}/graphql")
+            payload, n = _answer(kw["json"])
+            seen.append(n)
+            if kw["json"]["variables"]["n0"] == "a":
+                time.sleep(0.05)
+            rsp = requests.Response()
+            rsp.status_code = 200
+            rsp.headers = CaseInsensitiveDict({"Content-Type": "application/json"})
+            rsp._content = json.dumps(payload).encode()
+            return rsp
+
+    monkeypatch.setattr(github_tools, "_http", lambda: _Session())
+    return seen
+
+
+REPOS = ["a", "b", "ghost", "fabrikam/d", "e"]
+
+
+def _check(out, sizes):
+    assert [r["full_name"] for r in out] == ["contoso/a", "contoso/b", "contoso/ghost",
+                                              "fabrikam/d", "contoso/e"]
+    assert sorted(sizes) == [1, 2, 2]
+    assert "error" not in out[0] and "error" not in out[3]
+    assert "Could not resolve" in out[2]["error"]
+    assert out[1]["open_issues_count"] == 3 and out[1]["open_pull_requests_count"] == 1
+    assert out[3]["owner"]["login"] == "fabrikam"
+
+
+def test_lotes_en_orden_con_error_parcial(sizes):
+    _check(github_tools.get_repositories_batch(REPOS), sizes)
+
+
+def test_lotes_async_en_orden_con_error_parcial():
+    seen = []
+
+    def handler(request):
+        payload, n = _answer(json.loads(request.content))
+        seen.append(n)
+        return httpx.Response(200, json=payload)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        github_async_tools._CLIENTS[loop] = client
+        try:
+            return await github_async_tools.get_repositories_batch(REPOS)
+        finally:
+            await client.aclose()
+
+    _check(asyncio.run(main()), seen)
+
+
+def test_trocea_por_tamano_de_lote(monkeypatch):
+    pairs = [f"r{i}" for i in range(7)]
+    assert [len(b) for b in github_tools._graphql_batches(pairs, "o")] == [2, 2, 2, 1]
+    monkeypatch.setenv("GITHUB_GRAPHQL_BATCH", "500")
+    assert [len(b) for b in github_tools._graphql_batches(["x"] * 250, "o")] == [100, 100, 50]
+
+
+def test_alias_sin_path_de_error_usa_mensaje_por_defecto():
+    out = github_tools._graphql_repo_results([("o", "a"), ("o", "b")],
+                                             {"data": {"r0": _node("o", "a"), "r1": None}})
+    assert out[1] == {"name": "b", "full_name": "o/b", "error": "repositorio no encontrado"}
@@ -0,0 +1,70 @@
+"""`github_mirror.read_path` contra un repositorio Git local."""
+
+import os
+import subprocess
+import sys
+import types
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import github_mirror  # noqa: E402
+
+
+def _git(cwd, *args):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def origin(tmp_path, monkeypatch):
+    src = tmp_path / "origin"
+    src.mkdir()
+    _git(src, "init", "-q", "-b", "main")
+    _git(src, "config", "uploadpack.allowFilter", "true")
+    (src / "infra").mkdir()
+    (src / "infra" / "main.bicep").write_text("param location string\n")
+    (src / "logo.png").write_bytes(b"\x89PNG\r\n\x1a\n\xff\xfe\x00")
+    _git(src, "add", ".")
+    _git(src, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "init")
+
+    monkeypatch.setenv("GITHUB_MIRROR_DIR", str(tmp_path / "mirrors"))
+    monkeypatch.setattr(github_mirror, "_clone_url", lambda api, owner, repo: src.as_uri())
+    github_mirror._REPOS.clear()
+    yield src
+    for repo in github_mirror._REPOS.values():
+        repo.close()
+    github_mirror._REPOS.clear()
+
+
+def _read(path):
+    return github_mirror.read_path("https://api.github.com", "o", "r", path, "main", "t")
+
+
+def test_archivo_y_directorio(origin):
+    assert _read("infra/main.bicep") == "param location string\n"
+    assert [e["name"] for e in _read("infra")] == ["main.bicep"]
+    with pytest.raises(FileNotFoundError):
+        _read("no/existe")
+
+
+def test_binario_no_lanza(origin):
+    content = _read("logo.png")
+    assert content.startswith("�PNG")
+
+
+def test_lectura_con_cerrojo_tomado(origin, monkeypatch):
+    held = []
+    real_open = github_mirror._open
+
+    def spy(path, *args):
+        repo, new = real_open(path, *args)
+
+        def commit(ref):
+            held.append(github_mirror._lock(path).locked())
+            return repo.commit(ref)
+        return types.SimpleNamespace(commit=commit), new
+
+    monkeypatch.setattr(github_mirror, "_open", spy)
+    _read("infra/main.bicep")
+    assert held == [True]
@@ -0,0 +1,74 @@
+"""Auditoría Zero‑Trust de `github_async_tools` contra un transporte simulado."""
+
+import asyncio
+import os
+import sys
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import github_async_tools  # noqa: E402
+
+
+def _audit(monkeypatch, repos, handler):
+    monkeypatch.setenv("GITHUB_CACHE", "0")
+    monkeypatch.setattr(github_async_tools, "_github_env",
+                        lambda: ("https://api.github.test", "o", "t"))
+
+    async def _list(owner=None, date_filter=None):
+        return repos
+    monkeypatch.setattr(github_async_tools, "list_repositories", _list)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        github_async_tools._CLIENTS[loop] = client
+        try:
+            return await github_async_tools.audit_org_zero_trust("o")
+        finally:
+            await client.aclose()
+    return asyncio.run(main())
+
+
+def test_repo_vacio_no_consulta_proteccion(monkeypatch):
+    paths = []
+
+    def handler(request):
+        paths.append(request.url.path)
+        if request.url.path.endswith("/protection"):
+            return httpx.Response(200, json={"enforce_admins": {"enabled": True},
+                                             "required_pull_request_reviews":
+                                                 {"required_approving_review_count": 1}})
+        return httpx.Response(204)
+
+    result = _audit(monkeypatch, [
+        {"full_name": "o/vacio", "default_branch": None},
+        {"full_name": "o/app", "default_branch": "main"}], handler)
+
+    assert not any("None" in p for p in paths)
+    assert "/repos/o/app/branches/main/protection" in paths
+    rows = {r["repo"]: r for r in result["repos"]}
+    assert rows["o/vacio"]["empty"] is True
+    assert rows["o/app"]["branch_protection"] is True
+    assert result["summary"]["empty"] == 1
+    assert result["summary"]["branch_protection"]["enabled"] == 1
+    assert "repositorio vacío" in result["table"]
+
+
+def test_404_sin_admin_es_desconocido(monkeypatch):
+    def handler(request):
+        return httpx.Response(404, json={"message": "Not Found"})
+
+    result = _audit(monkeypatch, [
+        {"full_name": "o/mio", "default_branch": "main", "permissions": {"admin": True}},
+        {"full_name": "o/ajeno", "default_branch": "main",
+         "permissions": {"admin": False, "push": True}}], handler)
+
+    rows = {r["repo"]: r for r in result["repos"]}
+    assert rows["o/mio"]["branch_protection"] is False
+    assert rows["o/mio"]["dependabot_alerts"] is False
+    assert rows["o/ajeno"]["branch_protection"] is None
+    assert rows["o/ajeno"]["enforce_admins"] is None
+    assert rows["o/ajeno"]["dependabot_alerts"] is None
+    assert result["summary"]["dependabot_alerts"] == {"enabled": 0, "disabled": 1, "unknown": 1}
@@ -0,0 +1,120 @@
+"""Paginación por `Link: rel="next"` con corte anticipado (sync y async)."""
+
+import asyncio
+import json
+import os
+import re
+import sys
+
+import httpx
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import github_async_tools, github_tools  # noqa: E402
+
+API = "https://api.github.test"
+PAGES = 3
+PER_PAGE = 4
+
+
+def _page(n):
+    """Página n (1..PAGES) de repos ordenados por `updated_at` descendente."""
+    items = [{"name": f"r{i}", "updated_at": f"2024-01-{31 - i:02d}T00:00:00Z"}
+             for i in range((n - 1) * PER_PAGE, n * PER_PAGE)]
+    headers = {"Content-Type": "application/json"}
+    if n < PAGES:
+        headers["Link"] = f'<{API}/repos?page={n + 1}>; rel="next"'
+    return items, headers
+
+
+def _page_number(url):
+    m = re.search(r"[?&]page=(\d+)", url)
+    return int(m.group(1)) if m else 1
+
+
+class _FakeSession:
+    """Sesión mínima que sirve las páginas de `_page`."""
+
+    def __init__(self):
+        self.urls = []
+
+    def request(self, method, url, headers=None, timeout=None, params=None, **kw):
+        full = requests.Request(method, url, params=params).prepare().url
+        self.urls.append(full)
+        items, hdrs = _page(_page_number(full))
+        rsp = requests.Response()
+        rsp.status_code, rsp.url = 200, full
+        rsp.headers = CaseInsensitiveDict(hdrs)
+        rsp._content = json.dumps(items).encode()
+        return rsp
+
+    def get(self, url, **kw):
+        return self.request("GET", url, **kw)
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.setenv("GITHUB_CACHE", "0")
+
+
+@pytest.fixture
+def session(monkeypatch):
+    fake = _FakeSession()
+    monkeypatch.setattr(github_tools, "_http", lambda: fake)
+    return fake
+
+
+def test_sigue_link_hasta_el_final(session):
+    items = list(github_tools._paginate(f"{API}/repos", {}, {"per_page": PER_PAGE}))
+    assert [i["name"] for i in items] == [f"r{i}" for i in range(PAGES * PER_PAGE)]
+    assert [_page_number(u) for u in session.urls] == [1, 2, 3]
+
+
+def test_corte_no_pide_la_pagina_siguiente(session):
+    cutoff = github_tools._parse_ts("2024-01-25T12:00:00Z")
+    stop = github_tools._updated_before(cutoff)
+    items = list(github_tools._paginate(f"{API}/repos", {}, {"per_page": PER_PAGE}, stop=stop))
+    assert [i["name"] for i in items] == [f"r{i}" for i in range(6)]
+    assert [_page_number(u) for u in session.urls] == [1, 2]
+
+
+def _async_items(stop=None, take=None):
+    urls = []
+
+    def handler(request):
+        urls.append(str(request.url))
+        items, headers = _page(_page_number(str(request.url)))
+        return httpx.Response(200, headers=headers, json=items)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        github_async_tools._CLIENTS[loop] = client
+        try:
+            out = []
+            async for item in github_async_tools._paginate(f"{API}/repos", {}, stop=stop):
+                out.append(item)
+                if take and len(out) == take:
+                    break
+            await asyncio.sleep(0)
+            return out
+        finally:
+            await client.aclose()
+    return asyncio.run(main()), urls
+
+
+def test_async_corte_anticipado():
+    stop = github_tools._updated_before(github_tools._parse_ts("2024-01-25T12:00:00Z"))
+    items, urls = _async_items(stop=stop)
+    assert len(items) == 6
+    assert [_page_number(u) for u in urls] == [1, 2]
+
+
+def test_async_corte_en_la_ultima_no_precarga():
+    stop = github_tools._updated_before(github_tools._parse_ts("2024-01-28T12:00:00Z"))
+    items, urls = _async_items(stop=stop)
+    assert len(items) == 3                       # el corte cae en el último de la página 1
+    assert [_page_number(u) for u in urls] == [1]
@@ -0,0 +1,129 @@
+"""Planificador de rate limit de GitHub: dosificación, cubos y cabeceras."""
+
+import os
+import sys
+import time
+
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import github_tools  # noqa: E402
+
+API = "https://api.github.test"
+CORE = ("id-a", "core")
+
+
+def _rsp(status=200, text="", **headers):
+    rsp = requests.Response()
+    rsp.status_code = status
+    rsp.headers = CaseInsensitiveDict({k.replace("_", "-"): str(v) for k, v in headers.items()})
+    rsp._content = text.encode()
+    return rsp
+
+
+@pytest.fixture(autouse=True)
+def rate(monkeypatch):
+    monkeypatch.setattr(github_tools, "_RATE", {})
+    monkeypatch.setenv("GITHUB_RATE_PACE_BELOW", "0.2")
+    monkeypatch.setenv("GITHUB_RATE_RESERVE", "2")
+    monkeypatch.setenv("GITHUB_RATE_MAX_WAIT", "60")
+    return github_tools._RATE
+
+
+def test_cabeceras_actualizan_el_cubo(rate):
+    reset = time.time() + 600
+    retry = github_tools._rate_update(CORE, _rsp(X_RateLimit_Limit=5000,
+                                                 X_RateLimit_Remaining=4321,
+                                                 X_RateLimit_Reset=reset))
+    assert retry is False
+    assert (rate[CORE]["limit"], rate[CORE]["remaining"], rate[CORE]["reset"]) == (5000, 4321, reset)
+
+
+def test_sin_cabeceras_no_se_espera(rate):
+    assert github_tools._rate_reserve(CORE) == 0.0
+    assert rate[CORE]["remaining"] is None
+
+
+def test_cupo_holgado_no_dosifica(rate):
+    github_tools._rate_update(CORE, _rsp(X_RateLimit_Limit=100, X_RateLimit_Remaining=90,
+                                         X_RateLimit_Reset=time.time() + 100))
+    assert github_tools._rate_reserve(CORE) == 0.0
+    assert rate[CORE]["remaining"] == 89
+
+
+def test_cupo_bajo_reparte_hasta_el_reset(rate):
+    github_tools._rate_update(CORE, _rsp(X_RateLimit_Limit=100, X_RateLimit_Remaining=12,
+                                         X_RateLimit_Reset=time.time() + 100))
+    waits = [github_tools._rate_reserve(CORE) for _ in range(3)]
+    # 10, 9 y 8 envíos útiles para ~100 s: huecos de ~10 s, ~11 s, …
+    assert waits[0] == pytest.approx(0.0, abs=0.1)
+    assert waits[1] == pytest.approx(10.0, abs=0.2)
+    assert waits[2] == pytest.approx(10.0 + 100 / 9, abs=0.3)
+    assert rate[CORE]["remaining"] == 9
+    assert rate[CORE]["waits"] == 2
+
+
+def test_cubos_separados_por_identidad_y_recurso(rate):
+    github_tools._rate_update(CORE, _rsp(X_RateLimit_Limit=100, X_RateLimit_Remaining=2,
+                                         X_RateLimit_Reset=time.time() + 30))
+    assert github_tools._rate_reserve(CORE) > 0
+    assert github_tools._rate_reserve(("id-a", "search")) == 0.0
+    assert github_tools._rate_reserve(("id-b", "core")) == 0.0
+    assert github_tools._resource_for(f"{API}/search/issues") == "search"
+    assert github_tools._resource_for(f"{API}/graphql") == "graphql"
+    assert github_tools._identity({"Authorization": "a"}) != github_tools._identity({"Authorization": "b"})
+
+
+def test_agotado_con_reset_lejano_falla_sin_reservar(rate):
+    github_tools._rate_update(CORE, _rsp(X_RateLimit_Limit=5000, X_RateLimit_Remaining=0,
+                                         X_RateLimit_Reset=time.time() + 3000))
+    with pytest.raises(RuntimeError, match="GITHUB_RATE_MAX_WAIT"):
+        github_tools._rate_reserve(CORE)
+    assert rate[CORE]["remaining"] == 0
+    assert rate[CORE]["waits"] == 0
+
+
+def test_403_primario_bloquea_hasta_el_reset(rate):
+    reset = time.time() + 20
+    retry = github_tools._rate_update(CORE, _rsp(403, X_RateLimit_Limit=5000,
+                                                 X_RateLimit_Remaining=0,
+                                                 X_RateLimit_Reset=reset))
+    assert retry is True
+    assert rate[CORE]["blocked_until"] == reset + 1
+
+
+def test_403_de_permisos_no_reintenta(rate):
+    assert github_tools._rate_update(CORE, _rsp(403, text="Resource not accessible")) is False
+
+
+def test_send_reintenta_tras_retry_after(rate, monkeypatch):
+    replies = [_rsp(429, Retry_After=2), _rsp(200, X_RateLimit_Limit=5000,
+                                              X_RateLimit_Remaining=4999,
+                                              X_RateLimit_Reset=time.time() + 600)]
+    slept = []
+
+    class _Session:
+        def request(self, method, url, **kw):
+            return replies.pop(0)
+
+    monkeypatch.setattr(github_tools, "_http", lambda: _Session())
+    monkeypatch.setattr(github_tools.time, "sleep", slept.append)
+    rsp = github_tools._send("GET", f"{API}/repos/o/r", {"Authorization": "t"})
+    assert rsp.status_code == 200
+    assert slept and slept[0] == pytest.approx(2.0, abs=0.1)
+    key = (github_tools._identity({"Authorization": "t"}), "core")
+    assert rate[key]["retries"] == 1
+
+
+def test_send_retry_after_excesivo_es_error(rate, monkeypatch):
+    class _Session:
+        def request(self, method, url, **kw):
+            return _rsp(429, Retry_After=3600)
+
+    monkeypatch.setattr(github_tools, "_http", lambda: _Session())
+    monkeypatch.setattr(github_tools.time, "sleep", lambda s: None)
+    with pytest.raises(RuntimeError, match="Rate limit de GitHub"):
+        github_tools._send("GET", f"{API}/repos/o/r", {"Authorization": "t"})
@@ -0,0 +1,57 @@
+"""`github_async_tools.search_pull_requests` contra un transporte simulado."""
+
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import github_async_tools  # noqa: E402
+
+
+def _item(n):
+    return {"repository_url": "https://api.github.test/repos/o/r", "number": n,
+            "title": f"PR {n}", "state": "open", "user": {"login": "u"},
+            "html_url": f"https://github.test/o/r/pull/{n}",
+            "created_at": "2024-01-01T00:00:00Z", "updated_at": "2024-01-02T00:00:00Z",
+            "labels": [], "draft": False}
+
+
+def _search(monkeypatch, **kw):
+    monkeypatch.setenv("GITHUB_CACHE", "0")
+    monkeypatch.setattr(github_async_tools, "_github_env",
+                        lambda: ("https://api.github.test", "o", "t"))
+    github_async_tools._OWNER_TYPES[("https://api.github.test", "o")] = "Organization"
+    pages = []
+
+    def handler(request):
+        page, per_page = int(request.url.params["page"]), int(request.url.params["per_page"])
+        pages.append(page)
+        start = (page - 1) * per_page
+        return httpx.Response(200, json={"total_count": 250, "incomplete_results": False,
+                                         "items": [_item(n) for n in range(start, start + per_page)]})
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        github_async_tools._CLIENTS[loop] = client
+        try:
+            return await github_async_tools.search_pull_requests(**kw)
+        finally:
+            await client.aclose()
+    return asyncio.run(main()), pages
+
+
+def test_pide_solo_las_paginas_necesarias(monkeypatch):
+    result, pages = _search(monkeypatch, max_results=150)
+    assert sorted(pages) == [1, 2]
+    assert len(result["items"]) == 150
+    assert result["query"] == "is:pr org:o state:open"
+
+
+def test_max_results_invalido(monkeypatch):
+    with pytest.raises(ValueError):
+        _search(monkeypatch, max_results=0)
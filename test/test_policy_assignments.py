@@ -0,0 +1,61 @@
+"""Listado de asignaciones de `policy_tools` con ARM simulado."""
+
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import arm_client, azure_scope, policy_tools  # noqa: E402
+
+MG_ASSIGNMENT = {"id": "/providers/Microsoft.Management/managementGroups/lz/providers/"
+                       "Microsoft.Authorization/policyAssignments/asc", "name": "asc"}
+
+
+def _sub_assignment(sub):
+    return {"id": f"/subscriptions/{sub}/providers/Microsoft.Authorization/policyAssignments/a",
+            "name": "a"}
+
+
+@pytest.fixture
+def arm(monkeypatch):
+    monkeypatch.setenv("SUBSCRIPTION_ID", "sub-env")
+    monkeypatch.setenv("TENANT_ID", "t")
+    monkeypatch.setenv("CLIENT_ID", "c")
+    monkeypatch.setenv("CLIENT_SECRET", "s")
+
+    async def paginate(url, params=None, **kw):
+        sub = url.split("/")[2]
+        if sub == "sub-roto":
+            raise httpx.HTTPError("403 Forbidden")
+        for doc in (_sub_assignment(sub), MG_ASSIGNMENT):
+            yield doc
+    monkeypatch.setattr(arm_client, "paginate", paginate)
+
+
+def test_sin_scope_devuelve_lista(arm):
+    result = asyncio.run(policy_tools.list_policy_assignments())
+    assert isinstance(result, list) and len(result) == 2
+
+
+def test_error_sin_scope_devuelve_lista_vacia(arm):
+    assert asyncio.run(policy_tools.list_policy_assignments("sub-roto")) == []
+
+
+def test_varias_suscripciones_misma_forma(arm):
+    result = asyncio.run(policy_tools.list_scope_policy_assignments(["s1", "s2", "sub-roto"]))
+    assert set(result) == {"scope", "assignments", "subscriptions", "succeeded", "errors"}
+    assert len(result["assignments"]) == 3          # la del grupo, una sola vez
+    assert result["succeeded"] == 2 and list(result["errors"]) == ["sub-roto"]
+
+
+def test_scope_sin_resolver_misma_forma(arm, monkeypatch):
+    async def fail(scope):
+        raise httpx.HTTPError("401 Unauthorized")
+    monkeypatch.setattr(azure_scope, "resolve_subscriptions", fail)
+    result = asyncio.run(policy_tools.list_scope_policy_assignments("mg:lz"))
+    assert result["assignments"] == [] and result["subscriptions"] == 0
+    assert result["errors"] == {"mg:lz": "401 Unauthorized"}
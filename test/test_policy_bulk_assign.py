@@ -0,0 +1,93 @@
+"""Asignación masiva idempotente de `policy_tools` (GET → comparar → omitir o PUT)."""
+
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import arm_client, policy_tools  # noqa: E402
+
+SUB = "/subscriptions/s1"
+DEF_ID = "/providers/Microsoft.Authorization/policyDefinitions/{}"
+
+
+def _existing(name, **props):
+    base = {"policyDefinitionId": DEF_ID.format(name).upper(),      # ARM no respeta mayúsculas
+            "parameters": {"effect": {"value": "Deny"}},
+            "enforcementMode": "Default",
+            "displayName": "Storage sin acceso público",
+            "description": "Zero Trust"}
+    return {"id": f"{SUB}/providers/Microsoft.Authorization/policyAssignments/{name}",
+            "name": name, "properties": {**base, **props}}
+
+
+@pytest.fixture
+def arm(monkeypatch):
+    """ARM en memoria: asignaciones por nombre y registro de peticiones."""
+    state = {"assignments": {"same": _existing("same"),
+                             "changed": _existing("changed", displayName="Texto antiguo")},
+             "calls": []}
+
+    async def request(method, url, params=None, json=None, timeout=None):
+        name = url.rsplit("/", 1)[-1]
+        state["calls"].append((method, name))
+        req = httpx.Request(method, "https://arm.test" + url)
+        if method == "GET":
+            doc = state["assignments"].get(name)
+            if name == "forbidden":
+                return httpx.Response(403, json={"error": {"code": "AuthorizationFailed"}},
+                                      request=req)
+            return httpx.Response(200 if doc else 404, json=doc or {}, request=req)
+        state["assignments"][name] = {"id": f"{SUB}/x/{name}", "name": name, **json}
+        return httpx.Response(201, json=state["assignments"][name], request=req)
+
+    monkeypatch.setattr(arm_client, "request", request)
+    return state
+
+
+def _item(name, **kw):
+    return {"policy": name, "scope": SUB, "parameters": {"effect": "Deny"},
+            "display_name": "Storage sin acceso público", "description": "Zero Trust", **kw}
+
+
+def test_sin_cambios_no_hace_put(arm):
+    result = asyncio.run(policy_tools.bulk_assign_policies([_item("same")]))
+    assert result["results"][0]["status"] == "unchanged"
+    assert arm["calls"] == [("GET", "same")]
+
+
+def test_cambio_de_display_name_se_aplica(arm):
+    result = asyncio.run(policy_tools.bulk_assign_policies([_item("changed")]))
+    assert result["results"][0]["status"] == "updated"
+    assert arm["calls"] == [("GET", "changed"), ("PUT", "changed")]
+    assert arm["assignments"]["changed"]["properties"]["displayName"] == "Storage sin acceso público"
+
+
+@pytest.mark.parametrize("change", [{"description": "otra"}, {"enforcement_mode": "DoNotEnforce"},
+                                    {"parameters": {"effect": "Audit"}}])
+def test_cualquier_campo_del_cuerpo_cuenta(arm, change):
+    result = asyncio.run(policy_tools.bulk_assign_policies([_item("same", **change)]))
+    assert result["results"][0]["status"] == "updated"
+
+
+def test_campo_no_indicado_no_fuerza_put(arm):
+    item = _item("same")
+    del item["description"]
+    result = asyncio.run(policy_tools.bulk_assign_policies([item]))
+    assert result["results"][0]["status"] == "unchanged"
+
+
+def test_inexistente_se_crea_y_errores_no_detienen_el_resto(arm):
+    result = asyncio.run(policy_tools.bulk_assign_policies(
+        [_item("nueva"), _item("forbidden"), _item("same")]))
+    statuses = [r["status"] for r in result["results"]]
+    assert statuses == ["created", "error", "unchanged"]
+    assert result["summary"] == {"created": 1, "error": 1, "unchanged": 1}
+    assert ("PUT", "nueva") in arm["calls"] and ("PUT", "forbidden") not in arm["calls"]
+    body = arm["assignments"]["nueva"]["properties"]
+    assert body["parameters"] == {"effect": {"value": "Deny"}}
+    assert body["policyDefinitionId"] == DEF_ID.format("nueva")
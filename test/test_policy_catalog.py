@@ -0,0 +1,117 @@
+"""Catálogo local de definiciones built‑in (`policy_catalog`) con ARM simulado."""
+
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import arm_client, policy_catalog  # noqa: E402
+
+
+def _doc(n, version="1.0.0"):
+    return {"id": f"/providers/Microsoft.Authorization/policyDefinitions/def-{n}",
+            "name": f"def-{n}", "type": "Microsoft.Authorization/policyDefinitions",
+            "properties": {"displayName": f"Policy {n}", "policyType": "BuiltIn",
+                           "mode": "Indexed", "version": version,
+                           "metadata": {"category": "Storage"},
+                           "description": "x" * (n % 50),
+                           "policyRule": {"if": {"field": "type", "equals": f"T{n}"},
+                                          "then": {"effect": "audit"}}}}
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    monkeypatch.setenv("POLICY_CATALOG_DIR", str(tmp_path))
+    published = {"docs": [_doc(n) for n in range(300)]}
+
+    async def paginate(url, params=None, **kw):
+        for i, doc in enumerate(list(published["docs"])):
+            if i % 25 == 0:
+                await asyncio.sleep(0)          # deja intercalarse a otra sync
+            yield doc
+
+    monkeypatch.setattr(arm_client, "paginate", paginate)
+    with policy_catalog._LOCK:
+        policy_catalog._close()
+    policy_catalog._TASK["sync"] = None
+    yield published
+    with policy_catalog._LOCK:
+        policy_catalog._close()
+
+
+def _all_found(n):
+    return all(policy_catalog.lookup(f"def-{i}") is not None for i in range(n))
+
+
+def test_lookup_por_name_id_y_displayname(catalog):
+    stats = asyncio.run(policy_catalog.sync_catalog(force=True))
+    assert stats["added"] == 300 and stats["definitions"] == 300
+    doc = policy_catalog.lookup("def-7")
+    assert doc["name"] == "def-7"
+    assert policy_catalog.lookup(doc["id"].upper())["name"] == "def-7"
+    assert policy_catalog.lookup("policy 7")["name"] == "def-7"
+    assert policy_catalog.lookup("no-existe") is None
+    assert policy_catalog.catalog_status()["definitions"] == 300
+
+
+def test_resync_incremental(catalog, tmp_path):
+    asyncio.run(policy_catalog.sync_catalog(force=True))
+    catalog["docs"] = [_doc(n, "2.0.0" if n == 3 else "1.0.0") for n in range(1, 300)]
+    stats = asyncio.run(policy_catalog.sync_catalog(force=True))
+    assert (stats["added"], stats["updated"], stats["removed"], stats["unchanged"]) == (0, 1, 1, 298)
+    assert policy_catalog.lookup("def-0") is None
+    assert policy_catalog.lookup("def-3")["properties"]["version"] == "2.0.0"
+    assert all(policy_catalog.lookup(f"def-{i}") for i in range(1, 300))
+    assert len(list(tmp_path.glob("definitions.*"))) == 1
+
+
+def test_syncs_simultaneas_no_corrompen(catalog):
+    async def main():
+        policy_catalog.refresh_in_background()
+        return await asyncio.gather(policy_catalog.sync_catalog(force=True),
+                                    policy_catalog.sync_catalog(force=True))
+    a, b = asyncio.run(main())
+    assert a == b                                # una sola sync compartida
+    assert _all_found(300)
+
+
+def test_syncs_en_hilos_distintos(catalog):
+    errors = []
+
+    def run():
+        try:
+            asyncio.run(policy_catalog.sync_catalog(force=True))
+        except Exception as e:                   # pragma: no cover - se informa abajo
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert _all_found(300)
+
+
+def test_registro_danado_es_un_fallo_de_cache(catalog, tmp_path):
+    asyncio.run(policy_catalog.sync_catalog(force=True))
+    data = next(tmp_path.glob("definitions.*.dat"))
+    with policy_catalog._LOCK:
+        policy_catalog._close()
+    data.write_bytes(b"\0" * data.stat().st_size)
+    assert policy_catalog.lookup("def-1") is None
+
+
+def test_estado_sin_leer_meta(catalog, monkeypatch):
+    asyncio.run(policy_catalog.sync_catalog(force=True))
+
+    def boom():
+        raise AssertionError("catalog_status no debe leer meta.json")
+    monkeypatch.setattr(policy_catalog, "_load_meta", boom)
+    status = policy_catalog.catalog_status()
+    assert status["definitions"] == 300 and not status["stale"]
+    assert asyncio.run(policy_catalog.sync_catalog())["skipped"]
@@ -0,0 +1,125 @@
+"""Cumplimiento en servidor (`summarize` / `queryResults`) con un transporte ARM simulado."""
+
+import asyncio
+import os
+import sys
+from urllib.parse import parse_qs
+
+import httpx
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import arm_client, policy_tools  # noqa: E402
+
+SUB = "sub-1"
+BASE = f"https://management.azure.com/subscriptions/{SUB}/providers/Microsoft.PolicyInsights/policyStates/latest"
+
+SUMMARY = {"value": [{
+    "results": {"nonCompliantResources": 7, "nonCompliantPolicies": 3},
+    "policyAssignments": [
+        {"policyAssignmentId": "/a/low",  "results": {"nonCompliantResources": 1, "nonCompliantPolicies": 1}},
+        {"policyAssignmentId": "/a/high", "results": {"nonCompliantResources": 6, "nonCompliantPolicies": 2}},
+        {"policyAssignmentId": "/a/ok",   "results": {}}]}]}
+
+
+def _rows(page, n=3):
+    return [{"@odata.id": None, "policyAssignmentId": f"/a/{page}-{i}",
+             "resourceType": "microsoft.storage/storageaccounts", "count": page * 10 + i}
+            for i in range(n)]
+
+
+def _run(handler, coro_fn):
+    requests = []
+
+    def record(request):
+        requests.append(request)
+        return handler(request)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        client = httpx.AsyncClient(transport=httpx.MockTransport(record))
+        arm_client._LOOPS[loop] = {"client": client, "sems": {}}
+        try:
+            return await coro_fn()
+        finally:
+            await client.aclose()
+    return asyncio.run(main()), requests
+
+
+@pytest.fixture(autouse=True)
+def arm(monkeypatch):
+    monkeypatch.setenv("SUBSCRIPTION_ID", SUB)
+    for var in ("TENANT_ID", "CLIENT_ID", "CLIENT_SECRET"):
+        monkeypatch.setenv(var, "x")
+    monkeypatch.delenv("ARM_ENDPOINT", raising=False)
+    arm_client.set_token_provider(lambda: "fake")
+    yield
+    arm_client.set_token_provider(None)
+
+
+def test_summarize_totales_y_por_asignacion():
+    def handler(request):
+        assert request.method == "POST" and request.url.path.endswith("/summarize")
+        return httpx.Response(200, json=SUMMARY)
+
+    result, requests = _run(handler, lambda: policy_tools.summarize_policy_compliance(
+        filter="resourceType eq 'microsoft.storage/storageaccounts'", top=5))
+
+    assert (result["nonCompliantResources"], result["nonCompliantPolicies"]) == (7, 3)
+    assert [a["id"] for a in result["assignments"]] == ["/a/high", "/a/low", "/a/ok"]
+    assert result["assignments"][2] == {"id": "/a/ok", "nonCompliantResources": 0,
+                                        "nonCompliantPolicies": 0}
+    query = parse_qs(requests[0].url.query.decode())
+    assert query["$top"] == ["5"] and "storageaccounts" in query["$filter"][0]
+    assert requests[0].headers["Authorization"] == "Bearer fake"
+
+
+def test_summarize_error_devuelve_vacio():
+    result, _ = _run(lambda r: httpx.Response(403, json={"error": {}}),
+                     lambda: policy_tools.summarize_policy_compliance())
+    assert result == {}
+
+
+def test_query_results_pagina_con_post_y_ordena():
+    def handler(request):
+        assert request.method == "POST"
+        page = int(parse_qs(request.url.query.decode()).get("page", ["1"])[0])
+        body = {"value": _rows(page)}
+        if page < 3:
+            body["@odata.nextLink"] = f"{BASE}/queryResults?api-version=2019-10-01&page={page + 1}"
+        return httpx.Response(200, json=body)
+
+    rows, requests = _run(handler, lambda: policy_tools.query_policy_states())
+
+    assert len(requests) == 3
+    assert [r["count"] for r in rows] == sorted((p * 10 + i for p in (1, 2, 3) for i in range(3)),
+                                                reverse=True)
+    assert all(not k.startswith("@odata") for r in rows for k in r)
+    first = parse_qs(requests[0].url.query.decode())
+    assert "groupby" in first["$apply"][0] and "NonCompliant" in first["$filter"][0]
+
+
+def test_query_results_max_rows_corta_la_paginacion():
+    def handler(request):
+        page = int(parse_qs(request.url.query.decode()).get("page", ["1"])[0])
+        return httpx.Response(200, json={
+            "value": _rows(page, n=4),
+            "@odata.nextLink": f"{BASE}/queryResults?page={page + 1}"})
+
+    rows, requests = _run(handler, lambda: policy_tools.query_policy_states(
+        apply=None, filter=None, select="resourceId", max_rows=6))
+    assert len(rows) == 6
+    assert len(requests) <= 3                      # 2 consumidas + como mucho 1 precargada
+    assert "$apply" not in parse_qs(requests[0].url.query.decode())
+
+
+def test_query_results_error_devuelve_lo_leido():
+    def handler(request):
+        if "page=2" in str(request.url):
+            return httpx.Response(400, json={"error": {"code": "InvalidQuery"}})
+        return httpx.Response(200, json={"value": _rows(1),
+                                         "@odata.nextLink": f"{BASE}/queryResults?page=2"})
+
+    rows, _ = _run(handler, lambda: policy_tools.query_policy_states(apply=None))
+    assert [r["count"] for r in rows] == [10, 11, 12]
@@ -0,0 +1,102 @@
+"""Evaluador local de reglas de Azure Policy (`policy_eval`) con recursos ARM."""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import policy_eval  # noqa: E402
+
+NSG = "Microsoft.Network/networkSecurityGroups"
+STORAGE = "Microsoft.Storage/storageAccounts"
+
+
+def _nsg(*rules):
+    return {"type": NSG, "apiVersion": "2023-09-01", "name": "nsg-hub",
+            "location": "westeurope",
+            "properties": {"securityRules": [
+                {"name": f"rule-{i}", "properties": props} for i, props in enumerate(rules)]}}
+
+
+def _storage(**props):
+    base = {"supportsHttpsTrafficOnly": True, "minimumTlsVersion": "TLS1_2",
+            "allowBlobPublicAccess": False,
+            "networkAcls": {"defaultAction": "Deny", "bypass": "AzureServices",
+                            "ipRules": [{"value": "203.0.113.0/24", "action": "Allow"}],
+                            "virtualNetworkRules": []}}
+    base.update(props)
+    return {"type": STORAGE, "apiVersion": "2023-01-01", "name": "stlz001",
+            "location": "westeurope", "kind": "StorageV2", "sku": {"name": "Standard_LRS"},
+            "properties": base}
+
+
+def _definition(name, condition, effect="deny"):
+    return {"name": name, "properties": {"displayName": name, "policyRule": {
+        "if": {"allOf": [{"field": "type", "equals": condition.pop("type")}, condition]},
+        "then": {"effect": effect}}}}
+
+
+def _rule(condition):
+    return policy_eval.compile_rule(_definition("p", dict(condition)))[0]
+
+
+def _rule_for(type_, condition):
+    return _rule({"type": type_, **condition})
+
+
+def test_nsg_todas_deny_no_cumple_access_allow():
+    rule = _rule_for(NSG, {"field": f"{NSG}/securityRules[*].access", "equals": "Allow"})
+    nsg = _nsg({"access": "Deny", "direction": "Inbound", "priority": 100},
+               {"access": "Deny", "direction": "Outbound", "priority": 200})
+    assert rule(nsg) is False
+
+
+def test_nsg_elemento_sin_campo_no_cuenta_como_cumplido():
+    rule = _rule_for(NSG, {"field": f"{NSG}/securityRules[*].access", "equals": "Allow"})
+    assert rule(_nsg({"access": "Allow"}, {"direction": "Inbound"})) is False
+    assert rule(_nsg({"direction": "Inbound"})) is False
+
+
+def test_nsg_todas_allow_cumple():
+    rule = _rule_for(NSG, {"field": f"{NSG}/securityRules[*].access", "equals": "Allow"})
+    assert rule(_nsg({"access": "Allow"}, {"access": "allow"})) is True
+
+
+def test_nsg_notequals_en_cada_elemento():
+    # «ninguna regla entrante con puerto 3389» escrito como [*] notEquals
+    rule = _rule_for(NSG, {"field": f"{NSG}/securityRules[*].destinationPortRange",
+                           "notEquals": "3389"})
+    assert rule(_nsg({"destinationPortRange": "443"}, {"access": "Deny"})) is True
+    assert rule(_nsg({"destinationPortRange": "443"},
+                     {"destinationPortRange": "3389"})) is False
+
+
+def test_storage_ip_rules_en_properties_del_elemento():
+    rule = _rule_for(STORAGE, {"field": f"{STORAGE}/networkAcls.ipRules[*].action",
+                               "equals": "Allow"})
+    assert rule(_storage()) is True
+    acls = {"defaultAction": "Deny", "ipRules": [
+        {"properties": {"value": "198.51.100.7", "action": "Deny"}}]}
+    assert rule(_storage(networkAcls=acls)) is False
+
+
+def test_storage_evaluacion_en_lote():
+    definitions = [
+        _definition("https-only", {"type": STORAGE,
+                                   "field": f"{STORAGE}/supportsHttpsTrafficOnly",
+                                   "equals": "false"}),
+        _definition("tls", {"type": STORAGE, "field": f"{STORAGE}/minimumTlsVersion",
+                            "notEquals": "TLS1_2"}, effect="audit"),
+        _definition("nsg-allow", {"type": NSG,
+                                  "field": f"{NSG}/securityRules[*].access",
+                                  "equals": "Allow"}),
+    ]
+    resources = [_storage(), _storage(minimumTlsVersion="TLS1_0"),
+                 _nsg({"access": "Deny"})]
+    result = policy_eval.evaluate(resources, definitions)
+    assert [(f["policy"], f["result"]) for f in result["findings"]] == [("tls", "violation")]
+
+
+def test_count_es_desconocido():
+    rule = _rule_for(NSG, {"count": {"field": f"{NSG}/securityRules[*]"}, "greater": 0})
+    assert rule(_nsg({"access": "Allow"})) is None
@@ -0,0 +1,94 @@
+"""`policy_tools.precheck_landing_zone` sobre una plantilla ARM local."""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import arm_client, policy_catalog, policy_eval, policy_tools  # noqa: E402
+
+TEMPLATE = {
+    "$schema": "https://schema.management.azure.com/schemas/2019-04-01/deploymentTemplate.json#",
+    "contentVersion": "1.0.0.0",
+    "parameters": {"tls": {"type": "string", "defaultValue": "TLS1_0"}},
+    "resources": [{"type": "Microsoft.Storage/storageAccounts", "apiVersion": "2023-01-01",
+                   "name": "stlz001", "location": "westeurope",
+                   "properties": {"minimumTlsVersion": "[parameters('tls')]"}}],
+}
+
+TLS_POLICY = {
+    "id": "/providers/Microsoft.Authorization/policyDefinitions/tls12",
+    "name": "tls12",
+    "properties": {"displayName": "Storage accounts should use TLS 1.2",
+                   "policyType": "BuiltIn", "mode": "Indexed",
+                   "policyRule": {"if": {"allOf": [
+                       {"field": "type", "equals": "Microsoft.Storage/storageAccounts"},
+                       {"field": "Microsoft.Storage/storageAccounts/minimumTlsVersion",
+                        "notEquals": "TLS1_2"}]},
+                       "then": {"effect": "deny"}}}}
+
+
+@pytest.fixture
+def template(tmp_path, monkeypatch):
+    monkeypatch.setenv("POLICY_CATALOG_DIR", str(tmp_path / "catalog"))
+    with policy_catalog._LOCK:
+        policy_catalog._close()
+    path = tmp_path / "main.json"
+    path.write_text(json.dumps(TEMPLATE))
+    yield path
+    with policy_catalog._LOCK:
+        policy_catalog._close()
+
+
+def test_catalogo_vacio_no_da_la_revision_por_buena(template):
+    result = policy_tools.precheck_landing_zone(template=str(template))
+    assert result["status"] == "no_definitions"
+    assert result["resources"] == 1 and "summary" not in result
+
+
+def test_politicas_inexistentes(template):
+    result = policy_tools.precheck_landing_zone(["no-existe"], template=str(template))
+    assert result["status"] == "no_definitions"
+    assert result["missing"] == ["no-existe"]
+
+
+def test_con_catalogo_sincronizado(template, monkeypatch):
+    async def paginate(url, params=None, **kw):
+        yield TLS_POLICY
+    monkeypatch.setattr(arm_client, "paginate", paginate)
+    asyncio.run(policy_catalog.sync_catalog(force=True))
+
+    result = policy_tools.precheck_landing_zone(template=str(template))
+    assert result["status"] == "evaluated"
+    assert result["summary"] == {"violation": 1}
+
+
+def test_sin_azure_cli_devuelve_error(template, monkeypatch):
+    bicep = template.with_suffix(".bicep")
+    bicep.write_text("param tls string = 'TLS1_0'")
+    monkeypatch.setattr(policy_eval.shutil, "which", lambda name: None)
+    result = policy_tools.precheck_landing_zone(template=str(bicep))
+    assert result["status"] == "error" and "az" in result["error"]
+
+
+def test_bicep_que_no_compila_devuelve_error(template, monkeypatch):
+    bicep = template.with_suffix(".bicep")
+    bicep.write_text("param tls string = ")
+
+    def run(cmd, **kw):
+        raise subprocess.CalledProcessError(1, cmd, stderr="Error BCP009: Expected a literal value.\n")
+    monkeypatch.setattr(policy_eval.shutil, "which", lambda name: "/usr/bin/az")
+    monkeypatch.setattr(policy_eval.subprocess, "run", run)
+    result = policy_tools.precheck_landing_zone(template=str(bicep))
+    assert result["status"] == "error"
+    assert result["details"] == "Error BCP009: Expected a literal value."
+
+
+def test_plantilla_inexistente_devuelve_error(tmp_path):
+    result = policy_tools.precheck_landing_zone(template=str(tmp_path / "no.json"))
+    assert result["status"] == "error" and "no.json" in result["error"]
@@ -0,0 +1,155 @@
+"""Informe de políticas en streaming (`policy_report`): Markdown, JSON y memoria acotada."""
+
+import asyncio
+import json
+import os
+import sys
+import tracemalloc
+
+import httpx
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import arm_client, policy_report, policy_tools  # noqa: E402
+
+SUB = "/subscriptions/s1"
+
+
+def _definition(i, category="Storage", effect="Deny"):
+    return {"name": f"def-{i}", "properties": {
+        "displayName": f"Política {i} | con barra", "policyType": "BuiltIn",
+        "metadata": {"category": category},
+        "parameters": {"effect": {"defaultValue": effect}}}}
+
+
+def _assignment(i, scope=SUB):
+    return {"id": f"{scope}/providers/Microsoft.Authorization/policyAssignments/a{i}",
+            "name": f"a{i}", "properties": {
+                "displayName": f"Asignación {i}", "scope": scope,
+                "policyDefinitionId": f"/providers/Microsoft.Authorization/policyDefinitions/def-{i}"}}
+
+
+DEFINITIONS = [_definition(0), _definition(1), _definition(2, "Network", "Audit"),
+               {"name": "param", "properties": {"policyRule": {"then": {"effect": "[parameters('effect')]"}}}}]
+ASSIGNMENTS = [_assignment(0), _assignment(1), _assignment(2, f"{SUB}/resourceGroups/rg")]
+COMPLIANCE = [{"policyAssignmentId": ASSIGNMENTS[0]["id"].upper(), "resourceType": "x", "count": 4},
+              {"policyAssignmentId": ASSIGNMENTS[0]["id"], "resourceType": "y", "count": 1}]
+
+
+async def _agen(items):
+    for item in items:
+        await asyncio.sleep(0)
+        yield item
+
+
+def _write(tmp_path, fmt, definitions=DEFINITIONS, assignments=ASSIGNMENTS, compliance=COMPLIANCE):
+    path = tmp_path / f"report.{fmt}"
+    meta = asyncio.run(policy_report.write_policy_report(
+        definitions, assignments, path, fmt=fmt, compliance=compliance))
+    return path, meta
+
+
+def test_markdown(tmp_path):
+    path, meta = _write(tmp_path, "md", _agen(DEFINITIONS), _agen(ASSIGNMENTS))
+    text = path.read_text(encoding="utf-8")
+
+    assert (meta["definitions"], meta["assignments"], meta["scopes"], meta["nonCompliant"]) == (4, 3, 2, 5)
+    assert "- Definiciones: **4**" in text and "en 2 scopes" in text
+    assert "| Storage | 2 |" in text and "| Network | 1 |" in text and "| Sin categoría | 1 |" in text
+    assert "| Deny | 2 |" in text and "| (parámetro) | 1 |" in text
+    assert f"### `{SUB}/resourceGroups/rg`" in text
+    assert "| Asignación 0 | def-0 | Default | 5 |" in text
+    assert "| Asignación 1 | def-1 | Default | - |" in text
+    assert "Política 0 \\| con barra" in text
+    assert text.index(f"### `{SUB}`") < text.index(f"### `{SUB}/resourceGroups/rg`")
+
+
+def test_json(tmp_path):
+    path, meta = _write(tmp_path, "json", iter(DEFINITIONS), _agen(ASSIGNMENTS), _agen(COMPLIANCE))
+    doc = json.loads(path.read_text(encoding="utf-8"))
+
+    assert doc["summary"]["definitions"] == 4 and doc["summary"]["scopes"] == 2
+    assert doc["summary"]["nonCompliant"] == 5
+    assert doc["byCategory"] == {"Storage": 2, "Network": 1, "Sin categoría": 1}
+    assert [a["name"] for a in doc["assignmentsByScope"][SUB]] == ["Asignación 0", "Asignación 1"]
+    assert doc["assignmentsByScope"][SUB][0]["nonCompliant"] == 5
+    assert [d["name"] for d in doc["definitions"]] == ["def-0", "def-1", "def-2", "param"]
+
+
+def test_sin_cumplimiento_ni_entradas(tmp_path):
+    path, meta = _write(tmp_path, "json", [], [], None)
+    doc = json.loads(path.read_text(encoding="utf-8"))
+    assert doc["summary"]["nonCompliant"] is None
+    assert doc["assignmentsByScope"] == {} and doc["definitions"] == []
+
+
+def test_fallo_a_mitad_no_deja_informe(tmp_path):
+    async def broken():
+        yield _assignment(0)
+        raise httpx.HTTPError("503")
+
+    with pytest.raises(httpx.HTTPError):
+        _write(tmp_path, "md", DEFINITIONS, broken())
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_formato_no_valido(tmp_path):
+    with pytest.raises(ValueError):
+        _write(tmp_path, "html")
+
+
+def test_generate_lee_de_arm_en_streaming(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("SUBSCRIPTION_ID", "s1")
+    for var in ("TENANT_ID", "CLIENT_ID", "CLIENT_SECRET"):
+        monkeypatch.setenv(var, "x")
+    urls = []
+
+    def paginate(url, params=None, **kw):
+        urls.append(url)
+        return _agen(DEFINITIONS if url.endswith("policyDefinitions") else ASSIGNMENTS)
+    monkeypatch.setattr(arm_client, "paginate", paginate)
+
+    name = asyncio.run(policy_tools.generate_policy_report(fmt="json"))
+    doc = json.loads((tmp_path / "report" / name).read_text(encoding="utf-8"))
+    assert doc["summary"]["definitions"] == 4 and doc["summary"]["assignments"] == 3
+    assert all(u.startswith("/subscriptions/s1/providers/Microsoft.Authorization/") for u in urls)
+
+
+def test_generate_error_de_arm(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def broken():
+        raise httpx.HTTPError("401")
+        yield
+
+    assert asyncio.run(policy_tools.generate_policy_report(broken(), [], fmt="md")) == ""
+    assert not (tmp_path / "report" / "policy_report.md").exists()
+
+
+def _peak(tmp_path, n, fmt):
+    async def defs():
+        for i in range(n):
+            yield _definition(i, category=f"cat-{i % 20}")
+
+    async def assigns():
+        for i in range(n):
+            yield _assignment(i, f"{SUB}/resourceGroups/rg{i % 10}")
+
+    tracemalloc.start()
+    try:
+        asyncio.run(policy_report.write_policy_report(
+            defs(), assigns(), tmp_path / f"big-{n}.{fmt}", fmt=fmt))
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("fmt", ["md", "json"])
+def test_memoria_plana_con_muchas_entradas(tmp_path, fmt, monkeypatch):
+    monkeypatch.setattr(policy_report, "_SPOOL_BYTES", 4096)    # todas las secciones a disco
+    small = _peak(tmp_path, 6_000, fmt)
+    large = _peak(tmp_path, 24_000, fmt)
+    assert (tmp_path / f"big-24000.{fmt}").stat().st_size > 2_000_000
+    assert large < small * 1.1 + 32 * 1024       # 4× entradas, misma memoria
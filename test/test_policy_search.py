@@ -0,0 +1,100 @@
+"""Búsqueda BM25 sobre el catálogo de políticas y reindexado incremental."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import policy_catalog, policy_search  # noqa: E402
+
+
+def _entry(name, display, category, description="", parameters=(), effect="Audit", digest="1"):
+    return {"id": f"/providers/Microsoft.Authorization/policyDefinitions/{name}",
+            "displayName": display, "category": category, "description": description,
+            "parameters": list(parameters), "effect": effect, "version": "1.0.0",
+            "digest": digest}
+
+
+CATALOG = {
+    "storage-public": _entry("storage-public", "Storage accounts should disable public network access",
+                             "Storage", "Disabling public network access improves security.",
+                             ["effect"], effect="Deny"),
+    "storage-tls":    _entry("storage-tls", "Storage accounts should have the specified minimum TLS version",
+                             "Storage", "Configure a minimum TLS version.", ["minimumTlsVersion"]),
+    "kv-public":      _entry("kv-public", "Azure Key Vault should disable public network access",
+                             "Key Vault", "Disable public network access for your key vault."),
+    "locations":      _entry("locations", "Allowed locations", "General",
+                             "Restrict the locations your organization can deploy to.",
+                             ["listOfAllowedLocations"], effect="Deny"),
+}
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    state = {"version": 1.0, "entries": dict(CATALOG)}
+    monkeypatch.setattr(policy_catalog, "catalog_version", lambda: state["version"])
+    monkeypatch.setattr(policy_catalog, "entries", lambda: dict(state["entries"]))
+    monkeypatch.setattr(policy_search, "_INDEX", {
+        "digests": {}, "terms": {}, "postings": {}, "lengths": {}, "total": 0,
+        "docs": {}, "version": None})
+    return state
+
+
+def _names(hits):
+    return [h["name"] for h in hits]
+
+
+def test_ranking_bm25(catalog):
+    hits = policy_search.search("storage public network access", top_k=3)
+    assert _names(hits)[:2] == ["storage-public", "kv-public"]
+    assert hits[0]["score"] > hits[1]["score"] > 0
+    assert set(hits[0]) == {"name", "id", "displayName", "category", "effect", "version", "score"}
+
+
+def test_displayname_pesa_mas_que_la_descripcion(catalog):
+    catalog["entries"]["desc-only"] = _entry("desc-only", "Something else", "Other",
+                                             "Mentions key vault only in the description.")
+    assert _names(policy_search.search("key vault", top_k=2)) == ["kv-public", "desc-only"]
+
+
+def test_camelcase_en_parametros(catalog):
+    assert _names(policy_search.search("allowed locations", top_k=1)) == ["locations"]
+    assert _names(policy_search.search("tls version", top_k=1)) == ["storage-tls"]
+
+
+def test_filtros_y_consulta_vacia(catalog):
+    hits = policy_search.search("public network access", filters={"category": "storage"})
+    assert _names(hits) == ["storage-public"]
+    deny = policy_search.search("", top_k=10, filters={"effect": ["deny"]})
+    assert sorted(_names(deny)) == ["locations", "storage-public"]
+    assert policy_search.search("inexistente") == []
+
+
+def test_reindexado_incremental(catalog):
+    policy_search.search("storage")
+    tls_terms = policy_search._INDEX["terms"]["storage-tls"]
+
+    catalog["version"] = 2.0
+    catalog["entries"]["kv-public"] = _entry("kv-public", "Key Vault firewall should be enabled",
+                                             "Key Vault", digest="2")
+    del catalog["entries"]["locations"]
+    catalog["entries"]["cosmos"] = _entry("cosmos", "Cosmos DB should disable public network access",
+                                          "Cosmos DB")
+    with policy_search._LOCK:
+        stats = policy_search._refresh()
+
+    assert stats == {"added": 1, "updated": 1, "removed": 1}
+    assert policy_search._INDEX["terms"]["storage-tls"] is tls_terms     # no se rehízo
+    assert "allowed" not in policy_search._INDEX["postings"]
+    assert "firewall" in policy_search._INDEX["postings"]
+    assert _names(policy_search.search("cosmos public network", top_k=1)) == ["cosmos"]
+    assert "kv-public" not in _names(policy_search.search("public network access"))
+    assert policy_search.index_stats()["documents"] == 4
+
+
+def test_misma_version_no_relee_el_catalogo(catalog, monkeypatch):
+    policy_search.search("storage")
+    monkeypatch.setattr(policy_catalog, "entries", lambda: pytest.fail("no debe releer"))
+    assert _names(policy_search.search("storage", top_k=1))
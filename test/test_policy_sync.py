@@ -0,0 +1,87 @@
+"""Sincronización incremental de políticas (`policy_sync`) con ARM simulado."""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import arm_client, policy_sync  # noqa: E402
+
+SUB = "00000000-0000-0000-0000-000000000001"
+
+
+def _definition(name, effect="audit"):
+    return {"id": f"/subscriptions/{SUB}/providers/Microsoft.Authorization/policyDefinitions/{name}",
+            "name": name,
+            "properties": {"displayName": name, "policyType": "Custom", "mode": "All",
+                           "parameters": {"effect": {"type": "String", "defaultValue": effect}},
+                           "policyRule": {"if": {"field": "type", "equals": "x"},
+                                          "then": {"effect": "[parameters('effect')]"}}}}
+
+
+@pytest.fixture
+def arm(tmp_path, monkeypatch):
+    monkeypatch.setenv("POLICY_SYNC_DIR", str(tmp_path))
+    state = {"definitions": [_definition("a"), _definition("b")], "assignments": []}
+
+    async def paginate(url, params=None, **kw):
+        for doc in state["definitions" if url.endswith("policyDefinitions") else "assignments"]:
+            yield doc
+    monkeypatch.setattr(arm_client, "paginate", paginate)
+    return state
+
+
+def test_diff_y_changelog(arm):
+    first = asyncio.run(policy_sync.sync_policies(SUB))
+    assert first["since"] is None
+    assert first["counts"]["definitions"]["added"] == 2
+
+    arm["definitions"] = [_definition("a", effect="deny"), _definition("c")]
+    second = asyncio.run(policy_sync.sync_policies(SUB))
+    assert second["counts"]["definitions"] == {"added": 1, "removed": 1, "modified": 1}
+    modified = second["definitions"]["modified"][0]
+    assert modified["changes"]["effect"] == {"before": "audit", "after": "deny"}
+
+    yesterday = datetime.now(timezone.utc) - timedelta(days=1)
+    assert len(policy_sync.changelog(yesterday)) == 1                     # con zona
+    assert len(policy_sync.changelog(yesterday.replace(tzinfo=None))) == 1  # naive (UTC)
+    madrid = timezone(timedelta(hours=2))
+    assert policy_sync.changelog(datetime.now(madrid) + timedelta(minutes=5)) == []
+    assert policy_sync.changelog(subscription_id="otra") == []
+
+
+def test_builtin_desde_el_catalogo_sin_forzar(arm, monkeypatch):
+    calls, opened = [], []
+    builtin = {"id": "/providers/Microsoft.Authorization/policyDefinitions/tls",
+               "name": "tls", "properties": {"displayName": "TLS", "policyType": "BuiltIn",
+                                             "version": "1.0.0"}}
+    catalog = {"tls": {"id": builtin["id"], "digest": "d1"}}
+
+    async def sync_catalog(**kw):
+        calls.append(kw)
+        return {"skipped": "catálogo vigente"}
+
+    def lookup(name):
+        opened.append(name)
+        return builtin
+
+    monkeypatch.setattr(policy_sync.policy_catalog, "sync_catalog", sync_catalog)
+    monkeypatch.setattr(policy_sync.policy_catalog, "entries", lambda: dict(catalog))
+    monkeypatch.setattr(policy_sync.policy_catalog, "lookup", lookup)
+
+    first = asyncio.run(policy_sync.sync_policies(SUB, include_builtin=True))
+    assert first["counts"]["definitions"]["added"] == 3
+    second = asyncio.run(policy_sync.sync_policies(SUB, include_builtin=True))
+    assert second["counts"]["definitions"] == {"added": 0, "removed": 0, "modified": 0}
+    assert opened == ["tls"]                     # digest igual: no se vuelve a abrir
+
+    builtin["properties"]["version"] = "1.1.0"
+    catalog["tls"] = {"id": builtin["id"], "digest": "d2"}
+    third = asyncio.run(policy_sync.sync_policies(SUB, include_builtin=True))
+    assert third["definitions"]["modified"][0]["changes"]["version"] == \
+        {"before": "1.0.0", "after": "1.1.0"}
+    assert calls == [{}, {}, {}]                 # nunca force=True
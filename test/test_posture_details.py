@@ -0,0 +1,97 @@
+"""`posture_tools.get_recommendation_details` con ARM simulado."""
+
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import arm_client, posture_tools  # noqa: E402
+
+
+def _assessment(rid, severity="High"):
+    return {"name": rid, "properties": {"displayName": f"Rec {rid}",
+                                        "status": {"code": "Unhealthy"},
+                                        "metadata": {"severity": severity, "category": "Compute"}}}
+
+
+def _sub_assessment(n, status="Unhealthy"):
+    rid = f"/subscriptions/s1/resourceGroups/rg/providers/Microsoft.Compute/virtualMachines/vm{n}"
+    return {"properties": {"resourceDetails": {"id": rid}, "status": {"code": status}}}
+
+
+@pytest.fixture
+def arm(monkeypatch):
+    for var in ("TENANT_ID", "CLIENT_ID", "CLIENT_SECRET", "SUBSCRIPTION_ID"):
+        monkeypatch.setenv(var, "s1")
+    calls = {"get": [], "paginate": [], "cancelled": 0}
+
+    async def get_json(url, params=None, **kw):
+        rid = url.rsplit("/", 1)[-1]
+        calls["get"].append(rid)
+        if rid == "roto":
+            await asyncio.sleep(0.02)               # la paginación ya ha empezado
+            raise httpx.HTTPError("500 Internal Server Error")
+        return _assessment(rid)
+
+    async def paginate(url, params=None, **kw):
+        rid = url.split("/assessments/")[1].split("/")[0]
+        calls["paginate"].append(rid)
+        try:
+            for n in range(12):
+                await asyncio.sleep(0.01 if rid == "roto" else 0)
+                yield _sub_assessment(n, "Healthy" if n % 3 == 0 else "Unhealthy")
+        except (asyncio.CancelledError, GeneratorExit):
+            calls["cancelled"] += 1
+            raise
+
+    monkeypatch.setattr(arm_client, "get_json", get_json)
+    monkeypatch.setattr(arm_client, "paginate", paginate)
+    return calls
+
+
+def test_agrupa_y_no_repite_ids(arm):
+    rows = [{"id": "a", "subscriptionId": "s1"}, {"id": "a", "subscriptionId": "s1"}, "a", "b"]
+    result = asyncio.run(posture_tools.get_recommendation_details(rows, sample_size=2))
+    assert sorted(arm["get"]) == ["a", "b"]
+    assert sorted(arm["paginate"]) == ["a", "b"]
+    detail = result["results"][0]
+    assert detail["affected"]["total"] == 12
+    groups = {g["status"]: g for g in detail["affected"]["byTypeAndStatus"]}
+    assert groups["Unhealthy"]["count"] == 8 and len(groups["Unhealthy"]["sample"]) == 2
+
+
+def test_fallo_del_assessment_cancela_la_paginacion(arm):
+    result = asyncio.run(posture_tools.get_recommendation_details(["roto"]))
+    assert result["errors"] == [{"subscription": "s1", "id": "roto",
+                                 "error": "500 Internal Server Error"}]
+    assert arm["cancelled"] == 1
+
+
+def test_sin_credenciales_es_un_error_por_id(arm, monkeypatch):
+    monkeypatch.delenv("SUBSCRIPTION_ID")
+    result = asyncio.run(posture_tools.get_recommendation_details(
+        ["a", {"id": "b", "subscriptionId": "s2"}]))
+    [error] = result["errors"]
+    assert (error["subscription"], error["id"]) == (None, "a")
+    assert "SUBSCRIPTION_ID" in error["error"]
+    assert [r["id"] for r in result["results"]] == ["b"]
+
+
+def test_mismo_id_en_dos_suscripciones_no_pisa_errores(arm, monkeypatch):
+    async def get_json(url, params=None, **kw):
+        arm["get"].append(url)
+        if url.startswith("/subscriptions/s2/"):
+            raise httpx.HTTPError("403 Forbidden")
+        return _assessment(url.rsplit("/", 1)[-1])
+    monkeypatch.setattr(arm_client, "get_json", get_json)
+
+    result = asyncio.run(posture_tools.get_recommendation_details(
+        [{"id": "a", "subscriptionId": "s1"}, {"id": "a", "subscriptionId": "s2"},
+         {"id": "a", "subscriptionId": "s3"}]))
+    assert len(arm["get"]) == 3
+    assert [r["id"] for r in result["results"]] == ["a", "a"]
+    assert result["errors"] == [{"subscription": "s2", "id": "a", "error": "403 Forbidden"}]
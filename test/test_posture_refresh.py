@@ -0,0 +1,98 @@
+"""Refresco incremental (`refresh_posture`) frente a un snapshot completo."""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import posture_store, posture_tools, resource_graph  # noqa: E402
+
+SUB = "sub1"
+
+
+def _row(n, status="Unhealthy", severity="High"):
+    return {"id": f"a{n}", "name": f"Rec {n}", "category": "Compute", "severity": severity,
+            "status": status, "resourceId": f"/subscriptions/{SUB}/r/{n}",
+            "subscriptionId": SUB}
+
+
+BEFORE = [_row(0), _row(1), _row(2), _row(3), _row(4),
+          _row(5, "NotApplicable"), _row(6, "Healthy")]
+AFTER = [_row(0, "Healthy"),                      # resuelto
+         _row(1, "NotApplicable"),                # deja de aplicar: también resuelto
+         _row(2, severity="Low"),                 # cambia la severidad
+         _row(4),                                 # sin cambios (a3: recurso borrado)
+         _row(5),                                 # pasa a Unhealthy
+         _row(6, "Healthy"),
+         _row(7)]                                 # nuevo
+CHANGED = {"a0", "a1", "a2", "a5", "a7"}
+
+
+@pytest.fixture
+def azure(tmp_path, monkeypatch):
+    world = {"rows": BEFORE, "deleted": []}
+
+    async def query(kql, subscriptions=None, **kw):
+        if kql.startswith("resourcechanges"):
+            rows = [{"targetId": rid.lower()} for rid in world["deleted"]]
+        else:
+            rows = world["rows"]
+            if "statusChangeDate" in kql:
+                rows = [r for r in rows if r["id"] in CHANGED]
+            if "status in ('Unhealthy')" in kql:
+                rows = [r for r in rows if r["status"] == "Unhealthy"]
+            elif "status != 'Healthy'" in kql:
+                rows = [r for r in rows if r["status"] != "Healthy"]
+        for row in rows:
+            yield dict(row)
+
+    async def score(sub):
+        return {"currentScore": 5, "maxScore": 10, "percentageScore": 50.0}
+
+    async def controls(sub):
+        return []
+
+    monkeypatch.setattr(resource_graph, "query", query)
+    monkeypatch.setattr(posture_tools, "_secure_score", score)
+    monkeypatch.setattr(posture_tools, "_score_controls", controls)
+
+    def use_store(name):
+        if posture_store._DB is not None:
+            posture_store._DB.close()
+        monkeypatch.setenv("POSTURE_STORE_DIR", str(tmp_path / name))
+        posture_store._DB = None
+
+    world["use_store"] = use_store
+    yield world
+    if posture_store._DB is not None:
+        posture_store._DB.close()
+    posture_store._DB = None
+
+
+def _open_set():
+    return {(f["id"], f["severity"]) for f in posture_store.latest_findings(SUB).values()}
+
+
+def test_delta_y_snapshot_completo_coinciden(azure):
+    azure["use_store"]("incremental")
+    first = asyncio.run(posture_tools.refresh_posture([SUB]))
+    assert first["full"][0]["findings"] == 5         # NotApplicable no es un hallazgo
+    assert _open_set() == {(f"a{n}", "High") for n in range(5)}
+
+    azure["rows"] = AFTER
+    azure["deleted"] = [f"/subscriptions/{SUB}/r/3"]
+    delta = asyncio.run(posture_tools.refresh_posture([SUB]))["deltas"][0]
+    incremental = _open_set()
+
+    azure["use_store"]("completo")
+    asyncio.run(posture_tools.record_posture_snapshot([SUB]))
+    assert incremental == _open_set() == {("a2", "Low"), ("a4", "High"),
+                                          ("a5", "High"), ("a7", "High")}
+
+    assert delta["counts"] == {"added": 2, "resolved": 3, "changed": 1}
+    assert {f["id"]: f["status"] for f in delta["resolved"]} == {
+        "a0": "Healthy", "a1": "NotApplicable", "a3": "ResourceDeleted"}
+    assert delta["changed"][0]["before"] == {"severity": "High", "status": "Unhealthy"}
@@ -0,0 +1,65 @@
+"""Histórico de postura (`posture_store`) y su captura desde `posture_tools`."""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import posture_store, posture_tools, resource_graph  # noqa: E402
+
+SUB = "sub1"
+SCORE = {"currentScore": 5, "maxScore": 10, "percentageScore": 50.0}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("POSTURE_STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(posture_store, "_DB", None)
+    yield tmp_path
+    if posture_store._DB is not None:
+        posture_store._DB.close()
+
+
+def _finding(n, severity="High"):
+    return {"id": f"a{n}", "name": f"Rec {n}", "category": "Compute", "severity": severity,
+            "resourceId": f"/r/{n}", "status": "Unhealthy"}
+
+
+def test_reabierto_vuelve_a_ser_nuevo(store):
+    day = 86400
+    t0 = time.time() - 10 * day
+    posture_store.save_snapshot(SUB, SCORE, [], [_finding(1), _finding(2)], taken_at=t0)
+    posture_store.save_snapshot(SUB, SCORE, [], [_finding(2)], taken_at=t0 + day)
+    posture_store.save_snapshot(SUB, SCORE, [], [_finding(1), _finding(2)], taken_at=t0 + 2 * day)
+
+    recent = posture_store.new_findings(t0 + 1.5 * day)
+    assert [f["id"] for f in recent] == ["a1"]
+    assert recent[0]["reopened"] is True
+    assert {f["id"] for f in posture_store.new_findings(t0 - 1)} == {"a1", "a2"}
+
+
+def test_snapshot_solo_guarda_unhealthy(store, monkeypatch):
+    queries = []
+
+    async def query(kql, subscriptions=None, **kw):
+        queries.append(kql)
+        for row in ({**_finding(1), "subscriptionId": SUB},):
+            yield row
+
+    async def score(sub):
+        return SCORE
+
+    async def controls(sub):
+        return []
+
+    monkeypatch.setattr(resource_graph, "query", query)
+    monkeypatch.setattr(posture_tools, "_secure_score", score)
+    monkeypatch.setattr(posture_tools, "_score_controls", controls)
+    result = asyncio.run(posture_tools.record_posture_snapshot([SUB]))
+    assert result["saved"][0]["findings"] == 1
+    assert "| where status in ('Unhealthy')" in queries[0]
+    assert "status != 'Healthy'" not in queries[0]
@@ -0,0 +1,90 @@
+"""Consultas a Resource Graph (`resource_graph.query`) con un transporte ARM simulado."""
+
+import asyncio
+import json
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import arm_client, resource_graph  # noqa: E402
+
+PAGES, PER_PAGE = 3, 3
+
+
+def _handler(bodies):
+    """Resource Graph falso: PAGES páginas de PER_PAGE filas enlazadas por $skipToken."""
+    def handler(request):
+        assert request.method == "POST"
+        assert request.url.path == "/providers/Microsoft.ResourceGraph/resources"
+        body = json.loads(request.content)
+        bodies.append(body)
+        page = int(body["options"].get("$skipToken", "p1")[1:])
+        doc = {"data": [{"id": f"{page}-{i}"} for i in range(PER_PAGE)],
+               "count": PER_PAGE, "totalRecords": PAGES * PER_PAGE}
+        if page < PAGES:
+            doc["$skipToken"] = f"p{page + 1}"
+        return httpx.Response(200, json=doc)
+    return handler
+
+
+def _query(max_rows=None, take=None, **kw):
+    bodies = []
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        client = httpx.AsyncClient(transport=httpx.MockTransport(_handler(bodies)))
+        arm_client._LOOPS[loop] = {"client": client, "sems": {}}
+        try:
+            rows = []
+            async for row in resource_graph.query("resources | project id", max_rows=max_rows, **kw):
+                rows.append(row["id"])
+                if take and len(rows) == take:
+                    break
+            await asyncio.sleep(0.05)
+            return rows
+        finally:
+            await client.aclose()
+    return asyncio.run(main()), bodies
+
+
+@pytest.fixture(autouse=True)
+def token():
+    arm_client.set_token_provider(lambda: "fake")
+    yield
+    arm_client.set_token_provider(None)
+
+
+def test_sigue_skip_token():
+    rows, bodies = _query(subscriptions=["s1", "s2"], page_size=5000)
+    assert rows == [f"{p}-{i}" for p in range(1, PAGES + 1) for i in range(PER_PAGE)]
+    assert [b["options"].get("$skipToken") for b in bodies] == [None, "p2", "p3"]
+    assert all(b["subscriptions"] == ["s1", "s2"] for b in bodies)
+    assert bodies[0]["options"] == {"resultFormat": "objectArray", "$top": 1000}
+    assert "managementGroups" not in bodies[0]
+
+
+def test_max_rows_corta_dentro_de_una_pagina():
+    rows, bodies = _query(max_rows=5, management_groups=["lz"])
+    assert rows == ["1-0", "1-1", "1-2", "2-0", "2-1"]
+    assert len(bodies) == 2                        # la página 3 ya no se pide
+    assert bodies[0]["managementGroups"] == ["lz"] and "subscriptions" not in bodies[0]
+
+
+def test_max_rows_en_el_borde_de_pagina_no_precarga():
+    rows, bodies = _query(max_rows=PER_PAGE)
+    assert rows == ["1-0", "1-1", "1-2"]
+    assert len(bodies) == 1
+
+
+def test_corte_del_consumidor_cancela_la_precarga():
+    rows, bodies = _query(take=2)
+    assert rows == ["1-0", "1-1"]
+    assert len(bodies) <= 2
+
+
+def test_kql_string_escapa():
+    assert resource_graph.kql_string("it's a\\b") == "'it\\'s a\\\\b'"
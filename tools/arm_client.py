@@ -0,0 +1,222 @@
+"""
+arm_client.py
+────────────────────────────────────────────────────────────────────────
+Cliente asíncrono compartido para Azure Resource Manager, usado por todas
+las herramientas de Azure (policy_tools, posture_tools, …).
+
+• request()                 – petición ARM con reintentos y límites
+• get_json()                – GET + raise_for_status + JSON
+• paginate()                – itera todos los items siguiendo `nextLink`
+                              (precargando la página siguiente)
+• get_client_stats()        – peticiones, reintentos, throttling, esperas
+• set_token_provider()      – sustituye el origen del token (pruebas, ARM falso)
+
+Qué aporta frente a `requests.get` suelto:
+  – un `httpx.AsyncClient` por event loop con pool de conexiones keep‑alive
+  – timeout por llamada (ARM_TIMEOUT por defecto)
+  – reintentos con backoff exponencial con jitter ante 429/5xx y errores
+    de transporte, respetando `Retry-After` cuando viene
+  – frenado preventivo cuando `x-ms-ratelimit-remaining-*` se acerca a 0
+  – como mucho ARM_MAX_CONCURRENCY_PER_SUB peticiones en vuelo por
+    suscripción
+
+`ARM_ENDPOINT` permite apuntarlo a un servidor ARM falso en local y
+`ARM_TOKEN` (o `set_token_provider`) evita pedir un token real a Azure AD.
+
+Variables de entorno (todas opcionales):
+    ARM_ENDPOINT                 def. https://management.azure.com
+    ARM_TOKEN                    token fijo en lugar de azure_auth.get_token()
+    ARM_POOL_SIZE                conexiones del pool (def. 50)
+    ARM_TIMEOUT                  segundos por llamada (def. 30)
+    ARM_MAX_RETRIES              reintentos por petición (def. 4)
+    ARM_MAX_CONCURRENCY_PER_SUB  peticiones simultáneas por suscripción (def. 8)
+    ARM_LOW_WATERMARK            cupo restante bajo el que se frena (def. 20)
+────────────────────────────────────────────────────────────────────────
+"""
+from __future__ import annotations
+import os, re, time, random, asyncio, weakref
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, AsyncIterator, Callable
+
+import httpx
+
+from tools.azure_auth import get_token
+
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+_SUB_RE = re.compile(r"/subscriptions/([^/?]+)", re.IGNORECASE)
+
+_LOOPS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = \
+    weakref.WeakKeyDictionary()
+_PAUSE_UNTIL: dict[str, float] = {}
+_STATS: dict[str, float] = {"requests": 0, "retries": 0, "throttled": 0,
+                            "transport_errors": 0, "slept_s": 0.0}
+_TOKEN_PROVIDER: dict[str, Callable[[], str] | None] = {"fn": None}
+
+
+def _endpoint() -> str:
+    return os.getenv("ARM_ENDPOINT", "https://management.azure.com").rstrip("/")
+
+
+def _token() -> str:
+    """Token del proveedor inyectado, de `ARM_TOKEN` o de `azure_auth` (bloqueante)."""
+    provider = _TOKEN_PROVIDER["fn"]
+    if provider is not None:
+        return provider()
+    return os.getenv("ARM_TOKEN") or get_token()
+
+
+def set_token_provider(provider: Callable[[], str] | None) -> None:
+    """Usa `provider()` como origen del token Bearer; None vuelve al de `azure_auth`."""
+    _TOKEN_PROVIDER["fn"] = provider
+
+
+def _state() -> Dict[str, Any]:
+    """Cliente y semáforos del event loop actual (se crean al primer uso)."""
+    loop  = asyncio.get_running_loop()
+    state = _LOOPS.get(loop)
+    if state is None or state["client"].is_closed:
+        pool = int(os.getenv("ARM_POOL_SIZE", "50"))
+        state = {"client": httpx.AsyncClient(
+                     limits=httpx.Limits(max_connections=pool,
+                                         max_keepalive_connections=pool),
+                     headers={"Accept-Encoding": "gzip, deflate"}),
+                 "sems": {}}
+        _LOOPS[loop] = state
+    return state
+
+
+def _semaphore(key: str) -> asyncio.Semaphore:
+    sems = _state()["sems"]
+    if key not in sems:
+        sems[key] = asyncio.Semaphore(int(os.getenv("ARM_MAX_CONCURRENCY_PER_SUB", "8")))
+    return sems[key]
+
+
+def _retry_after(rsp: httpx.Response) -> float | None:
+    """`Retry-After` en segundos o como fecha HTTP."""
+    value = rsp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def _backoff(attempt: int) -> float:
+    """Exponencial con jitter completo: U(0, min(30, 0.5·2^n)), mínimo 0.1 s."""
+    return max(0.1, random.uniform(0, min(30.0, 0.5 * 2 ** attempt)))
+
+
+def _note_quota(key: str, rsp: httpx.Response) -> None:
+    """Frena la suscripción si alguna cabecera x-ms-ratelimit-remaining-* está baja."""
+    low = int(os.getenv("ARM_LOW_WATERMARK", "20"))
+    remaining = [int(v) for k, v in rsp.headers.items()
+                 if k.lower().startswith("x-ms-ratelimit-remaining-") and v.isdigit()]
+    if remaining and min(remaining) < low:
+        _PAUSE_UNTIL[key] = time.time() + (low - min(remaining)) * 0.1
+
+
+async def _sleep(seconds: float) -> None:
+    _STATS["slept_s"] += seconds
+    await asyncio.sleep(seconds)
+
+
+async def request(method: str, url: str, *, params: Dict[str, Any] | None = None,
+                  json: Any = None, timeout: float | None = None) -> httpx.Response:
+    """
+    Petición a ARM.  `url` puede ser una ruta (`/subscriptions/…`) o una URL
+    completa (p.ej. un `nextLink`).  Devuelve la última respuesta sin
+    `raise_for_status`; los errores de transporte se relanzan tras agotar
+    los reintentos.
+    """
+    if url.startswith("/"):
+        url = _endpoint() + url
+    m   = _SUB_RE.search(url)
+    key = m.group(1).lower() if m else "tenant"
+    timeout = timeout or float(os.getenv("ARM_TIMEOUT", "30"))
+    retries = int(os.getenv("ARM_MAX_RETRIES", "4"))
+
+    async with _semaphore(key):
+        for attempt in range(retries + 1):
+            pause = _PAUSE_UNTIL.get(key, 0) - time.time()
+            if pause > 0:
+                await _sleep(pause)
+
+            token = await asyncio.to_thread(_token)
+            _STATS["requests"] += 1
+            try:
+                rsp = await _state()["client"].request(
+                    method, url, params=params, json=json, timeout=timeout,
+                    headers={"Authorization": f"Bearer {token}",
+                             "Content-Type": "application/json"})
+            except httpx.TransportError:
+                _STATS["transport_errors"] += 1
+                if attempt == retries:
+                    raise
+                _STATS["retries"] += 1
+                await _sleep(_backoff(attempt))
+                continue
+
+            _note_quota(key, rsp)
+            if rsp.status_code not in _RETRY_STATUS or attempt == retries:
+                return rsp
+
+            if rsp.status_code == 429:
+                _STATS["throttled"] += 1
+            _STATS["retries"] += 1
+            delay = _retry_after(rsp)
+            await _sleep(delay if delay is not None else _backoff(attempt))
+    return rsp
+
+
+async def get_json(url: str, params: Dict[str, Any] | None = None,
+                   timeout: float | None = None) -> Dict[str, Any]:
+    """GET a ARM; lanza `httpx.HTTPStatusError` si la respuesta no es 2xx."""
+    rsp = await request("GET", url, params=params, timeout=timeout)
+    rsp.raise_for_status()
+    return rsp.json()
+
+
+async def _page(method: str, url: str, params: Dict[str, Any] | None,
+                timeout: float | None) -> Dict[str, Any]:
+    rsp = await request(method, url, params=params, timeout=timeout)
+    rsp.raise_for_status()
+    return rsp.json()
+
+
+async def paginate(url: str, params: Dict[str, Any] | None = None,
+                   timeout: float | None = None, next_key: str = "nextLink",
+                   method: str = "GET") -> AsyncIterator[Dict[str, Any]]:
+    """
+    Genera los items de `value` de todas las páginas.  La página siguiente
+    (`next_key`, que ya incluye api-version y filtros) se pide mientras se
+    consume la actual; si el consumidor corta antes, se cancela.  `method`
+    es POST para las consultas que lo exigen también en el enlace siguiente
+    (p.ej. Policy Insights `queryResults`).
+    """
+    page = await _page(method, url, params, timeout)
+    while True:
+        nxt  = page.get(next_key)
+        task = asyncio.create_task(_page(method, nxt, None, timeout)) if nxt else None
+
+        consumed = False
+        try:
+            for item in page.get("value", []):
+                yield item
+            consumed = True
+        finally:
+            if task and not consumed:
+                task.cancel()
+
+        if task is None:
+            return
+        page = await task
+
+
+def get_client_stats() -> Dict[str, Any]:
+    """Contadores del cliente ARM del proceso."""
+    return {**_STATS, "slept_s": round(_STATS["slept_s"], 2)}
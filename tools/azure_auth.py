@@ -0,0 +1,135 @@
+"""
+azure_auth.py
+────────────────────────────────────────────────────────────────────────
+Proveedor único de tokens de Azure AD para todas las herramientas que
+llaman a Azure Resource Manager (policy_tools, posture_tools, …).
+
+• get_token()               – token válido para un scope (ARM por defecto)
+• get_token_stats()         – adquisiciones, aciertos de caché, refrescos
+
+Un solo `ClientSecretCredential` por proceso (se recrea sólo si cambian
+las variables), un lock para que llamadas concurrentes no disparen varias
+peticiones al endpoint de identidad, y un temporizador que renueva el
+token en segundo plano antes de que caduque (`expires_on` es un epoch).
+
+azure-identity devuelve su token en caché hasta `refresh_on` o hasta los
+últimos 5 min de vida, así que el refresco se programa dentro de esa
+ventana (antes no traería un token nuevo) y el margen con el que se deja
+de entregar un token es menor, para que las llamadas normales no lleguen
+a esperar al endpoint.  Sólo cuenta como adquisición un `expires_on` nuevo.
+
+Requiere en .env (o variables de entorno a runtime):
+
+    TENANT_ID            AAD tenant
+    CLIENT_ID            App registration
+    CLIENT_SECRET        Secreto de la app
+────────────────────────────────────────────────────────────────────────
+"""
+from __future__ import annotations
+import os, time, threading
+from typing import Dict, Any
+from dotenv import load_dotenv
+import azure.identity
+from azure.core.credentials import AccessTokenInfo
+
+load_dotenv()
+
+ARM_SCOPE = "https://management.azure.com/.default"
+
+_MARGIN_S         = 120     # un token a < 2 min de caducar ya no se entrega
+_REFRESH_OFFSET_S = 300     # azure-identity: DEFAULT_REFRESH_OFFSET
+_RETRY_S          = 30      # azure-identity: DEFAULT_TOKEN_REFRESH_RETRY_DELAY
+
+_LOCK = threading.Lock()
+_CREDENTIAL: dict[str, Any] = {"key": None, "value": None}
+_TOKENS: dict[str, AccessTokenInfo] = {}
+_TIMERS: dict[str, threading.Timer] = {}
+_STATS: dict[str, int] = {"acquisitions": 0, "cache_hits": 0,
+                          "background_refreshes": 0, "errors": 0}
+
+
+def _credential() -> azure.identity.ClientSecretCredential:
+    """Credencial del proceso; se recrea si cambian las variables.  Con `_LOCK`."""
+    tenant  = os.getenv("TENANT_ID")
+    client  = os.getenv("CLIENT_ID")
+    secret  = os.getenv("CLIENT_SECRET")
+    if not all([tenant, client, secret]):
+        raise EnvironmentError(
+            "Faltan TENANT_ID, CLIENT_ID o CLIENT_SECRET en variables de entorno")
+
+    key = (tenant, client, hash(secret))
+    if _CREDENTIAL["key"] != key:
+        _CREDENTIAL["key"]   = key
+        _CREDENTIAL["value"] = azure.identity.ClientSecretCredential(
+            tenant_id=tenant, client_id=client, client_secret=secret)
+        _TOKENS.clear()
+    return _CREDENTIAL["value"]
+
+
+def _valid(token: AccessTokenInfo | None) -> bool:
+    return token is not None and token.expires_on - _MARGIN_S > time.time()
+
+
+def _refresh_at(token: AccessTokenInfo) -> float:
+    """Primer instante en que la credencial pide de verdad un token nuevo."""
+    at = token.expires_on - _REFRESH_OFFSET_S
+    if token.refresh_on:
+        at = min(at, token.refresh_on)
+    return at + 5
+
+
+def _schedule(scope: str, when: float) -> None:
+    """(Re)programa el refresco en segundo plano de `scope`.  Con `_LOCK`."""
+    if scope in _TIMERS:
+        _TIMERS[scope].cancel()
+    timer = threading.Timer(max(when - time.time(), 1), _background_refresh, args=(scope,))
+    timer.daemon = True
+    timer.start()
+    _TIMERS[scope] = timer
+
+
+def _acquire(scope: str) -> tuple[AccessTokenInfo, bool]:
+    """
+    Pide el token a la credencial y dice si es nuevo (otro `expires_on`);
+    sólo entonces cuenta y programa el siguiente refresco.  Con `_LOCK`.
+    """
+    token    = _credential().get_token_info(scope)
+    previous = _TOKENS.get(scope)
+    fresh    = previous is None or token.expires_on != previous.expires_on
+    _TOKENS[scope] = token
+    if fresh:
+        _STATS["acquisitions"] += 1
+        _schedule(scope, _refresh_at(token))
+    return token, fresh
+
+
+def _background_refresh(scope: str) -> None:
+    with _LOCK:
+        try:
+            token, fresh = _acquire(scope)
+        except Exception:
+            # el siguiente get_token() lo reintentará de forma síncrona
+            _STATS["errors"] += 1
+            token, fresh = _TOKENS.get(scope), False
+        if fresh:
+            _STATS["background_refreshes"] += 1
+        elif token is not None and token.expires_on - _MARGIN_S > time.time() + _RETRY_S:
+            _schedule(scope, time.time() + _RETRY_S)   # mismo token: se reintenta
+
+
+def get_token(scope: str = ARM_SCOPE) -> str:
+    """Devuelve un token válido para `scope` (caché compartida por el proceso)."""
+    with _LOCK:
+        token = _TOKENS.get(scope)
+        if _valid(token):
+            _STATS["cache_hits"] += 1
+            return token.token
+        return _acquire(scope)[0].token
+
+
+def get_token_stats() -> Dict[str, Any]:
+    """Contadores del proveedor y segundos que le quedan a cada token."""
+    now = time.time()
+    with _LOCK:
+        return {**_STATS,
+                "tokens": {scope: round(tok.expires_on - now) for scope, tok in _TOKENS.items()}}
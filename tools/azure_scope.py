@@ -0,0 +1,150 @@
+"""
+azure_scope.py
+────────────────────────────────────────────────────────────────────────
+Alcance de las herramientas de Azure: una suscripción, una lista, un
+grupo de administración o todas las suscripciones accesibles, y reparto
+de una llamada por suscripción con concurrencia acotada.
+
+Formas de `scope`:
+    None / ""                       SUBSCRIPTION_ID del entorno
+    "all" / "*"                     todas las suscripciones accesibles
+    "mg:<nombre>" o el ID completo
+    /providers/Microsoft.Management/managementGroups/<nombre>
+                                    suscripciones descendientes del grupo
+    "sub1,sub2" o ["sub1", "sub2"]  lista explícita
+
+• resolve_subscriptions()   – scope → lista de IDs (caché 10 min)
+• management_group()        – nombre del grupo si el scope es uno
+• graph_scope()             – argumentos de alcance para Resource Graph
+• fan_out()                 – genera (sub, resultado | excepción) según
+                              terminan, cortando al llegar al timeout
+• partial_summary()         – campos comunes de las respuestas agregadas
+────────────────────────────────────────────────────────────────────────
+"""
+from __future__ import annotations
+import os, time, asyncio
+from typing import Dict, List, Any, AsyncIterator, Awaitable, Callable, Optional, Tuple, Union
+
+from tools import arm_client
+
+Scope = Union[str, List[str], None]
+
+_CACHE_TTL_S = 600
+_RESOLVED: dict[str, Tuple[float, List[str]]] = {}
+
+
+def management_group(scope: Scope) -> Optional[str]:
+    if not isinstance(scope, str):
+        return None
+    if scope.lower().startswith("mg:"):
+        return scope[3:]
+    marker = "/managementgroups/"
+    if marker in scope.lower():
+        return scope[scope.lower().index(marker) + len(marker):].strip("/")
+    return None
+
+
+async def resolve_subscriptions(scope: Scope = None) -> List[str]:
+    """
+    Lista de suscripciones del scope (ver formas en el módulo).
+
+    Raises:
+        EnvironmentError: Sin scope y sin SUBSCRIPTION_ID.
+        ValueError: El scope no contiene ninguna suscripción (p. ej. un
+            grupo vacío); así nadie cae sin querer en una consulta a todo
+            el tenant.
+    """
+    if isinstance(scope, (list, tuple)):
+        return _non_empty(scope, [s for s in scope if s])
+    if not scope:
+        sub = os.getenv("SUBSCRIPTION_ID")
+        if not sub:
+            raise EnvironmentError("Falta SUBSCRIPTION_ID en variables de entorno")
+        return [sub]
+    if "," in scope:
+        return _non_empty(scope, [s.strip() for s in scope.split(",") if s.strip()])
+
+    group = management_group(scope)
+    if group is None and scope not in ("all", "*"):
+        return [scope]
+
+    key = scope.lower()
+    cached = _RESOLVED.get(key)
+    if cached and time.time() - cached[0] < _CACHE_TTL_S:
+        return cached[1]
+
+    if group is None:
+        subs = [s["subscriptionId"] async for s in arm_client.paginate(
+                    "/subscriptions", params={"api-version": "2022-12-01"})
+                if s.get("state", "Enabled") == "Enabled"]
+    else:
+        subs = [d["name"] async for d in arm_client.paginate(
+                    f"/providers/Microsoft.Management/managementGroups/{group}/descendants",
+                    params={"api-version": "2020-05-01"})
+                if d.get("type", "").lower() == "/subscriptions"]   # ManagementGroupChildType
+    _RESOLVED[key] = (time.time(), _non_empty(scope, subs))
+    return subs
+
+
+def _non_empty(scope: Scope, subs: List[str]) -> List[str]:
+    if not subs:
+        raise ValueError(f"El scope {scope!r} no contiene ninguna suscripción")
+    return subs
+
+
+async def graph_scope(scope: Scope = None) -> Dict[str, List[str]]:
+    """Resource Graph ya consulta varias suscripciones o un grupo de una vez."""
+    group = management_group(scope)
+    if group:
+        return {"management_groups": [group]}
+    if scope in ("all", "*"):
+        return {}                                  # todas las accesibles
+    return {"subscriptions": await resolve_subscriptions(scope)}
+
+
+async def fan_out(subscriptions: List[str],
+                  call: Callable[[str], Awaitable[Any]],
+                  max_concurrency: int = 16,
+                  timeout: Optional[float] = 60.0) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Ejecuta `call(sub)` para cada suscripción (como mucho `max_concurrency`
+    a la vez) y genera `(sub, resultado)` en orden de llegada; si `call`
+    falla, el resultado es la excepción.  Al pasar `timeout` segundos las
+    que quedan se cancelan y salen con `asyncio.TimeoutError`, de modo que
+    el llamante siempre recibe una respuesta parcial.
+    """
+    sem = asyncio.Semaphore(max_concurrency)
+
+    async def _one(sub: str) -> Tuple[str, Any]:
+        async with sem:
+            try:
+                return sub, await call(sub)
+            except Exception as e:               # se informa por suscripción
+                return sub, e
+
+    tasks = {asyncio.create_task(_one(s)): s for s in subscriptions}
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        pending = set(tasks)
+        while pending:
+            left = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, pending = await asyncio.wait(pending, timeout=left,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+            if not done:                            # se agotó el tiempo
+                for task in pending:
+                    task.cancel()
+                    yield tasks[task], asyncio.TimeoutError(
+                        f"sin respuesta en {timeout:.0f} s")
+                return
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def partial_summary(errors: Dict[str, Exception], total: int) -> Dict[str, Any]:
+    """Campos comunes de las respuestas agregadas (errores en una línea)."""
+    return {"subscriptions": total, "succeeded": total - len(errors),
+            "errors": {sub: (str(e) or type(e).__name__).splitlines()[0]
+                       for sub, e in errors.items()}}
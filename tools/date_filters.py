@@ -0,0 +1,40 @@
+"""
+date_filters.py
+────────────────────────────────────────────────────────────────────────
+Filtros de fecha en lenguaje natural compartidos por las herramientas de
+GitHub, Azure Policy y postura ('today', 'last 7 days', …).
+
+• parse_date_filter()       – texto → datetime límite (naive, en UTC)
+────────────────────────────────────────────────────────────────────────
+"""
+from __future__ import annotations
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+
+def parse_date_filter(date_filter: str | None) -> Optional[datetime]:
+    """
+    Convierte 'today', 'yesterday', 'this week', 'last week',
+    'last N days' o 'last N months' en el datetime límite (naive, UTC).
+    Un filtro vacío o que no se entiende devuelve None.
+    """
+    if not date_filter:
+        return None
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    df  = date_filter.lower().strip()
+
+    if df == "today":
+        return datetime(now.year, now.month, now.day)
+    if df == "yesterday":
+        return datetime(now.year, now.month, now.day) - timedelta(days=1)
+    if df == "this week":
+        return now - timedelta(days=now.weekday())
+    if df == "last week":
+        return now - timedelta(days=7)
+
+    if (m := re.match(r"last\s+(\d+)\s+days?", df)):
+        return now - timedelta(days=int(m.group(1)))
+    if (m := re.match(r"last\s+(\d+)\s+months?", df)):
+        return now - timedelta(days=30 * int(m.group(1)))
+    return None
@@ -0,0 +1,583 @@
+"""
+github_async_tools.py
+────────────────────────────────────────────────────────────────────────
+Variantes *asyncio* de `github_tools` con los mismos nombres y firmas,
+para que varias llamadas a herramientas emitidas en una sola respuesta
+del modelo se ejecuten a la vez sin bloquear el event loop del equipo:
+
+• create_branch()           – crea rama a partir de la default
+• list_repositories()       – lista repos del owner/org (+filtro fecha, paginado)
+• get_repository()          – info detallada de un repo
+• get_repositories_batch()  – info de muchos repos en lotes GraphQL
+• get_file_content()        – lee archivo o lista directorio
+• create_pull_request()     – abre un PR entre ramas
+• list_pull_requests()      – lista PRs (open/closed/all, +filtro fecha)
+
+Además, sólo en esta variante:
+
+• audit_org_zero_trust()    – auditoría Zero‑Trust concurrente de todos los
+                              repos del owner (tabla resumen)
+• iter_org_audit()          – lo mismo como *async generator*, repo a repo
+                              según van terminando
+• search_pull_requests()    – PRs de toda la org con UNA consulta de búsqueda
+                              (proyección compacta)
+• commit_files()            – escribe un conjunto de archivos como UN commit
+                              (Git Data API: blobs en paralelo, un tree)
+• publish_landing_zone()    – sube `Infra/` generado por bicep_tools a una
+                              rama y abre el PR
+
+Usan un `httpx.AsyncClient` compartido por event loop (pool keep‑alive)
+y reutilizan de `github_tools` la configuración, la caché ETag en disco
+y el planificador de rate limit, así que ambas variantes comparten cupo
+y estadísticas.  Mismas variables de entorno que `github_tools`.
+────────────────────────────────────────────────────────────────────────
+"""
+from __future__ import annotations
+import os, base64, asyncio, hashlib, pathlib, weakref
+from typing import List, Dict, Any, Callable, AsyncIterator, Union
+
+import httpx
+
+from tools.date_filters import parse_date_filter
+from tools.github_tools import (
+    _github_env, _headers, _updated_before, _decode_content,
+    _identity, _resource_for, _rate_reserve, _rate_update,
+    _cache_enabled, _cache_lookup, _cache_hit, _cache_miss,
+    _graphql_batches, _graphql_repo_query, _graphql_repo_results,
+)
+
+# ──────────────────────────────────────────────────────────────────────
+# cliente HTTP asíncrono compartido (uno por event loop)
+# ──────────────────────────────────────────────────────────────────────
+_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = \
+    weakref.WeakKeyDictionary()
+
+
+def _client() -> httpx.AsyncClient:
+    """Cliente del event loop actual; se crea al primer uso en ese loop."""
+    loop = asyncio.get_running_loop()
+    client = _CLIENTS.get(loop)
+    if client is None or client.is_closed:
+        pool = int(os.getenv("GITHUB_POOL_SIZE", "20"))
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool, max_keepalive_connections=pool),
+            headers={"Accept-Encoding": "gzip, deflate"},
+            timeout=15)
+        _CLIENTS[loop] = client
+    return client
+
+
+async def _send(method: str, url: str, hdr: dict, **kw) -> httpx.Response:
+    """Como `github_tools._send`, pero esperando con `asyncio.sleep`."""
+    key = (_identity(hdr), _resource_for(url))
+    for _ in range(int(os.getenv("GITHUB_RATE_MAX_RETRIES", "3")) + 1):
+        wait = _rate_reserve(key)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        rsp = await _client().request(method, url, headers=hdr, **kw)
+        if not _rate_update(key, rsp):
+            break
+    return rsp
+
+
+_BODY_HEADERS = ("Content-Encoding", "Content-Length", "Transfer-Encoding")
+
+
+async def _get(url: str, hdr: dict, params: dict | None = None) -> httpx.Response:
+    """
+    GET condicional contra la caché compartida (ver `github_tools._get`).
+    La caché es SQLite síncrona: sus accesos van a un hilo para no parar
+    el event loop.  El 200 sintético lleva el cuerpo ya descomprimido, así
+    que no hereda las cabeceras de codificación/longitud del 304.
+    """
+    if not _cache_enabled():
+        rsp = await _send("GET", url, hdr, params=params)
+        rsp.raise_for_status()
+        return rsp
+
+    url, key, row, cond = await asyncio.to_thread(_cache_lookup, url, hdr, params)
+    rsp = await _send("GET", url, cond)
+
+    if rsp.status_code == 304 and row:
+        headers = httpx.Headers({k: v for k, v in rsp.headers.items()
+                                 if k.title() not in _BODY_HEADERS})
+        if row[2]:
+            headers["Link"] = row[2]
+        return httpx.Response(200, headers=headers,
+                              content=await asyncio.to_thread(_cache_hit, key, row),
+                              request=rsp.request)
+
+    rsp.raise_for_status()
+    await asyncio.to_thread(_cache_miss, key, rsp)
+    return rsp
+
+
+async def _paginate(url: str, hdr: dict, params: dict | None = None,
+                    stop: Callable[[Dict[str, Any]], bool] | None = None
+                    ) -> AsyncIterator[Dict[str, Any]]:
+    """Versión async de `github_tools._paginate` (precarga con una tarea)."""
+    rsp = await _get(url, hdr, params)
+    while True:
+        items = rsp.json()
+        nxt = rsp.links.get("next", {}).get("url")
+        if nxt and stop and items and stop(items[-1]):
+            nxt = None                      # el corte cae en esta página
+        task = asyncio.create_task(_get(nxt, hdr)) if nxt else None
+
+        consumed = False
+        try:
+            for item in items:
+                if stop and stop(item):
+                    return
+                yield item
+            consumed = True
+        finally:
+            if task and not consumed:       # corte o consumidor que abandona
+                task.cancel()
+
+        if task is None:
+            return
+        rsp = await task
+
+
+_OWNER_TYPES: dict[tuple[str, str], str] = {}
+
+
+async def _owner_type(api: str, owner: str, token: str) -> str:
+    if (api, owner) not in _OWNER_TYPES:
+        rsp = await _get(f"{api}/users/{owner}", _headers(token))
+        _OWNER_TYPES[(api, owner)] = rsp.json()["type"]
+    return _OWNER_TYPES[(api, owner)]
+
+
+async def _default_branch_info(repo: str, owner: str, api: str, hdr: dict) -> Dict[str, Any]:
+    repo_info = await _get(f"{api}/repos/{owner}/{repo}", hdr)
+    default_branch = repo_info.json()["default_branch"]
+    branch = await _get(f"{api}/repos/{owner}/{repo}/branches/{default_branch}", hdr)
+    return branch.json()
+
+
+# ──────────────────────────────────────────────────────────────────────
+# herramientas exportadas
+# ──────────────────────────────────────────────────────────────────────
+async def create_branch(repo: str, new_branch: str, owner: str | None = None) -> Dict[str, Any]:
+    """Crea una nueva rama a partir de la default branch."""
+    api, env_owner, token = _github_env()
+    owner = owner or env_owner
+    hdr   = _headers(token)
+
+    info  = await _default_branch_info(repo, owner, api, hdr)
+    sha   = info["commit"]["sha"]
+
+    rsp = await _send("POST", f"{api}/repos/{owner}/{repo}/git/refs", hdr,
+                      json={"ref": f"refs/heads/{new_branch}", "sha": sha})
+    rsp.raise_for_status()
+    return rsp.json()
+
+
+async def list_repositories(owner: str | None = None,
+                            date_filter: str | None = None) -> List[Dict[str, Any]]:
+    """Lista repos del owner/org.  `date_filter` como 'last 30 days', etc."""
+    api, env_owner, token = _github_env()
+    owner = owner or env_owner
+    hdr   = _headers(token)
+
+    repos_url = f"{api}/orgs/{owner}/repos" if await _owner_type(api, owner, token) == "Organization" \
+               else f"{api}/users/{owner}/repos"
+
+    th = parse_date_filter(date_filter)
+    params = {"per_page": 100, "sort": "updated", "direction": "desc"}
+    return [r async for r in _paginate(repos_url, hdr, params,
+                                       stop=_updated_before(th) if th else None)]
+
+
+async def get_repository(repo: str, owner: str | None = None) -> Dict[str, Any]:
+    """Detalles de un repo."""
+    api, env_owner, token = _github_env()
+    owner = owner or env_owner
+    hdr   = _headers(token)
+
+    return (await _get(f"{api}/repos/{owner}/{repo}", hdr)).json()
+
+
+async def get_repositories_batch(repos: List[str],
+                                 owner: str | None = None) -> List[Dict[str, Any]]:
+    """
+    Detalles de muchos repos vía GraphQL (lotes de `GITHUB_GRAPHQL_BATCH`,
+    enviados a la vez).  Mismos campos que `get_repository` más
+    `open_pull_requests_count` y `default_branch_protection`.
+    """
+    api, env_owner, token = _github_env()
+    owner = owner or env_owner
+    hdr   = _headers(token)
+
+    async def _batch(pairs: List[tuple[str, str]]) -> List[Dict[str, Any]]:
+        rsp = await _send("POST", f"{api}/graphql", hdr, json=_graphql_repo_query(pairs))
+        rsp.raise_for_status()
+        return _graphql_repo_results(pairs, rsp.json())
+
+    results = await asyncio.gather(*(_batch(b) for b in _graphql_batches(repos, owner)))
+    return [repo for batch in results for repo in batch]
+
+
+async def get_file_content(repo: str, path: str, ref: str = "main",
+                           owner: str | None = None) -> Union[str, List[Dict[str, Any]]]:
+    """Devuelve contenido de archivo o lista directorio (desde el espejo
+    local si `GITHUB_MIRROR=1`, ver `github_mirror`)."""
+    api, env_owner, token = _github_env()
+    owner = owner or env_owner
+    hdr   = _headers(token)
+
+    if os.getenv("GITHUB_MIRROR", "0") == "1":
+        from tools.github_mirror import read_path
+        return await asyncio.to_thread(read_path, api, owner, repo, path, ref, token)
+
+    rsp = await _get(f"{api}/repos/{owner}/{repo}/contents/{path}", hdr, params={"ref": ref})
+    return _decode_content(rsp.json())
+
+
+async def create_pull_request(repo: str, head: str, base: str,
+                              title: str, body: str = "",
+                              owner: str | None = None) -> Dict[str, Any]:
+    """Abre un PR head→base."""
+    api, env_owner, token = _github_env()
+    owner = owner or env_owner
+    hdr   = _headers(token)
+
+    rsp = await _send("POST", f"{api}/repos/{owner}/{repo}/pulls", hdr,
+                      json={"title": title, "body": body, "head": head, "base": base})
+    rsp.raise_for_status()
+    return rsp.json()
+
+
+async def list_pull_requests(repo: str, state: str = "open",
+                             owner: str | None = None,
+                             date_filter: str | None = None) -> List[Dict[str, Any]]:
+    """Lista PRs del repo (`state` open/closed/all).  `date_filter` como en
+    `list_repositories`, aplicado sobre la última actualización del PR."""
+    api, env_owner, token = _github_env()
+    owner = owner or env_owner
+    hdr   = _headers(token)
+
+    th = parse_date_filter(date_filter)
+    params = {"state": state, "per_page": 100, "sort": "updated", "direction": "desc"}
+    return [pr async for pr in _paginate(f"{api}/repos/{owner}/{repo}/pulls", hdr, params,
+                                         stop=_updated_before(th) if th else None)]
+
+
+# ──────────────────────────────────────────────────────────────────────
+# auditoría Zero‑Trust de la organización
+# ──────────────────────────────────────────────────────────────────────
+_CONTROLS = ("branch_protection", "required_reviews", "enforce_admins",
+             "secret_scanning", "dependabot_alerts")
+
+
+def _enabled(section: Dict[str, Any] | None) -> bool | None:
+    """`security_and_analysis.*.status` → True/False (None si no es visible)."""
+    return None if section is None else section.get("status") == "enabled"
+
+
+async def _audit_repo(api: str, hdr: dict, repo: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Controles de un repo.  None = no se pudo determinar (p.ej. sin permisos).
+
+    Protección de rama y alertas de Dependabot sólo son visibles para
+    administradores: GitHub devuelve también 404 si el token no es admin,
+    así que sin `permissions.admin` un 404 se informa como desconocido.
+    """
+    full   = repo["full_name"]
+    branch = repo.get("default_branch")
+    admin  = (repo.get("permissions") or {}).get("admin") is True
+    row: Dict[str, Any] = {"repo": full, "default_branch": branch,
+                           "private": repo.get("private"), "archived": repo.get("archived")}
+    if not branch:                                      # repo vacío: no hay rama que proteger
+        row["empty"] = True
+        return row
+    try:
+        prot, alerts = await asyncio.gather(
+            _send("GET", f"{api}/repos/{full}/branches/{branch}/protection", hdr),
+            _send("GET", f"{api}/repos/{full}/vulnerability-alerts", hdr))
+
+        if prot.status_code == 200:
+            p = prot.json()
+            reviews = p.get("required_pull_request_reviews") or {}
+            row["branch_protection"] = True
+            row["required_reviews"]  = reviews.get("required_approving_review_count", 0) > 0
+            row["enforce_admins"]    = (p.get("enforce_admins") or {}).get("enabled", False)
+        elif prot.status_code == 404 and admin:         # rama sin proteger
+            row.update(branch_protection=False, required_reviews=False, enforce_admins=False)
+        else:
+            row.update(branch_protection=None, required_reviews=None, enforce_admins=None)
+
+        row["dependabot_alerts"] = {204: True, 404: False if admin else None}.get(
+            alerts.status_code)
+
+        # sólo aparece si el token es admin del repo
+        sa = repo.get("security_and_analysis")
+        row["secret_scanning"] = _enabled(sa.get("secret_scanning")) if sa else None
+    except httpx.HTTPError as e:
+        row["error"] = str(e)
+    return row
+
+
+async def iter_org_audit(owner: str | None = None, max_concurrency: int = 8,
+                         include_archived: bool = False) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Audita todos los repos del owner con como mucho `max_concurrency` repos
+    en vuelo y va devolviendo cada resultado en cuanto termina.
+    """
+    api, _, token = _github_env()
+    hdr   = _headers(token)
+    repos = [r for r in await list_repositories(owner)
+             if include_archived or not r.get("archived")]
+
+    sem = asyncio.Semaphore(max_concurrency)
+
+    async def _bounded(repo: Dict[str, Any]) -> Dict[str, Any]:
+        async with sem:
+            return await _audit_repo(api, hdr, repo)
+
+    tasks = [asyncio.create_task(_bounded(r)) for r in repos]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            yield await fut
+    finally:
+        for t in tasks:
+            t.cancel()
+
+
+def _audit_table(rows: List[Dict[str, Any]]) -> str:
+    mark = {True: "✅", False: "❌", None: "❔"}
+    lines = ["| repo | " + " | ".join(_CONTROLS) + " |",
+             "|---|" + "---|" * len(_CONTROLS)]
+    for r in sorted(rows, key=lambda r: r["repo"]):
+        if "error" in r:
+            cells = ["⚠️ " + r["error"]] + [""] * (len(_CONTROLS) - 1)
+        elif r.get("empty"):
+            cells = ["repositorio vacío"] + [""] * (len(_CONTROLS) - 1)
+        else:
+            cells = [mark[r.get(c)] for c in _CONTROLS]
+        lines.append(f"| {r['repo']} | " + " | ".join(cells) + " |")
+    return "\n".join(lines)
+
+
+async def audit_org_zero_trust(owner: str | None = None, max_concurrency: int = 8,
+                               include_archived: bool = False) -> Dict[str, Any]:
+    """
+    Audita en paralelo los controles Zero‑Trust de todos los repos del owner:
+    protección de la rama por defecto, revisiones obligatorias, aplicación
+    a administradores, secret scanning y alertas de Dependabot.
+
+    Returns:
+        {"summary": conteos por control, "table": tabla Markdown (✅/❌/❔),
+         "repos": una fila compacta por repo}.  Los repos vacíos (sin rama
+        por defecto) se marcan `empty` y no cuentan en los controles.
+    """
+    rows = [row async for row in iter_org_audit(owner, max_concurrency, include_archived)]
+    ok   = [r for r in rows if "error" not in r and not r.get("empty")]
+    summary: Dict[str, Any] = {"repos": len(rows),
+                               "errors": sum("error" in r for r in rows),
+                               "empty": sum(bool(r.get("empty")) for r in rows)}
+    for c in _CONTROLS:
+        summary[c] = {"enabled":  sum(r.get(c) is True for r in ok),
+                      "disabled": sum(r.get(c) is False for r in ok),
+                      "unknown":  sum(r.get(c) is None for r in ok)}
+    return {"summary": summary, "table": _audit_table(rows), "repos": rows}
+
+
+# ──────────────────────────────────────────────────────────────────────
+# búsqueda de PRs en toda la organización
+# ──────────────────────────────────────────────────────────────────────
+def _pr_summary(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Proyección compacta de un resultado de `/search/issues`."""
+    return {
+        "repo":       item["repository_url"].split("/repos/", 1)[-1],
+        "number":     item["number"],
+        "title":      item["title"],
+        "state":      item["state"],
+        "draft":      item.get("draft", False),
+        "author":     (item.get("user") or {}).get("login"),
+        "labels":     [lbl["name"] for lbl in item.get("labels", [])],
+        "created_at": item["created_at"],
+        "updated_at": item["updated_at"],
+        "html_url":   item["html_url"],
+    }
+
+
+async def search_pull_requests(query: str = "", state: str = "open",
+                               owner: str | None = None, max_results: int = 200,
+                               max_concurrency: int = 3) -> Dict[str, Any]:
+    """
+    Busca PRs en todos los repos del owner con una sola consulta de la API
+    de búsqueda (`is:pr org:X state:Y <query>`), p.ej. `query="infra in:title"`
+    o `"label:security"`.  Tras la primera página, el resto se piden a la
+    vez (como mucho `max_concurrency`) respetando el rate limit de search.
+    La API de búsqueda no devuelve más de 1000 resultados.
+
+    Returns:
+        {"total_count", "incomplete_results", "items": [proyección compacta]}
+    """
+    if max_results < 1:
+        raise ValueError("max_results debe ser >= 1")
+    api, env_owner, token = _github_env()
+    owner = owner or env_owner
+    hdr   = _headers(token)
+
+    scope = "org" if await _owner_type(api, owner, token) == "Organization" else "user"
+    terms = ["is:pr", f"{scope}:{owner}"] + ([f"state:{state}"] if state != "all" else [])
+    q     = " ".join(terms + [query]).strip()
+
+    per_page = min(100, max_results)
+
+    async def _page(n: int) -> Dict[str, Any]:
+        rsp = await _get(f"{api}/search/issues", hdr,
+                         params={"q": q, "per_page": per_page, "page": n,
+                                 "sort": "updated", "order": "desc"})
+        return rsp.json()
+
+    first = await _page(1)
+    wanted = min(first["total_count"], max_results, 1000)
+    pages  = -(-wanted // per_page)                 # ceil
+
+    sem = asyncio.Semaphore(max_concurrency)
+
+    async def _bounded(n: int) -> Dict[str, Any]:
+        async with sem:
+            return await _page(n)
+
+    rest  = await asyncio.gather(*(_bounded(n) for n in range(2, pages + 1)))
+    items = [it for page in [first, *rest] for it in page.get("items", [])][:wanted]
+    return {"query": q,
+            "total_count": first["total_count"],
+            "incomplete_results": any(p.get("incomplete_results") for p in [first, *rest]),
+            "items": [_pr_summary(it) for it in items]}
+
+
+# ──────────────────────────────────────────────────────────────────────
+# commits multi‑archivo con la Git Data API
+# ──────────────────────────────────────────────────────────────────────
+def _blob_sha(data: bytes) -> str:
+    """SHA que Git asigna al blob `data` (para comparar sin subirlo)."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+async def _ref_sha(api: str, full: str, hdr: dict, branch: str) -> str | None:
+    rsp = await _send("GET", f"{api}/repos/{full}/git/ref/heads/{branch}", hdr)
+    if rsp.status_code == 404:
+        return None
+    rsp.raise_for_status()
+    return rsp.json()["object"]["sha"]
+
+
+async def commit_files(repo: str, files: Dict[str, str], branch: str, message: str,
+                       base: str | None = None, owner: str | None = None,
+                       max_concurrency: int = 8) -> Dict[str, Any]:
+    """
+    Escribe `files` ({ruta en el repo: contenido}) como un único commit en
+    `branch`: blobs creados en paralelo sólo para los archivos cuyo SHA no
+    coincide ya con el del árbol de partida, un tree sobre `base_tree`, un
+    commit y una actualización de ref.  Si `branch` no existe se crea desde
+    `base` (por defecto la rama por defecto del repo).  Los archivos que
+    ya existen conservan su modo; los `.sh` nuevos se crean ejecutables.
+
+    Returns:
+        {"commit": sha | None, "branch", "changed": [...], "unchanged": [...]}
+    """
+    api, env_owner, token = _github_env()
+    owner = owner or env_owner
+    hdr   = _headers(token)
+    full  = f"{owner}/{repo}"
+
+    head = await _ref_sha(api, full, hdr, branch)
+    if head is None:
+        base = base or (await get_repository(repo, owner))["default_branch"]
+        parent = await _ref_sha(api, full, hdr, base)
+        if parent is None:
+            raise ValueError(f"No existe la rama base '{base}' en {full}")
+    else:
+        parent = head
+
+    commit = (await _get(f"{api}/repos/{full}/git/commits/{parent}", hdr)).json()
+    tree   = (await _get(f"{api}/repos/{full}/git/trees/{commit['tree']['sha']}", hdr,
+                         params={"recursive": "1"})).json()
+    current = {} if tree.get("truncated") else \
+        {e["path"]: e for e in tree.get("tree", []) if e["type"] == "blob"}
+
+    encoded = {path: content.encode("utf-8") for path, content in files.items()}
+    changed = sorted(p for p, data in encoded.items()
+                     if current.get(p, {}).get("sha") != _blob_sha(data))
+    unchanged = sorted(set(encoded) - set(changed))
+    result: Dict[str, Any] = {"commit": None, "branch": branch,
+                              "changed": changed, "unchanged": unchanged}
+    if not changed:
+        return result
+
+    sem = asyncio.Semaphore(max_concurrency)
+
+    async def _blob(path: str) -> Dict[str, str]:
+        async with sem:
+            rsp = await _send("POST", f"{api}/repos/{full}/git/blobs", hdr,
+                              json={"content": base64.b64encode(encoded[path]).decode(),
+                                    "encoding": "base64"})
+        rsp.raise_for_status()
+        # los archivos existentes conservan su modo; sólo los .sh nuevos son ejecutables
+        mode = current[path]["mode"] if path in current else \
+               "100755" if path.endswith(".sh") else "100644"
+        return {"path": path, "mode": mode, "type": "blob", "sha": rsp.json()["sha"]}
+
+    entries = await asyncio.gather(*(_blob(p) for p in changed))
+
+    rsp = await _send("POST", f"{api}/repos/{full}/git/trees", hdr,
+                      json={"base_tree": commit["tree"]["sha"], "tree": entries})
+    rsp.raise_for_status()
+    rsp = await _send("POST", f"{api}/repos/{full}/git/commits", hdr,
+                      json={"message": message, "tree": rsp.json()["sha"],
+                            "parents": [parent]})
+    rsp.raise_for_status()
+    sha = rsp.json()["sha"]
+
+    if head is None:
+        rsp = await _send("POST", f"{api}/repos/{full}/git/refs", hdr,
+                          json={"ref": f"refs/heads/{branch}", "sha": sha})
+    else:
+        rsp = await _send("PATCH", f"{api}/repos/{full}/git/refs/heads/{branch}", hdr,
+                          json={"sha": sha})
+    rsp.raise_for_status()
+    result["commit"] = sha
+    return result
+
+
+async def publish_landing_zone(repo: str, branch: str = "landing-zone",
+                               title: str = "Landing Zone generada",
+                               body: str = "", base: str | None = None,
+                               target_path: str = "Infra",
+                               owner: str | None = None) -> Dict[str, Any]:
+    """
+    Sube los archivos de la Landing Zone generada (`generate_landing_zone`)
+    a `target_path` en `branch` como un solo commit y abre el PR hacia
+    `base`.  Los archivos idénticos a los de la rama no se vuelven a subir.
+    """
+    from tools.bicep_tools import INFRA_DIR
+
+    files: Dict[str, str] = {}
+    for path in sorted(pathlib.Path(INFRA_DIR).rglob("*")):
+        rel = path.relative_to(INFRA_DIR)
+        if path.is_file() and path.name != "__init__.py" and "__pycache__" not in rel.parts:
+            files[f"{target_path.strip('/')}/{rel.as_posix()}"] = path.read_text(encoding="utf-8")
+    if not files:
+        return {"error": f"No hay archivos generados en {INFRA_DIR}"}
+
+    owner = owner or _github_env()[1]
+    base  = base or (await get_repository(repo, owner))["default_branch"]
+    result = await commit_files(repo, files, branch, title, base=base, owner=owner)
+    if result["commit"] is None:
+        result["message"] = "Sin cambios respecto a la rama: no se crea commit ni PR"
+        return result
+
+    try:
+        pr = await create_pull_request(repo, head=branch, base=base,
+                                       title=title, body=body, owner=owner)
+        result["pull_request"] = pr["html_url"]
+    except httpx.HTTPStatusError as e:             # 422: ya hay un PR abierto
+        result["pull_request_error"] = e.response.text
+    return result
@@ -0,0 +1,154 @@
+"""
+github_mirror.py
+────────────────────────────────────────────────────────────────────────
+Espejo local de repositorios GitHub para `get_file_content` (modo mirror).
+
+Por cada repo/ref se mantiene en una carpeta de caché un clon superficial
+(`--depth 1`) y parcial (`--filter=blob:none`, sin checkout): sólo se
+descargan los árboles, y cada blob se trae la primera vez que se lee.  Los
+listados de directorio y las lecturas salen del disco, sin límite de 1 MB
+ni base64, y el clon se refresca con un `fetch` incremental cuando han
+pasado más de `GITHUB_MIRROR_TTL` segundos.  Si la caché supera
+`GITHUB_MIRROR_MAX_MB` se borran los espejos usados hace más tiempo.
+
+• read_path()               – archivo (str) o directorio (lista de entradas)
+
+Variables de entorno:
+    GITHUB_MIRROR           1 para servir get_file_content desde el espejo
+    GITHUB_MIRROR_DIR       carpeta (def. ~/.cache/zerotrust-autogen/mirrors)
+    GITHUB_MIRROR_MAX_MB    tamaño máx. de todos los espejos (def. 1024)
+    GITHUB_MIRROR_TTL       segundos entre fetch del mismo espejo (def. 300)
+────────────────────────────────────────────────────────────────────────
+"""
+from __future__ import annotations
+import os, re, time, base64, shutil, pathlib, threading
+from typing import List, Dict, Any, Union
+
+import git
+
+_MIRROR_REF = "refs/mirror/head"
+_LOCKS: dict[pathlib.Path, threading.Lock] = {}
+_REPOS: dict[pathlib.Path, git.Repo] = {}          # abiertos (procesos cat-file vivos)
+_LOCKS_GUARD = threading.Lock()
+
+
+def _root() -> pathlib.Path:
+    return pathlib.Path(os.getenv("GITHUB_MIRROR_DIR")
+                        or pathlib.Path.home() / ".cache" / "zerotrust-autogen" / "mirrors")
+
+
+def _lock(path: pathlib.Path) -> threading.Lock:
+    with _LOCKS_GUARD:
+        return _LOCKS.setdefault(path, threading.Lock())
+
+
+def _git_env(token: str) -> Dict[str, str]:
+    """Autenticación por cabecera vía GIT_CONFIG_*: el token no se escribe
+    en `.git/config` ni aparece en la URL del remoto."""
+    basic = base64.b64encode(f"x-access-token:{token}".encode()).decode()
+    return {"GIT_CONFIG_COUNT": "1",
+            "GIT_CONFIG_KEY_0": "http.extraHeader",
+            "GIT_CONFIG_VALUE_0": f"Authorization: Basic {basic}",
+            "GIT_TERMINAL_PROMPT": "0"}
+
+
+def _clone_url(api: str, owner: str, repo: str) -> str:
+    """https://api.github.com → github.com;  https://ghe/api/v3 → ghe."""
+    host = "https://github.com" if "api.github.com" in api else api.split("/api/")[0]
+    return f"{host}/{owner}/{repo}.git"
+
+
+def _dir_size(path: pathlib.Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def _evict(keep: pathlib.Path) -> None:
+    """Borra los espejos menos usados (mtime de la carpeta) hasta caber en el tope."""
+    limit   = int(float(os.getenv("GITHUB_MIRROR_MAX_MB", "1024")) * 1024 * 1024)
+    mirrors = [p for p in _root().glob("*/*") if p.is_dir()]
+    sizes   = {p: _dir_size(p) for p in mirrors}
+    total   = sum(sizes.values())
+    for path in sorted(mirrors, key=lambda p: p.stat().st_mtime):
+        if total <= limit:
+            break
+        if path == keep:
+            continue
+        with _lock(path):
+            if path in _REPOS:
+                _REPOS.pop(path).close()
+            shutil.rmtree(path, ignore_errors=True)
+        total -= sizes[path]
+
+
+def _mirror_path(owner: str, repo: str, ref: str) -> pathlib.Path:
+    return _root() / owner / f"{repo}@{re.sub(r'[^A-Za-z0-9._-]', '_', ref)}"
+
+
+def _open(path: pathlib.Path, api: str, owner: str, repo: str, ref: str,
+          token: str) -> tuple[git.Repo, bool]:
+    """
+    Abre (clonando o refrescando si toca) el espejo de owner/repo@ref.
+    Llamar con `_lock(path)`; devuelve (repo, recién clonado).
+    """
+    env = _git_env(token)
+    ttl = float(os.getenv("GITHUB_MIRROR_TTL", "300"))
+
+    fetched = path / ".git" / "mirror-fetched"
+    if not fetched.exists():
+        shutil.rmtree(path, ignore_errors=True)       # clon previo a medias
+        path.parent.mkdir(parents=True, exist_ok=True)
+        repo_ = git.Repo.clone_from(
+            _clone_url(api, owner, repo), path, env=env,
+            multi_options=["--depth=1", "--filter=blob:none",
+                           "--no-checkout", "--no-tags", "--single-branch"])
+        repo_.git.update_environment(**env)
+        repo_.git.fetch("--depth=1", "origin", ref)
+        repo_.git.update_ref(_MIRROR_REF, "FETCH_HEAD")
+        fetched.touch()
+        new = True
+    else:
+        repo_ = _REPOS.get(path) or git.Repo(path)
+        repo_.git.update_environment(**env)
+        new = False
+        if time.time() - fetched.stat().st_mtime > ttl:
+            repo_.git.fetch("--depth=1", "origin", ref)
+            repo_.git.update_ref(_MIRROR_REF, "FETCH_HEAD")
+            fetched.touch()
+    _REPOS[path] = repo_
+    os.utime(path)                                    # marca de uso para LRU
+    return repo_, new
+
+
+def read_path(api: str, owner: str, repo: str, path: str, ref: str,
+              token: str) -> Union[str, List[Dict[str, Any]]]:
+    """
+    Contenido de `path` en `ref` servido desde el espejo local.  Los
+    directorios devuelven entradas con la forma de la API `/contents`
+    (name, path, sha, type); los archivos, su texto (los bytes que no son
+    UTF‑8 válido se sustituyen por U+FFFD).
+
+    La lectura se hace con el cerrojo del espejo tomado, de modo que un
+    `_evict` concurrente no puede borrarlo ni cerrar el `git.Repo` a medias.
+    """
+    mirror = _mirror_path(owner, repo, ref)
+    with _lock(mirror):
+        repo_, new = _open(mirror, api, owner, repo, ref, token)
+        tree = repo_.commit(_MIRROR_REF).tree
+        rel  = path.strip("/")
+        try:
+            obj = tree / rel if rel else tree
+        except KeyError:
+            raise FileNotFoundError(f"{owner}/{repo}@{ref}: no existe '{path}'") from None
+
+        if obj.type == "tree":
+            kinds = {"tree": "dir", "blob": "file", "submodule": "submodule"}
+            result: Union[str, List[Dict[str, Any]]] = [
+                {"name": o.name, "path": o.path, "sha": o.hexsha,
+                 "type": "symlink" if o.mode == 0o120000 else kinds.get(o.type, o.type)}
+                for o in obj]
+        else:
+            result = obj.data_stream.read().decode("utf-8", errors="replace")
+
+    if new:
+        _evict(keep=mirror)
+    return result
@@ -4,31 +4,321 @@ github_tools.py
 Utilidades de GitHub para Zero‑Trust Autogen en estilo *funcional*:
 
 • create_branch()           – crea rama a partir de la default
-• list_repositories()       – lista repos del owner/org (+filtro fecha)
+• list_repositories()       – lista repos del owner/org (+filtro fecha, paginado)
 • get_repository()          – info detallada de un repo
+• get_repositories_batch()  – info de muchos repos en lotes GraphQL
 • get_file_content()        – lee archivo o lista directorio
 • create_pull_request()     – abre un PR entre ramas
-• list_pull_requests()      – lista PRs (open/closed/all)
+• list_pull_requests()      – lista PRs (open/closed/all, +filtro fecha)
+• get_cache_stats()         – aciertos/fallos de la caché de respuestas
+• get_rate_limit_status()   – cupo y esperas del planificador de rate limit
+
+Todas las llamadas comparten una única `requests.Session` (pool de
+conexiones keep‑alive + gzip) creada la primera vez que se usa.  Los
+listados siguen las cabeceras `Link: rel="next"` página a página (con la
+siguiente precargada en segundo plano) y, con filtro de fecha, piden los
+items ordenados por `updated` desc. para dejar de paginar en cuanto se
+cruza el umbral.  Los GET son condicionales (`If-None-Match` /
+`If-Modified-Since`) contra una caché en disco con desalojo LRU: un
+304 sirve el cuerpo guardado y no consume cuota del rate limit.  Cada
+envío pasa por un planificador que lee X-RateLimit-* y Retry-After, dosifica
+las peticiones al acercarse al límite y espera (en lugar de fallar) cuando
+se agota, salvo que la espera supere GITHUB_RATE_MAX_WAIT: entonces devuelve
+un error de rate limit.
 
 Requiere en .env (o variables de entorno a runtime):
     GITHUB_OWNER            owner u organización
     GITHUB_PAT / GITHUB_TOKEN   PAT con scope repo
+Opcional:
+    GITHUB_API_URL          base de la API (def. https://api.github.com)
+    GITHUB_POOL_SIZE        conexiones máx. por host en el pool (def. 20)
+    GITHUB_CACHE            0 para desactivar la caché de respuestas (def. 1)
+    GITHUB_CACHE_DIR        carpeta de la caché (def. ~/.cache/zerotrust-autogen)
+    GITHUB_CACHE_MAX_MB     tamaño máx. de la caché antes de desalojar (def. 64)
+    GITHUB_RATE_PACE_BELOW  fracción del cupo bajo la que se dosifica (def. 0.2)
+    GITHUB_RATE_RESERVE     peticiones que se dejan sin gastar (def. 2)
+    GITHUB_RATE_MAX_RETRIES reintentos tras 403/429 por rate limit (def. 3)
+    GITHUB_RATE_MAX_WAIT    espera máx. (s) antes de fallar por rate limit (def. 60)
+    GITHUB_GRAPHQL_BATCH    repos por petición GraphQL (def. 50, máx. 100)
+    GITHUB_MIRROR           1 para leer archivos desde un clon local (github_mirror)
 ────────────────────────────────────────────────────────────────────────
 """
 from __future__ import annotations
-import os, re, base64, requests
-from typing import List, Dict, Any, Optional, Union
-from datetime import datetime, timedelta
+import os, time, zlib, base64, hashlib, pathlib, sqlite3, threading, requests
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Any, Union, Callable, Iterator
+from datetime import datetime
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from tools.date_filters import parse_date_filter
 
 load_dotenv()
 
+# ──────────────────────────────────────────────────────────────────────
+# sesión HTTP compartida (pool keep‑alive)
+# ──────────────────────────────────────────────────────────────────────
+_SESSION: requests.Session | None = None
+_SESSION_LOCK = threading.Lock()
+
+
+def _http() -> requests.Session:
+    """Devuelve la sesión del proceso; la crea (una sola vez) al primer uso."""
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                pool = int(os.getenv("GITHUB_POOL_SIZE", "20"))
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({"Accept-Encoding": "gzip, deflate",
+                                        "Connection": "keep-alive"})
+                _SESSION = session
+    return _SESSION
+
+
+# precarga de la página siguiente mientras se procesa la actual
+_PREFETCH = ThreadPoolExecutor(max_workers=4, thread_name_prefix="gh-prefetch")
+
+
+# ──────────────────────────────────────────────────────────────────────
+# planificador consciente del rate limit
+# ──────────────────────────────────────────────────────────────────────
+# Un cubo por (identidad, recurso) – core, search, graphql… – alimentado con
+# X-RateLimit-* de cada respuesta.  Cada envío consume un token local; con
+# el cupo por debajo de GITHUB_RATE_PACE_BELOW se reparten los restantes
+# uniformemente hasta el reset, y si se agota (o llega un Retry-After) se
+# espera en lugar de devolver el 403/429 al agente, hasta GITHUB_RATE_MAX_WAIT.
+_RATE: dict[tuple[str, str], dict[str, Any]] = {}
+_RATE_LOCK = threading.Lock()
+
+
+def _identity(hdr: dict) -> str:
+    return hashlib.sha256(hdr.get("Authorization", "").encode()).hexdigest()[:16]
+
+
+def _resource_for(url: str) -> str:
+    if "/graphql" in url:
+        return "graphql"
+    if "/search/" in url:
+        return "search"
+    return "core"
+
+
+def _bucket(key: tuple[str, str]) -> dict[str, Any]:
+    """Cubo de `key`, creado vacío (sin límite conocido).  Llamar con `_RATE_LOCK`."""
+    return _RATE.setdefault(key, {"limit": None, "remaining": None, "reset": 0.0,
+                                  "next_at": 0.0, "blocked_until": 0.0,
+                                  "waits": 0, "waited_s": 0.0, "retries": 0})
+
+
+def _rate_reserve(key: tuple[str, str]) -> float:
+    """
+    Reserva un envío en el cubo y devuelve los segundos que hay que esperar.
+
+    Si la espera supera GITHUB_RATE_MAX_WAIT no se reserva nada y se lanza
+    `RuntimeError`: un reset primario puede estar a casi una hora y no se
+    bloquea la llamada de la herramienta tanto tiempo.
+    """
+    pace_below = float(os.getenv("GITHUB_RATE_PACE_BELOW", "0.2"))
+    reserve    = int(os.getenv("GITHUB_RATE_RESERVE", "2"))
+    max_wait   = float(os.getenv("GITHUB_RATE_MAX_WAIT", "60"))
+    with _RATE_LOCK:
+        b       = _bucket(key)
+        now     = time.time()
+        wait    = max(0.0, b["blocked_until"] - now)
+        next_at = b["next_at"]
+
+        if b["remaining"] is not None:
+            if now >= b["reset"]:           # ventana nueva: cubo lleno
+                b["remaining"] = b["limit"]
+            budget = b["remaining"] - reserve
+            if budget <= 0:
+                wait = max(wait, b["reset"] - now + 1)
+            elif b["remaining"] < b["limit"] * pace_below:
+                start   = max(now + wait, b["next_at"])
+                next_at = start + (b["reset"] - now) / budget
+                wait    = start - now
+
+        if wait > max_wait:
+            raise RuntimeError(
+                f"Rate limit de GitHub agotado para '{key[1]}': habría que esperar "
+                f"{wait:.0f} s (GITHUB_RATE_MAX_WAIT={max_wait:.0f} s). "
+                "Reintenta más tarde.")
+
+        b["next_at"] = next_at
+        if b["remaining"] is not None:
+            b["remaining"] -= 1
+        if wait > 0:
+            b["waits"] += 1
+            b["waited_s"] += wait
+        return wait
+
+
+def _rate_update(key: tuple[str, str], rsp: Any) -> bool:
+    """Actualiza el cubo con las cabeceras de `rsp`; True si hay que reintentar."""
+    h = rsp.headers
+    with _RATE_LOCK:
+        b = _bucket(key)
+        if "X-RateLimit-Remaining" in h:
+            b["limit"]     = int(h.get("X-RateLimit-Limit", b["limit"] or 0))
+            b["remaining"] = int(h["X-RateLimit-Remaining"])
+            b["reset"]     = float(h.get("X-RateLimit-Reset", b["reset"]))
+
+        if rsp.status_code not in (403, 429):
+            return False
+        now = time.time()
+        if "Retry-After" in h:                          # límite secundario
+            b["blocked_until"] = now + float(h["Retry-After"])
+        elif b["remaining"] == 0:                        # límite primario
+            b["blocked_until"] = b["reset"] + 1
+        elif "rate limit" in rsp.text.lower():           # secundario sin cabecera
+            b["blocked_until"] = now + 60
+        else:
+            return False                                 # 403 de permisos
+        b["retries"] += 1
+        return True
+
+
+def _send(method: str, url: str, hdr: dict, **kw) -> requests.Response:
+    """Envía la petición respetando el rate limit (sin `raise_for_status`)."""
+    key = (_identity(hdr), _resource_for(url))
+    for _ in range(int(os.getenv("GITHUB_RATE_MAX_RETRIES", "3")) + 1):
+        wait = _rate_reserve(key)
+        if wait > 0:
+            time.sleep(wait)
+        rsp = _http().request(method, url, headers=hdr, timeout=15, **kw)
+        if not _rate_update(key, rsp):
+            break
+    return rsp
+
+
+# ──────────────────────────────────────────────────────────────────────
+# caché de respuestas (ETag / Last‑Modified) en disco
+# ──────────────────────────────────────────────────────────────────────
+_CACHE_DB: sqlite3.Connection | None = None
+_CACHE_LOCK = threading.Lock()
+_CACHE_STATS: dict[str, int] = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+
+def _cache_enabled() -> bool:
+    return os.getenv("GITHUB_CACHE", "1") != "0"
+
+
+def _cache_db() -> sqlite3.Connection:
+    """Abre (una vez) la base SQLite de la caché.  Llamar con `_CACHE_LOCK`."""
+    global _CACHE_DB
+    if _CACHE_DB is None:
+        folder = pathlib.Path(os.getenv("GITHUB_CACHE_DIR")
+                              or pathlib.Path.home() / ".cache" / "zerotrust-autogen")
+        folder.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(folder / "github_http.sqlite", check_same_thread=False)
+        db.execute("""CREATE TABLE IF NOT EXISTS responses (
+                          key TEXT PRIMARY KEY, etag TEXT, last_modified TEXT,
+                          link TEXT, body BLOB, size INTEGER, used REAL)""")
+        db.execute("CREATE INDEX IF NOT EXISTS ix_responses_used ON responses(used)")
+        db.commit()
+        _CACHE_DB = db
+    return _CACHE_DB
+
+
+def _cache_key(url: str, hdr: dict) -> str:
+    """URL completa + identidad (hash del token, nunca el token en claro)."""
+    return f"{_identity(hdr)} {url}"
+
+
+def _cache_store(key: str, rsp: Any) -> None:
+    """Guarda la respuesta y desaloja las menos usadas si se supera el tope."""
+    body  = zlib.compress(rsp.content)
+    limit = int(float(os.getenv("GITHUB_CACHE_MAX_MB", "64")) * 1024 * 1024)
+    with _CACHE_LOCK:
+        db = _cache_db()
+        db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                   (key, rsp.headers.get("ETag"), rsp.headers.get("Last-Modified"),
+                    rsp.headers.get("Link"), body, len(body), time.time()))
+        _CACHE_STATS["stores"] += 1
+
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > limit:                   # LRU: bajar al 90 % del tope
+            for old_key, size in db.execute(
+                    "SELECT key, size FROM responses ORDER BY used").fetchall():
+                if total <= limit * 0.9:
+                    break
+                db.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                total -= size
+                _CACHE_STATS["evictions"] += 1
+        db.commit()
+
+
+def _cache_lookup(url: str, hdr: dict,
+                  params: dict | None = None) -> tuple[str, str, tuple | None, dict]:
+    """Devuelve (URL canónica, clave, fila en caché o None, cabeceras condicionales)."""
+    url = requests.Request("GET", url, params=params).prepare().url
+    key = _cache_key(url, hdr)
+    with _CACHE_LOCK:
+        row = _cache_db().execute(
+            "SELECT etag, last_modified, link, body FROM responses WHERE key = ?",
+            (key,)).fetchone()
+
+    cond = dict(hdr)
+    if row and row[0]:
+        cond["If-None-Match"] = row[0]
+    if row and row[1]:
+        cond["If-Modified-Since"] = row[1]
+    return url, key, row, cond
+
+
+def _cache_hit(key: str, row: tuple) -> bytes:
+    """Marca el uso de la entrada (LRU) y devuelve el cuerpo guardado."""
+    with _CACHE_LOCK:
+        _cache_db().execute("UPDATE responses SET used = ? WHERE key = ?",
+                            (time.time(), key))
+        _CACHE_STATS["hits"] += 1
+    return zlib.decompress(row[3])
+
+
+def _cache_miss(key: str, rsp: Any) -> None:
+    """Cuenta el fallo y guarda la respuesta si trae validadores."""
+    with _CACHE_LOCK:
+        _CACHE_STATS["misses"] += 1
+    if rsp.headers.get("ETag") or rsp.headers.get("Last-Modified"):
+        _cache_store(key, rsp)
+
+
+def _get(url: str, hdr: dict, params: dict | None = None) -> requests.Response:
+    """
+    GET condicional.  Si la URL (para esa identidad) está en caché se envía
+    `If-None-Match`/`If-Modified-Since`; ante un 304 se devuelve la misma
+    respuesta con el cuerpo y el `Link` guardados y `status_code` 200.
+    """
+    if not _cache_enabled():
+        rsp = _send("GET", url, hdr, params=params)
+        rsp.raise_for_status()
+        return rsp
+
+    url, key, row, cond = _cache_lookup(url, hdr, params)
+    rsp = _send("GET", url, cond)
+
+    if rsp.status_code == 304 and row:
+        rsp.status_code = 200
+        rsp._content = _cache_hit(key, row)
+        if row[2]:
+            rsp.headers["Link"] = row[2]
+        return rsp
+
+    rsp.raise_for_status()
+    _cache_miss(key, rsp)
+    return rsp
+
+
 # ──────────────────────────────────────────────────────────────────────
 # helpers internos
 # ──────────────────────────────────────────────────────────────────────
 def _github_env() -> tuple[str, str, str]:
     """Devuelve (API, owner, token) asegurándose de que existan."""
-    api    = "https://api.github.com"
+    api    = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
     owner  = os.getenv("GITHUB_OWNER")
     token  = os.getenv("GITHUB_PAT") or os.getenv("GITHUB_TOKEN")
     if not owner or not token:
@@ -37,7 +327,9 @@ def _github_env() -> tuple[str, str, str]:
     return api, owner, token
 
 
+@lru_cache(maxsize=8)
 def _headers(token: str) -> dict:
+    """Cabeceras por token (cacheadas: no modificar el dict devuelto)."""
     return {
         "Authorization": f"Bearer {token}",
         "Accept": "application/vnd.github+json",
@@ -47,37 +339,165 @@ def _headers(token: str) -> dict:
 
 def _default_branch_info(repo: str, owner: str, api: str, hdr: dict) -> Dict[str, Any]:
     """Obtiene información (nombre+SHA) de la rama por defecto."""
-    repo_info = requests.get(f"{api}/repos/{owner}/{repo}", headers=hdr, timeout=15)
-    repo_info.raise_for_status()
+    repo_info = _get(f"{api}/repos/{owner}/{repo}", hdr)
     default_branch = repo_info.json()["default_branch"]
-    branch = requests.get(f"{api}/repos/{owner}/{repo}/branches/{default_branch}",
-                          headers=hdr, timeout=15)
-    branch.raise_for_status()
+    branch = _get(f"{api}/repos/{owner}/{repo}/branches/{default_branch}", hdr)
     return branch.json()                       # → { name, commit:{ sha,… } }
 
 
-def _parse_date_filter(date_filter: str) -> Optional[datetime]:
-    """Traduce filtros tipo 'today', 'last 7 days', … a datetime."""
-    now = datetime.utcnow()
+@lru_cache(maxsize=64)
+def _owner_type(api: str, owner: str, token: str) -> str:
+    """'Organization' o 'User' (no cambia durante el proceso: se cachea)."""
+    return _get(f"{api}/users/{owner}", _headers(token)).json()["type"]
+
+
+# ──────────────────────────────────────────────────────────────────────
+# GraphQL: lotes de repositorios en una sola petición
+# ──────────────────────────────────────────────────────────────────────
+_REPO_FRAGMENT = """
+fragment RepoFields on Repository {
+  databaseId name nameWithOwner description url
+  isPrivate isFork isArchived visibility
+  createdAt updatedAt pushedAt stargazerCount forkCount
+  primaryLanguage { name }
+  owner { login __typename }
+  defaultBranchRef {
+    name
+    branchProtectionRule {
+      requiresApprovingReviews requiredApprovingReviewCount
+      isAdminEnforced requiresStatusChecks requiresCodeOwnerReviews
+    }
+  }
+  openIssues: issues(states: OPEN) { totalCount }
+  openPullRequests: pullRequests(states: OPEN) { totalCount }
+}
+"""
+
+
+def _repo_from_graphql(node: Dict[str, Any]) -> Dict[str, Any]:
+    """Proyecta un nodo GraphQL al dict de la API REST `/repos/{owner}/{repo}`
+    (+ `open_pull_requests_count` y `default_branch_protection`)."""
+    branch = node.get("defaultBranchRef") or {}
+    rule   = branch.get("branchProtectionRule")
+    prs    = node["openPullRequests"]["totalCount"]
+    return {
+        "id":                node["databaseId"],
+        "name":              node["name"],
+        "full_name":         node["nameWithOwner"],
+        "owner":             {"login": node["owner"]["login"],
+                              "type":  node["owner"]["__typename"]},
+        "private":           node["isPrivate"],
+        "fork":              node["isFork"],
+        "archived":          node["isArchived"],
+        "visibility":        node["visibility"].lower(),
+        "description":       node["description"],
+        "html_url":          node["url"],
+        "language":          (node.get("primaryLanguage") or {}).get("name"),
+        "created_at":        node["createdAt"],
+        "updated_at":        node["updatedAt"],
+        "pushed_at":         node["pushedAt"],
+        "stargazers_count":  node["stargazerCount"],
+        "forks_count":       node["forkCount"],
+        "open_issues_count": node["openIssues"]["totalCount"] + prs,   # REST suma ambos
+        "default_branch":    branch.get("name"),
+        "open_pull_requests_count": prs,
+        "default_branch_protection": None if rule is None else {
+            "required_reviews":       rule["requiresApprovingReviews"],
+            "required_review_count":  rule["requiredApprovingReviewCount"],
+            "code_owner_reviews":     rule["requiresCodeOwnerReviews"],
+            "enforce_admins":         rule["isAdminEnforced"],
+            "required_status_checks": rule["requiresStatusChecks"],
+        },
+    }
+
+
+def _graphql_repo_query(pairs: List[tuple[str, str]]) -> Dict[str, Any]:
+    """Cuerpo de la petición: un alias `rN: repository(...)` por cada (owner, name)."""
+    args   = ", ".join(f"$o{i}: String!, $n{i}: String!" for i in range(len(pairs)))
+    fields = "\n".join(f"  r{i}: repository(owner: $o{i}, name: $n{i}) {{ ...RepoFields }}"
+                       for i in range(len(pairs)))
+    variables: Dict[str, str] = {}
+    for i, (owner, name) in enumerate(pairs):
+        variables[f"o{i}"], variables[f"n{i}"] = owner, name
+    return {"query": f"query({args}) {{\n{fields}\n}}\n{_REPO_FRAGMENT}",
+            "variables": variables}
+
+
+def _graphql_repo_results(pairs: List[tuple[str, str]],
+                          payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Respuesta GraphQL → lista en el orden de `pairs` (con `error` si falta)."""
+    data   = payload.get("data") or {}
+    errors = {e["path"][0]: e.get("message", "error")
+              for e in payload.get("errors", []) if e.get("path")}
+
+    out: List[Dict[str, Any]] = []
+    for i, (owner, name) in enumerate(pairs):
+        node = data.get(f"r{i}")
+        out.append(_repo_from_graphql(node) if node else
+                   {"name": name, "full_name": f"{owner}/{name}",
+                    "error": errors.get(f"r{i}", "repositorio no encontrado")})
+    return out
+
+
+def _graphql_repo_batch(api: str, hdr: dict,
+                        pairs: List[tuple[str, str]]) -> List[Dict[str, Any]]:
+    rsp = _send("POST", f"{api}/graphql", hdr, json=_graphql_repo_query(pairs))
+    rsp.raise_for_status()
+    return _graphql_repo_results(pairs, rsp.json())
 
-    df = date_filter.lower().strip()
-    if df == "today":
-        return datetime(now.year, now.month, now.day)
-    if df == "yesterday":
-        return datetime(*(now - timedelta(days=1)).timetuple()[:3])
-    if df == "this week":
-        return now - timedelta(days=now.weekday())
-    if df == "last week":
-        return now - timedelta(days=7)
 
-    if (m := re.match(r"last\s+(\d+)\s+days?", df)):
-        return now - timedelta(days=int(m.group(1)))
-    if (m := re.match(r"last\s+(\d+)\s+months?", df)):
-        return now - timedelta(days=30 * int(m.group(1)))
-    if m:
-        return now - timedelta(days=30 * int(m.group(1)))
-        return now - timedelta(days=30 * int(m.group(1)))
-    return None
+def _graphql_batches(repos: List[str], owner: str) -> List[List[tuple[str, str]]]:
+    """'nombre' | 'owner/nombre' → lotes de (owner, name) de `GITHUB_GRAPHQL_BATCH`."""
+    pairs = [tuple(r.split("/", 1)) if "/" in r else (owner, r) for r in repos]
+    size  = min(int(os.getenv("GITHUB_GRAPHQL_BATCH", "50")), 100)
+    return [pairs[i:i + size] for i in range(0, len(pairs), size)]
+
+
+def _decode_content(content: Any) -> Union[str, List[Dict[str, Any]]]:
+    """Respuesta de `/contents` → texto del archivo o listado del directorio."""
+    if isinstance(content, list):                   # directorio
+        return content
+
+    if content.get("encoding") == "base64":
+        return base64.b64decode(content["content"]).decode("utf-8")
+    return f"No se pudo decodificar el contenido ({content.get('html_url')})"
+
+
+def _parse_ts(ts: str) -> datetime:
+    return datetime.strptime(ts, "%Y-%m-%dT%H:%M:%SZ")
+
+
+def _updated_before(threshold: datetime) -> Callable[[Dict[str, Any]], bool]:
+    """Predicado de corte para listados ordenados por `updated` desc."""
+    return lambda item: _parse_ts(item["updated_at"]) < threshold
+
+
+def _paginate(url: str, hdr: dict, params: dict | None = None,
+              stop: Callable[[Dict[str, Any]], bool] | None = None) -> Iterator[Dict[str, Any]]:
+    """
+    Genera los items de un listado siguiendo `Link: rel="next"`.
+
+    La página siguiente se pide en segundo plano mientras se consume la
+    actual.  Si se da `stop`, el listado debe venir ordenado de forma que,
+    una vez `stop(item)` es cierto, lo sea para todo lo que queda: se corta
+    ahí y no se precarga una página que ya no haría falta.
+    """
+    rsp = _get(url, hdr, params)
+    while True:
+        items = rsp.json()
+        nxt = rsp.links.get("next", {}).get("url")
+        if nxt and stop and items and stop(items[-1]):
+            nxt = None                      # el corte cae en esta página
+        future = _PREFETCH.submit(_get, nxt, hdr) if nxt else None
+
+        for item in items:
+            if stop and stop(item):
+                return
+            yield item
+
+        if future is None:
+            return
+        rsp = future.result()
 
 
 # ──────────────────────────────────────────────────────────────────────
@@ -92,10 +512,8 @@ def create_branch(repo: str, new_branch: str, owner: str | None = None) -> Dict[
     info  = _default_branch_info(repo, owner, api, hdr)
     sha   = info["commit"]["sha"]
 
-    rsp = requests.post(f"{api}/repos/{owner}/{repo}/git/refs",
-                        headers=hdr,
-                        json={"ref": f"refs/heads/{new_branch}", "sha": sha},
-                        timeout=15)
+    rsp = _send("POST", f"{api}/repos/{owner}/{repo}/git/refs", hdr,
+                json={"ref": f"refs/heads/{new_branch}", "sha": sha})
     rsp.raise_for_status()
     return rsp.json()
 
@@ -107,20 +525,13 @@ def list_repositories(owner: str | None = None,
     owner = owner or env_owner
     hdr   = _headers(token)
 
-    # ¿org o user?
-    who = requests.get(f"{api}/users/{owner}", headers=hdr, timeout=15).json()["type"]
-    repos_url = f"{api}/orgs/{owner}/repos?per_page=100" if who == "Organization" \
-               else f"{api}/users/{owner}/repos?per_page=100"
-    repos = requests.get(repos_url, headers=hdr, timeout=15)
-    repos.raise_for_status()
-    lst = repos.json()
+    repos_url = f"{api}/orgs/{owner}/repos" if _owner_type(api, owner, token) == "Organization" \
+               else f"{api}/users/{owner}/repos"
 
-    if date_filter:
-        th = _parse_date_filter(date_filter)
-        if th:
-            lst = [r for r in lst
-                   if datetime.strptime(r["updated_at"], "%Y-%m-%dT%H:%M:%SZ") >= th]
-    return lst
+    th = parse_date_filter(date_filter)
+    params = {"per_page": 100, "sort": "updated", "direction": "desc"}
+    return list(_paginate(repos_url, hdr, params,
+                          stop=_updated_before(th) if th else None))
 
 
 def get_repository(repo: str, owner: str | None = None) -> Dict[str, Any]:
@@ -129,29 +540,41 @@ def get_repository(repo: str, owner: str | None = None) -> Dict[str, Any]:
     owner = owner or env_owner
     hdr   = _headers(token)
 
-    rsp = requests.get(f"{api}/repos/{owner}/{repo}", headers=hdr, timeout=15)
-    rsp.raise_for_status()
-    return rsp.json()
+    return _get(f"{api}/repos/{owner}/{repo}", hdr).json()
 
 
 def get_file_content(repo: str, path: str, ref: str = "main",
                      owner: str | None = None) -> Union[str, List[Dict[str, Any]]]:
-    """Devuelve contenido de archivo o lista directorio."""
+    """Devuelve contenido de archivo o lista directorio (desde el espejo
+    local si `GITHUB_MIRROR=1`, ver `github_mirror`)."""
     api, env_owner, token = _github_env()
     owner = owner or env_owner
     hdr   = _headers(token)
 
-    url = f"{api}/repos/{owner}/{repo}/contents/{path}?ref={ref}"
-    rsp = requests.get(url, headers=hdr, timeout=15)
-    rsp.raise_for_status()
-    content = rsp.json()
+    if os.getenv("GITHUB_MIRROR", "0") == "1":
+        from tools.github_mirror import read_path
+        return read_path(api, owner, repo, path, ref, token)
 
-    if isinstance(content, list):                   # directorio
-        return content
+    return _decode_content(_get(f"{api}/repos/{owner}/{repo}/contents/{path}", hdr,
+                                params={"ref": ref}).json())
 
-    if content.get("encoding") == "base64":
-        return base64.b64decode(content["content"]).decode("utf-8")
-    return f"No se pudo decodificar el contenido ({content.get('html_url')})"
+
+def get_repositories_batch(repos: List[str],
+                           owner: str | None = None) -> List[Dict[str, Any]]:
+    """
+    Detalles de muchos repos vía GraphQL (50 por petición por defecto,
+    `GITHUB_GRAPHQL_BATCH`, máx. 100).  Devuelve los mismos campos que
+    `get_repository` más `open_pull_requests_count` y
+    `default_branch_protection`; los repos que fallan llevan `error`.
+    `repos` admite 'nombre' u 'owner/nombre'.
+    """
+    api, env_owner, token = _github_env()
+    owner = owner or env_owner
+    hdr   = _headers(token)
+
+    results = _PREFETCH.map(lambda batch: _graphql_repo_batch(api, hdr, batch),
+                            _graphql_batches(repos, owner))
+    return [repo for batch in results for repo in batch]
 
 
 def create_pull_request(repo: str, head: str, base: str,
@@ -162,22 +585,52 @@ def create_pull_request(repo: str, head: str, base: str,
     owner = owner or env_owner
     hdr   = _headers(token)
 
-    rsp = requests.post(f"{api}/repos/{owner}/{repo}/pulls",
-                        headers=hdr,
-                        json={"title": title, "body": body, "head": head, "base": base},
-                        timeout=15)
+    rsp = _send("POST", f"{api}/repos/{owner}/{repo}/pulls", hdr,
+                json={"title": title, "body": body, "head": head, "base": base})
     rsp.raise_for_status()
     return rsp.json()
 
 
 def list_pull_requests(repo: str, state: str = "open",
-                       owner: str | None = None) -> List[Dict[str, Any]]:
-    """Lista PRs del repo (`state` open/closed/all)."""
+                       owner: str | None = None,
+                       date_filter: str | None = None) -> List[Dict[str, Any]]:
+    """Lista PRs del repo (`state` open/closed/all).  `date_filter` como en
+    `list_repositories`, aplicado sobre la última actualización del PR."""
     api, env_owner, token = _github_env()
     owner = owner or env_owner
     hdr   = _headers(token)
 
-    rsp = requests.get(f"{api}/repos/{owner}/{repo}/pulls?state={state}&per_page=100",
-                       headers=hdr, timeout=15)
-    rsp.raise_for_status()
-    return rsp.json()
+    th = parse_date_filter(date_filter)
+    params = {"state": state, "per_page": 100, "sort": "updated", "direction": "desc"}
+    return list(_paginate(f"{api}/repos/{owner}/{repo}/pulls", hdr, params,
+                          stop=_updated_before(th) if th else None))
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Estadísticas de la caché de respuestas (aciertos, fallos, tamaño)."""
+    with _CACHE_LOCK:
+        stats = dict(_CACHE_STATS)
+        if _cache_enabled():
+            entries, size = _cache_db().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            stats.update(entries=entries, size_mb=round(size / 1024 / 1024, 2))
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    return stats
+
+
+def get_rate_limit_status() -> List[Dict[str, Any]]:
+    """Cupo actual, espera estimada y esperas acumuladas por token/recurso."""
+    now = time.time()
+    with _RATE_LOCK:
+        return [{
+            "identity":   ident,
+            "resource":   resource,
+            "limit":      b["limit"],
+            "remaining":  b["remaining"],
+            "reset_in_s": round(max(0.0, b["reset"] - now), 1),
+            "wait_s":     round(max(0.0, b["blocked_until"] - now, b["next_at"] - now), 2),
+            "waits":      b["waits"],
+            "waited_s":   round(b["waited_s"], 2),
+            "retries":    b["retries"],
+        } for (ident, resource), b in _RATE.items()]
@@ -0,0 +1,308 @@
+"""
+policy_catalog.py
+────────────────────────────────────────────────────────────────────────
+Catálogo local y versionado de las definiciones *built‑in* de Azure Policy.
+
+Son varios miles de documentos JSON grandes que sólo cambian cuando Azure
+publica actualizaciones, así que se guardan en disco y `get_policy_definition`
+los sirve desde aquí sin ir a la red:
+
+    definitions.<gen>.dat  registros JSON comprimidos con zlib, uno tras
+                      otro; cada sync escribe una generación nueva
+    index.bin         cabecera (generación de datos, fecha de sync, nº de
+                      definiciones) e índice ordenado (hash64 de la clave →
+                      offset, longitud) que se abre con mmap y se consulta por
+                      búsqueda binaria; claves: name, id y displayName
+    meta.json         resumen por definición (id, displayName, category,
+                      version, updatedOn, offset, digest) + fecha de sync
+
+• lookup()                  – definición por name/id/displayName (µs, sin red)
+• entries()                 – resumen de todas las definiciones del catálogo
+• sync_catalog()            – sincroniza con ARM si está caducado (o forzado)
+• refresh_in_background()   – lanza la sync en segundo plano si toca
+• catalog_status()          – nº de definiciones, antigüedad, tamaño
+• catalog_version()         – marca de la última sync (para cachés derivadas)
+
+ARM no ofrece un delta de definiciones: la sync recorre el listado, sólo
+recomprime las entradas cuyo contenido ha cambiado (digest) y copia tal
+cual el resto a un fichero de datos nuevo, con nombre temporal.  Datos,
+índice y meta se publican juntos con `os.replace` bajo el cerrojo de
+lectura, y las syncs simultáneas del mismo event loop comparten una sola
+tarea, así que una lectura nunca ve offsets de otra generación.
+
+Variables de entorno (opcionales):
+    POLICY_CATALOG_DIR      def. ~/.cache/zerotrust-autogen/policy_catalog
+    POLICY_CATALOG_TTL_H    horas hasta considerar el catálogo caducado (def. 24)
+────────────────────────────────────────────────────────────────────────
+"""
+from __future__ import annotations
+import os, json, mmap, time, zlib, struct, asyncio, hashlib, pathlib, threading
+from typing import Dict, Any, Optional
+
+from tools import arm_client
+
+_API_VERSION = "2021-06-01"
+_MAGIC       = b"ZTPCAT01"                  # formato del índice, versión 1
+_HEADER      = struct.Struct("<8sQQdQ")       # magic, nº de registros, generación,
+                                              # fecha de sync, nº de definiciones
+_RECORD      = struct.Struct("<QQI")          # hash de clave, offset, longitud
+
+_LOCK = threading.Lock()
+_OPEN: dict[str, Any] = {"inode": None, "index": None, "data": None, "count": 0,
+                         "synced_at": 0.0, "definitions": 0}
+_TASK: dict[str, Optional[asyncio.Task]] = {"sync": None}
+
+
+# ──────────────────────────────────────────────────────────────────────
+# ficheros
+# ──────────────────────────────────────────────────────────────────────
+def _dir() -> pathlib.Path:
+    return pathlib.Path(os.getenv("POLICY_CATALOG_DIR")
+                        or pathlib.Path.home() / ".cache" / "zerotrust-autogen" / "policy_catalog")
+
+
+def _key_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.lower().encode(), digest_size=8).digest(), "little")
+
+
+def _load_meta() -> Dict[str, Any]:
+    path = _dir() / "meta.json"
+    if not path.exists():
+        return {"synced_at": 0, "data": None, "entries": {}}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _data_path(generation: int) -> pathlib.Path:
+    return _dir() / f"definitions.{generation}.dat"
+
+
+def _write_atomic(path: pathlib.Path, data: bytes) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _build_index(entries: Dict[str, Dict[str, Any]], generation: int,
+                 synced_at: float) -> bytes:
+    rows = set()
+    for name, e in entries.items():
+        for key in {name, e["id"], e["displayName"]}:
+            if key:
+                rows.add((_key_hash(key), e["offset"], e["length"]))
+    rows = sorted(rows)
+    return (_HEADER.pack(_MAGIC, len(rows), generation, synced_at, len(entries)) +
+            b"".join(_RECORD.pack(*r) for r in rows))
+
+
+def _close() -> None:
+    """Cierra mmap y fichero de datos.  Llamar con `_LOCK`."""
+    for k in ("index", "data"):
+        if _OPEN[k] is not None:
+            _OPEN[k].close()
+            _OPEN[k] = None
+    _OPEN["inode"] = None
+
+
+def _ensure_open() -> bool:
+    """(Re)abre índice y datos si han cambiado en disco.  Llamar con `_LOCK`."""
+    index_path = _dir() / "index.bin"
+    try:
+        inode = index_path.stat().st_ino
+    except FileNotFoundError:
+        _close()
+        return False
+    if inode != _OPEN["inode"]:
+        _close()
+        with open(index_path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _, count, generation, synced_at, definitions = _HEADER.unpack_from(mm, 0)
+        try:
+            data = open(_data_path(generation), "rb")
+        except FileNotFoundError:
+            mm.close()
+            return False
+        _OPEN.update(inode=inode, index=mm, count=count, data=data,
+                     synced_at=synced_at, definitions=definitions)
+    return True
+
+
+def _read(offset: int, length: int) -> Optional[Dict[str, Any]]:
+    """Documento en `offset`; None si el registro está dañado (cuenta como fallo)."""
+    data = _OPEN["data"]
+    try:
+        data.seek(offset)
+        return json.loads(zlib.decompress(data.read(length)))
+    except (zlib.error, ValueError, OSError):
+        return None
+
+
+# ──────────────────────────────────────────────────────────────────────
+# consulta
+# ──────────────────────────────────────────────────────────────────────
+def lookup(key: str) -> Optional[Dict[str, Any]]:
+    """Definición built‑in por name, id o displayName; None si no está."""
+    target = _key_hash(key)
+    wanted = key.lower()
+    with _LOCK:
+        if not _ensure_open():
+            return None
+        mm, count = _OPEN["index"], _OPEN["count"]
+        lo, hi = 0, count
+        while lo < hi:                                  # primer registro >= target
+            mid = (lo + hi) // 2
+            if _RECORD.unpack_from(mm, _HEADER.size + mid * _RECORD.size)[0] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        while lo < count:                               # colisiones de hash
+            h, offset, length = _RECORD.unpack_from(mm, _HEADER.size + lo * _RECORD.size)
+            if h != target:
+                break
+            doc = _read(offset, length)
+            if doc is None:                             # registro dañado: se trata como fallo
+                lo += 1
+                continue
+            props = doc.get("properties", {})
+            if wanted in {doc.get("name", "").lower(), doc.get("id", "").lower(),
+                          props.get("displayName", "").lower()}:
+                return doc
+            lo += 1
+    return None
+
+
+def entries() -> Dict[str, Dict[str, Any]]:
+    """Resumen (sin el documento completo) de cada definición, por name."""
+    return _load_meta()["entries"]
+
+
+def catalog_version() -> Optional[int]:
+    """Marca que cambia con cada sync (mtime de meta.json); None si no hay catálogo."""
+    try:
+        return (_dir() / "meta.json").stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def catalog_status() -> Dict[str, Any]:
+    """Estado desde la cabecera del índice (no lee meta.json)."""
+    with _LOCK:
+        if _ensure_open():
+            synced_at, count = _OPEN["synced_at"], _OPEN["definitions"]
+            size = os.fstat(_OPEN["data"].fileno()).st_size
+        else:
+            synced_at, count, size = 0.0, 0, 0
+    ttl = float(os.getenv("POLICY_CATALOG_TTL_H", "24")) * 3600
+    age = time.time() - synced_at if synced_at else None
+    return {"definitions": count,
+            "synced_at": synced_at or None,
+            "age_h": round(age / 3600, 2) if age is not None else None,
+            "stale": age is None or age > ttl,
+            "data_mb": round(size / 1024 / 1024, 2)}
+
+
+# ──────────────────────────────────────────────────────────────────────
+# sincronización
+# ──────────────────────────────────────────────────────────────────────
+def _summary(doc: Dict[str, Any], digest: str) -> Dict[str, Any]:
+    props = doc.get("properties", {})
+    meta  = props.get("metadata", {})
+    return {"id":          doc.get("id", ""),
+            "displayName": props.get("displayName", ""),
+            "category":    meta.get("category", ""),
+            "version":     props.get("version") or meta.get("version", ""),
+            "updatedOn":   meta.get("updatedOn") or meta.get("createdOn", ""),
+            "policyType":  props.get("policyType", ""),
+            "mode":        props.get("mode", ""),
+            "effect":      ((props.get("parameters") or {}).get("effect") or {})
+                           .get("defaultValue") or
+                           ((props.get("policyRule") or {}).get("then") or {}).get("effect", ""),
+            "description": props.get("description", ""),
+            "parameters":  sorted((props.get("parameters") or {}).keys()),
+            "digest":      digest}
+
+
+async def _sync() -> Dict[str, Any]:
+    """Descarga el listado y publica una generación nueva del catálogo."""
+    folder = _dir()
+    folder.mkdir(parents=True, exist_ok=True)
+    meta = _load_meta()
+    old  = meta["entries"]
+    src_path = _data_path(meta["data"]) if meta["data"] else None
+    if src_path is None or not src_path.exists():
+        old, src_path = {}, None                       # sin datos previos: todo nuevo
+    current: Dict[str, Dict[str, Any]] = {}
+    stats   = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+
+    generation = time.time_ns()
+    tmp = _data_path(generation).with_suffix(".dat.tmp")
+    try:
+        with open(tmp, "wb") as out, \
+             (open(src_path, "rb") if src_path else open(os.devnull, "rb")) as src:
+            async for doc in arm_client.paginate(
+                    "/providers/Microsoft.Authorization/policyDefinitions",
+                    params={"api-version": _API_VERSION, "$filter": "policyType eq 'BuiltIn'"}):
+                raw    = json.dumps(doc, sort_keys=True, separators=(",", ":")).encode()
+                digest = hashlib.sha1(raw).hexdigest()
+                name   = doc["name"]
+                prev   = old.get(name)
+                if prev and prev["digest"] == digest:
+                    src.seek(prev["offset"])
+                    blob  = src.read(prev["length"])
+                    entry = dict(prev)
+                    stats["unchanged"] += 1
+                else:
+                    blob  = zlib.compress(raw, 6)
+                    entry = _summary(doc, digest)
+                    stats["updated" if prev else "added"] += 1
+                entry.update(offset=out.tell(), length=len(blob))
+                out.write(blob)
+                current[name] = entry
+        stats["removed"] = len(set(old) - set(current))
+
+        synced_at = time.time()
+        meta = {"synced_at": synced_at, "data": generation, "entries": current}
+        with _LOCK:                                     # datos, índice y meta a la vez
+            _close()
+            os.replace(tmp, _data_path(generation))
+            _write_atomic(folder / "index.bin", _build_index(current, generation, synced_at))
+            _write_atomic(folder / "meta.json", json.dumps(meta).encode())
+            for stale in folder.glob("definitions.*.dat"):
+                if stale != _data_path(generation):
+                    stale.unlink(missing_ok=True)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return {**stats, "definitions": len(current), "synced_at": synced_at}
+
+
+async def sync_catalog(force: bool = False) -> Dict[str, Any]:
+    """
+    Sincroniza las definiciones built‑in con ARM si el catálogo está
+    caducado (`POLICY_CATALOG_TTL_H`) o si `force`.  Si ya hay una sync en
+    curso en este event loop se espera a esa en lugar de lanzar otra.
+
+    Returns:
+        {"added", "updated", "removed", "unchanged", "definitions", "synced_at"}
+    """
+    if not force:
+        status = catalog_status()
+        if not status["stale"]:
+            return {"skipped": "catálogo vigente", **status}
+    loop = asyncio.get_running_loop()
+    task = _TASK["sync"]
+    if task is None or task.done() or task.get_loop() is not loop:
+        task = _TASK["sync"] = loop.create_task(_sync())
+    return await asyncio.shield(task)
+
+
+def _report(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        # sin credenciales, red caída, …
+        print(f"Error al sincronizar el catálogo de políticas: {task.exception()}")
+
+
+def refresh_in_background() -> None:
+    """Si el catálogo está caducado, lanza `sync_catalog` sin esperar."""
+    task = _TASK["sync"]
+    if (task is None or task.done()) and catalog_status()["stale"]:
+        task = _TASK["sync"] = asyncio.get_running_loop().create_task(_sync())
+        task.add_done_callback(_report)
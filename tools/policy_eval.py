@@ -0,0 +1,378 @@
+"""
+policy_eval.py
+────────────────────────────────────────────────────────────────────────
+Evaluador local de reglas de Azure Policy contra los recursos de una
+plantilla Bicep/ARM, para revisar la landing zone generada antes del
+what‑if de `deploy_landing_zone`.  No usa la red: las definiciones salen
+del catálogo local (`policy_catalog`) o se pasan tal cual.
+
+• load_resources()          – recursos de un .bicep (vía `az bicep build`)
+                              o de una plantilla ARM JSON, con módulos
+• compile_rule()            – policyRule → (predicado, efecto)
+• evaluate()                – muchas reglas × muchos recursos en lote
+
+Condiciones soportadas: field / value con equals, notEquals, in, notIn,
+like, notLike, match, notMatch, contains, notContains, containsKey,
+notContainsKey, exists, greater(OrEquals), less(OrEquals); y allOf,
+anyOf, not.  Los alias `<tipo>/<ruta>` se leen de `properties.<ruta>`;
+con `[*]` la condición se evalúa en cada elemento (también en los que no
+tienen el campo) y se cumple si se cumple en todos.  Lo que no se puede
+decidir sin Azure (`count`, funciones de plantilla sin resolver, …) da
+`None`: el resultado es «unknown», nunca un falso cumplimiento.
+────────────────────────────────────────────────────────────────────────
+"""
+from __future__ import annotations
+import re, json, shutil, pathlib, subprocess
+from collections import Counter
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+Predicate = Callable[[Dict[str, Any]], Optional[bool]]
+
+_REF_RE   = re.compile(r"^\[(parameters|variables)\('([^']+)'\)\]$", re.IGNORECASE)
+_MISSING  = object()
+_TOP_LEVEL = {"name", "type", "location", "kind", "tags", "identity", "sku",
+              "id", "fullname", "properties"}
+
+
+# ──────────────────────────────────────────────────────────────────────
+# recursos de la plantilla
+# ──────────────────────────────────────────────────────────────────────
+def _resolve(value: Any, ctx: Dict[str, Dict[str, Any]], depth: int = 0) -> Any:
+    """Sustituye `[parameters('x')]` / `[variables('x')]` conocidos; el resto se deja."""
+    if isinstance(value, dict):
+        return {k: _resolve(v, ctx, depth) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_resolve(v, ctx, depth) for v in value]
+    if isinstance(value, str) and depth < 10:
+        m = _REF_RE.match(value)
+        if m and m.group(2) in ctx[m.group(1).lower()]:
+            return _resolve(ctx[m.group(1).lower()][m.group(2)], ctx, depth + 1)
+    return value
+
+
+def _template_resources(template: Dict[str, Any], values: Dict[str, Any]) -> List[Dict[str, Any]]:
+    params = {k: values[k] if k in values else p.get("defaultValue", _MISSING)
+              for k, p in template.get("parameters", {}).items()}
+    ctx = {"parameters": {k: v for k, v in params.items() if v is not _MISSING},
+           "variables":  template.get("variables", {})}
+
+    resources = template.get("resources", [])
+    if isinstance(resources, dict):                   # languageVersion 2.0
+        resources = list(resources.values())
+
+    found: List[Dict[str, Any]] = []
+    for res in resources:
+        if res.get("existing"):
+            continue
+        if res.get("type", "").lower() == "microsoft.resources/deployments" and \
+                "template" in res.get("properties", {}):
+            inner = {k: _resolve(v.get("value"), ctx)
+                     for k, v in res["properties"].get("parameters", {}).items()
+                     if isinstance(v, dict) and "value" in v}
+            found += _template_resources(res["properties"]["template"], inner)
+            continue
+        found.append(_resolve(res, ctx))
+    return found
+
+
+def load_resources(template: str | pathlib.Path,
+                   parameters: str | pathlib.Path | Dict[str, Any] | None = None
+                   ) -> List[Dict[str, Any]]:
+    """
+    Recursos desplegables de una plantilla (.bicep o ARM .json), aplanando
+    los módulos (`Microsoft.Resources/deployments` anidados).
+
+    Args:
+        template: Ruta al .bicep (se compila en local con `az bicep build`)
+            o a la plantilla ARM JSON.
+        parameters: Fichero de parámetros ARM o dict {nombre: valor}
+            (def. `<plantilla>.parameters.json` junto a la plantilla).
+
+    Raises:
+        RuntimeError sin Azure CLI, `subprocess.CalledProcessError` si el
+        Bicep no compila, OSError/ValueError si falta o no es JSON válido.
+    """
+    path = pathlib.Path(template)
+    if path.suffix == ".bicep":
+        az = shutil.which("az")
+        if not az:
+            raise RuntimeError("No se encuentra Azure CLI (az) para compilar el Bicep")
+        out = subprocess.run([az, "bicep", "build", "--file", str(path), "--stdout"],
+                             check=True, text=True, capture_output=True)
+        compiled = json.loads(out.stdout)
+    else:
+        compiled = json.loads(path.read_text(encoding="utf-8"))
+
+    if parameters is None:
+        default = path.with_name(path.stem + ".parameters.json")
+        parameters = default if default.exists() else {}
+    if not isinstance(parameters, dict):
+        raw = json.loads(pathlib.Path(parameters).read_text(encoding="utf-8"))
+        parameters = {k: v.get("value") for k, v in raw.get("parameters", {}).items()}
+    return _template_resources(compiled, parameters)
+
+
+# ──────────────────────────────────────────────────────────────────────
+# compilación de reglas
+# ──────────────────────────────────────────────────────────────────────
+def _walk(obj: Any, parts: List[str]) -> Any:
+    """
+    Valor en la ruta; un `[*]` devuelve una tupla (el JSON nunca trae
+    tuplas) con el valor de cada elemento, `_MISSING` incluido para los
+    que no tienen el campo.  Como en los alias de Azure, si un segmento no
+    está en un objeto se busca en su `properties` (los elementos de
+    `securityRules`, `ipRules`, … guardan ahí sus campos).
+    """
+    for i, part in enumerate(parts):
+        if part.endswith("[*]"):
+            obj = _walk(obj, [part[:-3]]) if part[:-3] else obj
+            if not isinstance(obj, list):
+                return _MISSING
+            values: List[Any] = []
+            for item in obj:
+                value = _walk(item, parts[i + 1:]) if parts[i + 1:] else item
+                values.extend(value if isinstance(value, tuple) else [value])
+            return tuple(values)
+        if not isinstance(obj, dict):
+            return _MISSING
+        key = next((k for k in obj if k.lower() == part.lower()), None)
+        if key is None:
+            nested = next((v for k, v in obj.items() if k.lower() == "properties"), None)
+            if not isinstance(nested, dict):
+                return _MISSING
+            return _walk(nested, parts[i:])
+        obj = obj[key]
+    return obj
+
+
+def _field_getter(field: str) -> Callable[[Dict[str, Any]], Any]:
+    lower = field.lower()
+    m = re.match(r"^tags(?:\['([^']+)'\]|\.(.+))$", field, re.IGNORECASE)
+    if m:
+        tag = m.group(1) or m.group(2)
+        def _tag(r: Dict[str, Any]) -> Any:
+            tags = r.get("tags") or {}
+            return tags if isinstance(tags, str) else _walk(tags, [tag])
+        return _tag
+    if lower == "fullname":
+        return lambda r: r.get("name", _MISSING)
+    if lower in _TOP_LEVEL or "." in field and "/" not in field:
+        parts = field.split(".")
+        return lambda r: _walk(r, parts)
+
+    # alias: <Proveedor>/<tipo>[/<subtipo>]/<ruta.con.puntos>
+    def _alias(r: Dict[str, Any]) -> Any:
+        rtype = r.get("type", "")
+        if not lower.startswith(rtype.lower() + "/"):
+            return _MISSING
+        parts = field[len(rtype) + 1:].split(".")
+        value = _walk(r.get("properties") or {}, parts)
+        return _walk(r, parts) if value is _MISSING else value
+    return _alias
+
+
+def _norm(value: Any) -> Any:
+    return value.lower() if isinstance(value, str) else value
+
+
+def _like(pattern: str) -> re.Pattern:
+    return re.compile("^" + ".*".join(map(re.escape, pattern.split("*"))) + "$", re.IGNORECASE)
+
+
+def _match(pattern: str) -> re.Pattern:
+    table = {"#": r"\d", "?": "[A-Za-z]", ".": "."}
+    return re.compile("^" + "".join(table.get(c, re.escape(c)) for c in pattern) + "$")
+
+
+def _compare(a: Any, b: Any, op: str) -> Optional[bool]:
+    try:
+        a, b = _norm(a), _norm(b)
+        return {"greater": a > b, "greaterOrEquals": a >= b,
+                "less": a < b, "lessOrEquals": a <= b}[op]
+    except TypeError:
+        return None
+
+
+def _operator(op: str, arg: Any) -> Callable[[Any], Optional[bool]]:
+    """Comparador de un valor ya resuelto (`_MISSING` si no existe)."""
+    if op == "exists":
+        want = str(arg).lower() == "true"
+        return lambda v: (v is not _MISSING and v is not None) == want
+    if op in ("equals", "notEquals"):
+        target = _norm(arg)
+        eq = lambda v: v is not _MISSING and _norm(v) == target
+        return eq if op == "equals" else (lambda v: not eq(v))
+    if op in ("in", "notIn"):
+        if not isinstance(arg, list):
+            return lambda v: None
+        targets = {json.dumps(_norm(a), sort_keys=True) for a in arg}
+        isin = lambda v: v is not _MISSING and json.dumps(_norm(v), sort_keys=True) in targets
+        return isin if op == "in" else (lambda v: not isin(v))
+    if op in ("like", "notLike", "match", "notMatch", "matchInsensitively",
+              "notMatchInsensitively"):
+        if not isinstance(arg, str):
+            return lambda v: None
+        rx = _like(arg) if "ike" in op else _match(arg.lower() if "Insens" in op else arg)
+        norm = (lambda v: v.lower()) if "Insens" in op else (lambda v: v)
+        hit = lambda v: isinstance(v, str) and bool(rx.match(norm(v)))
+        return hit if not op.startswith("not") else (lambda v: not hit(v))
+    if op in ("contains", "notContains"):
+        needle = _norm(arg)
+        def _has(v: Any) -> bool:
+            if isinstance(v, str):
+                return isinstance(needle, str) and needle in v.lower()
+            if isinstance(v, list):
+                return needle in [_norm(x) for x in v]
+            return False
+        return _has if op == "contains" else (lambda v: not _has(v))
+    if op in ("containsKey", "notContainsKey"):
+        key = str(arg).lower()
+        has = lambda v: isinstance(v, dict) and key in {k.lower() for k in v}
+        return has if op == "containsKey" else (lambda v: not has(v))
+    if op in ("greater", "greaterOrEquals", "less", "lessOrEquals"):
+        return lambda v: None if v is _MISSING else _compare(v, arg, op)
+    return lambda v: None
+
+
+_PARAM_RE = re.compile(r"^\[parameters\('([^']+)'\)\]$", re.IGNORECASE)
+
+
+def _substitute(value: Any, params: Dict[str, Any]) -> Any:
+    """`[parameters('x')]` → valor; otras expresiones quedan como `_MISSING`."""
+    if isinstance(value, str) and value.startswith("[") and not value.startswith("[["):
+        m = _PARAM_RE.match(value)
+        return params.get(m.group(1), _MISSING) if m else _MISSING
+    if isinstance(value, list):
+        return [_substitute(v, params) for v in value]
+    return value
+
+
+def _compile(cond: Dict[str, Any], params: Dict[str, Any]) -> Predicate:
+    if "allOf" in cond:
+        parts = [_compile(c, params) for c in cond["allOf"]]
+        def _all(r: Dict[str, Any]) -> Optional[bool]:
+            unknown = False
+            for p in parts:
+                res = p(r)
+                if res is False:
+                    return False
+                unknown |= res is None
+            return None if unknown else True
+        return _all
+    if "anyOf" in cond:
+        parts = [_compile(c, params) for c in cond["anyOf"]]
+        def _any(r: Dict[str, Any]) -> Optional[bool]:
+            unknown = False
+            for p in parts:
+                res = p(r)
+                if res is True:
+                    return True
+                unknown |= res is None
+            return None if unknown else False
+        return _any
+    if "not" in cond:
+        inner = _compile(cond["not"], params)
+        return lambda r: None if (res := inner(r)) is None else not res
+
+    ops = [k for k in cond if k not in ("field", "value", "count")]
+    if "count" in cond or len(ops) != 1:
+        return lambda r: None
+    op, arg = ops[0], _substitute(cond[ops[0]], params)
+    if arg is _MISSING or (isinstance(arg, list) and _MISSING in arg):
+        return lambda r: None
+    test = _operator(op, arg)
+
+    if "value" in cond:
+        value = _substitute(cond["value"], params)
+        if value is _MISSING:
+            return lambda r: None
+        res = test(value)
+        return lambda r: res
+
+    field = cond.get("field")
+    if not isinstance(field, str):
+        return lambda r: None
+    get = _field_getter(field)
+
+    def _leaf(r: Dict[str, Any]) -> Optional[bool]:
+        value = get(r)
+        if isinstance(value, str) and value.startswith("[") and not value.startswith("[["):
+            return None                               # expresión de plantilla sin resolver
+        if isinstance(value, tuple):                  # `[*]`: se cumple si cumplen todos
+            results = [test(v) for v in value]
+            if False in results:
+                return False
+            return None if None in results else True
+        return test(value)
+    return _leaf
+
+
+def compile_rule(definition: Dict[str, Any],
+                 parameters: Dict[str, Any] | None = None) -> Tuple[Predicate, str]:
+    """
+    Compila el `policyRule` de una definición.
+
+    Args:
+        definition: Definición completa (con o sin envoltorio `properties`).
+        parameters: Valores de parámetros de la asignación; los que falten
+            toman su `defaultValue`.
+
+    Returns:
+        (predicado(recurso) → True/False/None, efecto en minúsculas)
+    """
+    props  = definition.get("properties", definition)
+    values = {k: p["defaultValue"] for k, p in (props.get("parameters") or {}).items()
+              if "defaultValue" in p}
+    values.update(parameters or {})
+    rule   = props.get("policyRule") or {}
+    effect = _substitute((rule.get("then") or {}).get("effect", ""), values)
+    effect = effect.lower() if isinstance(effect, str) else "unknown"
+    return _compile(rule.get("if") or {}, values), effect
+
+
+# ──────────────────────────────────────────────────────────────────────
+# evaluación en lote
+# ──────────────────────────────────────────────────────────────────────
+_EXISTENCE = {"auditifnotexists", "deployifnotexists"}
+
+
+def evaluate(resources: List[Dict[str, Any]], definitions: List[Dict[str, Any]],
+             parameters: Dict[str, Dict[str, Any]] | None = None) -> Dict[str, Any]:
+    """
+    Evalúa cada definición contra cada recurso.
+
+    Args:
+        resources: Recursos (p.ej. de `load_resources`).
+        definitions: Definiciones completas de Azure Policy.
+        parameters: {nombre de la definición: {parámetro: valor}} (opcional).
+
+    Returns:
+        {"summary": {"violation", "unknown", "needs_azure", …},
+         "findings": [{policy, displayName, effect, resource, type, result}, …]}
+        Sólo se listan recursos a los que la regla aplica (o podría aplicar).
+    """
+    parameters = parameters or {}
+    findings: List[Dict[str, Any]] = []
+    for definition in definitions:
+        name  = definition.get("name", "")
+        props = definition.get("properties", definition)
+        predicate, effect = compile_rule(definition, parameters.get(name))
+        if effect == "disabled":
+            continue
+        for res in resources:
+            hit = predicate(res)
+            if hit is False:
+                continue
+            if hit is None:
+                result = "unknown"
+            elif effect in _EXISTENCE:
+                result = "needs_azure"                # depende de recursos relacionados
+            elif effect in ("modify", "append"):
+                result = "would_modify"
+            else:
+                result = "violation"
+            findings.append({"policy": name, "displayName": props.get("displayName", ""),
+                             "effect": effect, "resource": res.get("name"),
+                             "type": res.get("type"), "result": result})
+    return {"summary": dict(Counter(f["result"] for f in findings)),
+            "findings": findings}
@@ -0,0 +1,199 @@
+"""
+policy_report.py
+────────────────────────────────────────────────────────────────────────
+Informe de Azure Policy escrito en streaming: definiciones y asignaciones
+se recorren una sola vez (sirven generadores, también asíncronos como
+`arm_client.paginate`, de modo que las páginas de ARM van directas al
+informe sin reunirse en una lista), las filas de cada sección
+van a ficheros temporales (spools) mientras se acumulan los contadores, y
+al final se ensambla el informe en un temporal junto al destino que se
+renombra de forma atómica.  La memoria no crece con el nº de entradas.
+
+• write_policy_report()     – Markdown o JSON con resumen, categorías,
+                              efectos, cumplimiento y tablas por scope
+────────────────────────────────────────────────────────────────────────
+"""
+from __future__ import annotations
+import os, json, shutil, tempfile, pathlib
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterable, AsyncIterable, AsyncIterator, Optional, IO, Union
+
+_SPOOL_BYTES = 64 * 1024           # cada sección en memoria hasta 64 KB, luego a disco
+
+Rows = Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]]
+
+
+async def _rows(source: Rows | None) -> AsyncIterator[Dict[str, Any]]:
+    """Recorre igual un iterable normal o uno asíncrono."""
+    if source is None:
+        return
+    if hasattr(source, "__aiter__"):
+        async for item in source:
+            yield item
+    else:
+        for item in source:
+            yield item
+
+
+def _spool() -> IO[str]:
+    return tempfile.SpooledTemporaryFile(max_size=_SPOOL_BYTES, mode="w+", encoding="utf-8")
+
+
+def _cell(value: Any) -> str:
+    return str(value if value not in (None, "") else "-").replace("|", "\\|").replace("\n", " ")
+
+
+def _definition_row(definition: Dict[str, Any]) -> Dict[str, Any]:
+    props  = definition.get("properties", definition)
+    params = props.get("parameters") or {}
+    effect = (params.get("effect") or {}).get("defaultValue") or \
+             ((props.get("policyRule") or {}).get("then") or {}).get("effect", "")
+    if isinstance(effect, str) and effect.startswith("["):
+        effect = "(parámetro)"
+    return {"name":        definition.get("name", ""),
+            "displayName": props.get("displayName") or "Sin nombre",
+            "category":    (props.get("metadata") or {}).get("category") or "Sin categoría",
+            "effect":      effect or "-",
+            "policyType":  props.get("policyType", "")}
+
+
+def _assignment_row(assignment: Dict[str, Any],
+                    noncompliant: Dict[str, int]) -> Dict[str, Any]:
+    props = assignment.get("properties", assignment)
+    aid   = assignment.get("id", "")
+    return {"name":             props.get("displayName") or assignment.get("name", "Sin nombre"),
+            "scope":            props.get("scope") or aid.split("/providers/Microsoft.Authorization")[0] or "-",
+            "definition":       (props.get("policyDefinitionId") or "").rsplit("/", 1)[-1],
+            "enforcementMode":  props.get("enforcementMode", "Default"),
+            "nonCompliant":     noncompliant.get(aid.lower())}
+
+
+async def _noncompliance(compliance: Rows | None) -> Dict[str, int]:
+    """Filas de `query_policy_states` o asignaciones de `summarize_policy_compliance`."""
+    totals: Counter = Counter()
+    async for row in _rows(compliance):
+        aid = (row.get("policyAssignmentId") or row.get("id") or "").lower()
+        if aid:
+            totals[aid] += row.get("count", row.get("nonCompliantResources", 0)) or 0
+    return totals
+
+
+def _write_md(out: IO[str], meta: Dict[str, Any], categories: Counter, effects: Counter,
+              scopes: Dict[str, IO[str]], definitions: IO[str]) -> None:
+    out.write("# Informe de Políticas de Azure\n\n")
+    out.write(f"_Generado: {meta['generated']}_\n\n## Resumen\n\n")
+    out.write(f"- Definiciones: **{meta['definitions']}**\n")
+    out.write(f"- Asignaciones: **{meta['assignments']}** en {len(scopes)} scopes\n")
+    if meta["nonCompliant"] is not None:
+        out.write(f"- Recursos no conformes (suma por asignación): **{meta['nonCompliant']}**\n")
+
+    for title, counter in (("Definiciones por categoría", categories),
+                           ("Definiciones por efecto", effects)):
+        out.write(f"\n## {title}\n\n| | Nº |\n|---|---:|\n")
+        for key, n in counter.most_common():
+            out.write(f"| {_cell(key)} | {n} |\n")
+
+    out.write("\n## Asignaciones por scope\n")
+    for scope in sorted(scopes):
+        out.write(f"\n### `{scope}`\n\n| Asignación | Definición | Enforcement | No conformes |\n"
+                  "|---|---|---|---:|\n")
+        scopes[scope].seek(0)
+        shutil.copyfileobj(scopes[scope], out)
+
+    out.write("\n## Definiciones\n\n| Nombre | Categoría | Efecto | Tipo |\n|---|---|---|---|\n")
+    definitions.seek(0)
+    shutil.copyfileobj(definitions, out)
+
+
+def _write_json(out: IO[str], meta: Dict[str, Any], categories: Counter, effects: Counter,
+                scopes: Dict[str, IO[str]], definitions: IO[str]) -> None:
+    out.write('{"summary": ' + json.dumps({**meta, "scopes": len(scopes)}, ensure_ascii=False))
+    out.write(', "byCategory": ' + json.dumps(dict(categories.most_common()), ensure_ascii=False))
+    out.write(', "byEffect": ' + json.dumps(dict(effects.most_common()), ensure_ascii=False))
+    out.write(', "assignmentsByScope": {')
+    for i, scope in enumerate(sorted(scopes)):
+        out.write((", " if i else "") + json.dumps(scope) + ": [")
+        scopes[scope].seek(0)
+        shutil.copyfileobj(scopes[scope], out)
+        out.write("]")
+    out.write('}, "definitions": [')
+    definitions.seek(0)
+    shutil.copyfileobj(definitions, out)
+    out.write("]}\n")
+
+
+async def write_policy_report(definitions: Rows,
+                              assignments: Rows,
+                              path: str | pathlib.Path,
+                              fmt: str = "md",
+                              compliance: Optional[Rows] = None
+                              ) -> Dict[str, Any]:
+    """
+    Escribe el informe en `path` (atómico: temporal + rename).
+
+    Args:
+        definitions: Definiciones (formato ARM o resumen plano); basta un
+            generador, normal o asíncrono (p.ej. `arm_client.paginate`).
+        assignments: Asignaciones (formato ARM); ídem.
+        path: Fichero de salida.
+        fmt: "md" o "json".
+        compliance: Filas de `query_policy_states` o las `assignments` de
+            `summarize_policy_compliance` (opcional).
+
+    Returns:
+        Resumen: {"path", "definitions", "assignments", "nonCompliant", …}
+    """
+    if fmt not in ("md", "json"):
+        raise ValueError("fmt debe ser 'md' o 'json'")
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    noncompliant = await _noncompliance(compliance)
+    categories, effects = Counter(), Counter()
+    scopes: Dict[str, IO[str]] = {}
+    meta = {"generated": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "definitions": 0, "assignments": 0,
+            "nonCompliant": sum(noncompliant.values()) if compliance is not None else None}
+
+    with _spool() as defs:
+        async for definition in _rows(definitions):
+            row = _definition_row(definition)
+            categories[row["category"]] += 1
+            effects[row["effect"]] += 1
+            if fmt == "md":
+                defs.write(f"| {_cell(row['displayName'])} | {_cell(row['category'])} | "
+                           f"{_cell(row['effect'])} | {_cell(row['policyType'])} |\n")
+            else:
+                defs.write((", " if meta["definitions"] else "") +
+                           json.dumps(row, ensure_ascii=False))
+            meta["definitions"] += 1
+
+        try:
+            async for assignment in _rows(assignments):
+                row   = _assignment_row(assignment, noncompliant)
+                spool = scopes.get(row["scope"])
+                first = spool is None
+                if first:
+                    spool = scopes[row["scope"]] = _spool()
+                if fmt == "md":
+                    spool.write(f"| {_cell(row['name'])} | {_cell(row['definition'])} | "
+                                f"{_cell(row['enforcementMode'])} | {_cell(row['nonCompliant'])} |\n")
+                else:
+                    spool.write(("" if first else ", ") + json.dumps(row, ensure_ascii=False))
+                meta["assignments"] += 1
+
+            fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as out:
+                    (_write_md if fmt == "md" else _write_json)(
+                        out, meta, categories, effects, scopes, defs)
+                os.replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        finally:
+            for spool in scopes.values():
+                spool.close()
+
+    return {"path": str(path), **meta, "scopes": len(scopes)}
@@ -0,0 +1,157 @@
+"""
+policy_search.py
+────────────────────────────────────────────────────────────────────────
+Búsqueda por texto sobre las definiciones del catálogo local
+(`policy_catalog`), para que el agente no tenga que leer el listado
+completo de políticas en su contexto.
+
+Índice invertido en memoria con ranking BM25 sobre displayName,
+description, category y nombres de parámetro (displayName y category
+pesan más).  Se construye la primera vez y, cuando el catálogo cambia,
+sólo se reindexan las definiciones cuyo digest es distinto.
+
+• search()                  – top‑k resultados compactos para una consulta
+• index_stats()             – documentos, términos, última actualización
+────────────────────────────────────────────────────────────────────────
+"""
+from __future__ import annotations
+import re, math, heapq, threading
+from collections import Counter
+from typing import Dict, List, Any, Optional
+
+from tools import policy_catalog
+
+_K1, _B = 1.2, 0.75
+_FIELD_WEIGHTS = {"displayName": 3, "category": 2, "parameters": 1, "description": 1}
+_TOKEN_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+_LOCK = threading.Lock()
+_INDEX: dict[str, Any] = {
+    "digests":  {},          # name → digest indexado
+    "terms":    {},          # name → Counter(término → tf ponderada)
+    "postings": {},          # término → {name: tf}
+    "lengths":  {},          # name → longitud ponderada
+    "total":    0,           # suma de longitudes
+    "docs":     {},          # name → resumen del catálogo
+    "version":  None,        # catalog_version() indexada
+}
+
+
+def _tokens(text: str) -> List[str]:
+    """Minúsculas, separando también camelCase (allowedLocations → allowed, locations)."""
+    return [t.lower() for t in _TOKEN_RE.findall(text or "")]
+
+
+def _doc_terms(entry: Dict[str, Any]) -> Counter:
+    terms: Counter = Counter()
+    for field, weight in _FIELD_WEIGHTS.items():
+        value = entry.get(field, "")
+        text  = " ".join(value) if isinstance(value, list) else value
+        for tok in _tokens(text):
+            terms[tok] += weight
+    return terms
+
+
+def _remove(name: str) -> None:
+    for term in _INDEX["terms"].pop(name, {}):
+        posting = _INDEX["postings"][term]
+        posting.pop(name, None)
+        if not posting:
+            del _INDEX["postings"][term]
+    _INDEX["total"] -= _INDEX["lengths"].pop(name, 0)
+    _INDEX["digests"].pop(name, None)
+    _INDEX["docs"].pop(name, None)
+
+
+def _add(name: str, entry: Dict[str, Any]) -> None:
+    terms = _doc_terms(entry)
+    for term, tf in terms.items():
+        _INDEX["postings"].setdefault(term, {})[name] = tf
+    _INDEX["terms"][name]   = terms
+    _INDEX["lengths"][name] = sum(terms.values())
+    _INDEX["total"]        += _INDEX["lengths"][name]
+    _INDEX["digests"][name] = entry["digest"]
+    _INDEX["docs"][name]    = entry
+
+
+def _refresh() -> Dict[str, int]:
+    """Alinea el índice con el catálogo (sólo lo que cambió).  Con `_LOCK`."""
+    version = policy_catalog.catalog_version()
+    if version == _INDEX["version"]:
+        return {"added": 0, "updated": 0, "removed": 0}
+
+    entries = policy_catalog.entries()
+    stats   = {"added": 0, "updated": 0, "removed": 0}
+    for name in set(_INDEX["digests"]) - set(entries):
+        _remove(name)
+        stats["removed"] += 1
+    for name, entry in entries.items():
+        digest = _INDEX["digests"].get(name)
+        if digest == entry["digest"]:
+            continue
+        if digest is not None:
+            _remove(name)
+            stats["updated"] += 1
+        else:
+            stats["added"] += 1
+        _add(name, entry)
+    _INDEX["version"] = version
+    return stats
+
+
+def _matches(entry: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+    for field, wanted in filters.items():
+        values = wanted if isinstance(wanted, (list, tuple, set)) else [wanted]
+        if str(entry.get(field, "")).lower() not in {str(v).lower() for v in values}:
+            return False
+    return True
+
+
+def search(query: str, top_k: int = 10,
+           filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Definiciones más relevantes para `query` (BM25).
+
+    Args:
+        query: Texto libre, p.ej. "storage public network access".
+        top_k: Nº máximo de resultados.
+        filters: Igualdad (sin mayúsculas) sobre campos del resumen, p.ej.
+            {"category": "Storage", "effect": ["Audit", "Deny"]}.
+
+    Returns:
+        [{name, id, displayName, category, effect, version, score}, …]
+    """
+    filters = filters or {}
+    with _LOCK:
+        _refresh()
+        n = len(_INDEX["lengths"])
+        if not n:
+            return []
+        avg    = _INDEX["total"] / n
+        scores: Counter = Counter()
+        for term in set(_tokens(query)):
+            posting = _INDEX["postings"].get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for name, tf in posting.items():
+                norm = _K1 * (1 - _B + _B * _INDEX["lengths"][name] / avg)
+                scores[name] += idf * tf * (_K1 + 1) / (tf + norm)
+
+        docs = _INDEX["docs"]
+        if not query.strip():                       # sólo filtros
+            scores = Counter({name: 0.0 for name in docs})
+        hits = heapq.nlargest(top_k, (item for item in scores.items()
+                                      if _matches(docs[item[0]], filters)),
+                              key=lambda item: item[1])
+    return [{"name": name, "id": docs[name]["id"],
+             "displayName": docs[name]["displayName"],
+             "category": docs[name]["category"], "effect": docs[name]["effect"],
+             "version": docs[name]["version"], "score": round(score, 3)}
+            for name, score in hits]
+
+
+def index_stats() -> Dict[str, Any]:
+    with _LOCK:
+        return {"documents": len(_INDEX["lengths"]), "terms": len(_INDEX["postings"]),
+                "catalog_version": _INDEX["version"]}
@@ -0,0 +1,233 @@
+"""
+policy_sync.py
+────────────────────────────────────────────────────────────────────────
+Sincronización incremental de definiciones y asignaciones de Azure Policy
+con detección de cambios, para responder «¿qué ha cambiado en nuestras
+políticas desde ayer?» sin volver a descargar y comparar todo en el LLM.
+
+Por suscripción se guarda una instantánea comprimida con un resumen de
+cada elemento (version, updatedOn, efecto, parámetros, scope, …) y un
+digest del documento.  En cada sync:
+  – definiciones custom y asignaciones: un listado ARM con `$filter`
+  – built‑in (opcional): las aporta el catálogo local (`policy_catalog`),
+    que sólo vuelve a ARM si está caducado (`POLICY_CATALOG_TTL_H`) y
+    sólo reescribe las que cambiaron; aquí sólo se abren las entradas
+    cuyo digest difiere de la instantánea
+y se emite un diff estructurado (añadidos, eliminados, modificados con
+los campos y parámetros que cambian) que además se apunta en un
+changelog JSONL consultable sin red.
+
+• sync_policies()           – sincroniza y devuelve el diff
+• changelog()               – cambios registrados desde una fecha
+
+Variables de entorno (opcionales):
+    POLICY_SYNC_DIR         def. ~/.cache/zerotrust-autogen/policy_sync
+────────────────────────────────────────────────────────────────────────
+"""
+from __future__ import annotations
+import os, json, zlib, hashlib, pathlib
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional
+
+from tools import arm_client, policy_catalog
+
+_API_VERSION = "2021-06-01"
+_COMPARED = ("displayName", "version", "updatedOn", "mode", "effect", "policyType",
+             "ruleDigest", "policyDefinitionId", "scope", "enforcementMode", "notScopes")
+
+
+def _dir() -> pathlib.Path:
+    return pathlib.Path(os.getenv("POLICY_SYNC_DIR")
+                        or pathlib.Path.home() / ".cache" / "zerotrust-autogen" / "policy_sync")
+
+
+def _digest(obj: Any) -> str:
+    return hashlib.sha1(json.dumps(obj, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def _load_snapshot(subscription_id: str) -> Dict[str, Any]:
+    path = _dir() / f"{subscription_id}.json.z"
+    if not path.exists():
+        return {"taken_at": None, "definitions": {}, "assignments": {}}
+    return json.loads(zlib.decompress(path.read_bytes()))
+
+
+def _save_snapshot(subscription_id: str, snapshot: Dict[str, Any]) -> None:
+    path = _dir() / f"{subscription_id}.json.z"
+    tmp  = path.with_suffix(".tmp")
+    tmp.write_bytes(zlib.compress(json.dumps(snapshot).encode(), 6))
+    os.replace(tmp, path)
+
+
+# ──────────────────────────────────────────────────────────────────────
+# resúmenes
+# ──────────────────────────────────────────────────────────────────────
+def _definition_summary(doc: Dict[str, Any]) -> Dict[str, Any]:
+    props  = doc.get("properties", {})
+    meta   = props.get("metadata") or {}
+    params = props.get("parameters") or {}
+    rule   = props.get("policyRule") or {}
+    return {"name":        doc.get("name", ""),
+            "displayName": props.get("displayName", ""),
+            "policyType":  props.get("policyType", ""),
+            "version":     props.get("version") or meta.get("version", ""),
+            "updatedOn":   meta.get("updatedOn") or meta.get("createdOn", ""),
+            "mode":        props.get("mode", ""),
+            "effect":      (params.get("effect") or {}).get("defaultValue") or
+                           (rule.get("then") or {}).get("effect", ""),
+            "parameters":  {k: {f: p[f] for f in ("type", "defaultValue", "allowedValues")
+                                if f in p}
+                            for k, p in params.items()},
+            "ruleDigest":  _digest(rule),
+            "digest":      _digest({k: v for k, v in doc.items() if k != "systemData"})}
+
+
+def _assignment_summary(doc: Dict[str, Any]) -> Dict[str, Any]:
+    props = doc.get("properties", {})
+    return {"name":               doc.get("name", ""),
+            "displayName":        props.get("displayName", ""),
+            "policyDefinitionId": props.get("policyDefinitionId", ""),
+            "scope":              props.get("scope", ""),
+            "enforcementMode":    props.get("enforcementMode", "Default"),
+            "notScopes":          props.get("notScopes") or [],
+            "parameters":         {k: v.get("value") if isinstance(v, dict) else v
+                                   for k, v in (props.get("parameters") or {}).items()},
+            "digest":             _digest({k: v for k, v in doc.items() if k != "systemData"})}
+
+
+# ──────────────────────────────────────────────────────────────────────
+# diff
+# ──────────────────────────────────────────────────────────────────────
+def _parameter_changes(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    changes: Dict[str, Any] = {}
+    added   = sorted(set(after) - set(before))
+    removed = sorted(set(before) - set(after))
+    changed = {k: {"before": before[k], "after": after[k]}
+               for k in sorted(set(before) & set(after)) if before[k] != after[k]}
+    if added:
+        changes["added"] = added
+    if removed:
+        changes["removed"] = removed
+    if changed:
+        changes["changed"] = changed
+    return changes
+
+
+def _diff(old: Dict[str, Dict[str, Any]], new: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    def _brief(item: Dict[str, Any]) -> Dict[str, Any]:
+        return {"name": item["name"], "displayName": item.get("displayName", "")}
+
+    modified = []
+    for key in sorted(set(old) & set(new)):
+        a, b = old[key], new[key]
+        if a["digest"] == b["digest"]:
+            continue
+        fields = {f: {"before": a.get(f), "after": b.get(f)}
+                  for f in _COMPARED if a.get(f) != b.get(f)}
+        entry = {"id": key, **_brief(b), "changes": fields}
+        params = _parameter_changes(a.get("parameters", {}), b.get("parameters", {}))
+        if params:
+            entry["parameters"] = params
+        if not fields and not params:
+            entry["changes"] = {"(otros)": "el documento cambió fuera de los campos resumidos"}
+        modified.append(entry)
+    return {"added":    [{"id": k, **_brief(new[k])} for k in sorted(set(new) - set(old))],
+            "removed":  [{"id": k, **_brief(old[k])} for k in sorted(set(old) - set(new))],
+            "modified": modified}
+
+
+# ──────────────────────────────────────────────────────────────────────
+# sync
+# ──────────────────────────────────────────────────────────────────────
+async def _builtin_definitions(previous: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Built‑in desde el catálogo (resincronizado sólo si está caducado);
+    sólo se descomprimen las que cambiaron."""
+    await policy_catalog.sync_catalog()
+    current: Dict[str, Dict[str, Any]] = {}
+    for name, entry in policy_catalog.entries().items():
+        key  = entry["id"].lower()
+        prev = previous.get(key)
+        if prev and prev.get("catalogDigest") == entry["digest"]:
+            current[key] = prev
+            continue
+        doc = policy_catalog.lookup(name)
+        if doc:
+            current[key] = {**_definition_summary(doc), "catalogDigest": entry["digest"]}
+    return current
+
+
+async def sync_policies(subscription_id: str, include_builtin: bool = False) -> Dict[str, Any]:
+    """
+    Sincroniza definiciones y asignaciones de la suscripción contra la
+    última instantánea y devuelve qué ha cambiado.
+
+    Returns:
+        {"since", "taken_at", "definitions": {added, removed, modified},
+         "assignments": {added, removed, modified}, "counts": {...}}
+    """
+    previous = _load_snapshot(subscription_id)
+    base     = f"/subscriptions/{subscription_id}/providers/Microsoft.Authorization"
+
+    definitions: Dict[str, Dict[str, Any]] = {}
+    async for doc in arm_client.paginate(f"{base}/policyDefinitions",
+                                         params={"api-version": _API_VERSION,
+                                                 "$filter": "policyType eq 'Custom'"}):
+        definitions[doc["id"].lower()] = _definition_summary(doc)
+    if include_builtin:
+        builtin_prev = {k: v for k, v in previous["definitions"].items()
+                        if v.get("policyType") == "BuiltIn"}
+        definitions.update(await _builtin_definitions(builtin_prev))
+        old_definitions = previous["definitions"]
+    else:
+        old_definitions = {k: v for k, v in previous["definitions"].items()
+                           if v.get("policyType") != "BuiltIn"}
+
+    assignments = {doc["id"].lower(): _assignment_summary(doc)
+                   async for doc in arm_client.paginate(f"{base}/policyAssignments",
+                                                        params={"api-version": _API_VERSION})}
+
+    taken_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    result = {"subscription": subscription_id,
+              "since":        previous["taken_at"],
+              "taken_at":     taken_at,
+              "definitions":  _diff(old_definitions, definitions),
+              "assignments":  _diff(previous["assignments"], assignments)}
+    result["counts"] = {kind: {k: len(v) for k, v in result[kind].items()}
+                        for kind in ("definitions", "assignments")}
+
+    _dir().mkdir(parents=True, exist_ok=True)
+    if not include_builtin:                          # conserva las built‑in ya vistas
+        definitions.update({k: v for k, v in previous["definitions"].items()
+                            if v.get("policyType") == "BuiltIn"})
+    _save_snapshot(subscription_id, {"taken_at": taken_at, "definitions": definitions,
+                                     "assignments": assignments})
+    if previous["taken_at"] and any(n for c in result["counts"].values() for n in c.values()):
+        with open(_dir() / "changelog.jsonl", "a", encoding="utf-8") as log:
+            log.write(json.dumps(result, ensure_ascii=False) + "\n")
+    return result
+
+
+def _utc(moment: datetime) -> datetime:
+    """Fecha con zona UTC; las naive se toman ya como UTC."""
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None \
+        else moment.astimezone(timezone.utc)
+
+
+def changelog(since: Optional[datetime] = None,
+              subscription_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Diffs registrados (más antiguos primero), opcionalmente desde `since`
+    (con zona, o naive en UTC)."""
+    path = _dir() / "changelog.jsonl"
+    if not path.exists():
+        return []
+    since = _utc(since) if since is not None else None
+    entries = []
+    with open(path, encoding="utf-8") as log:
+        for line in log:
+            entry = json.loads(line)
+            if subscription_id and entry["subscription"] != subscription_id:
+                continue
+            taken = _utc(datetime.fromisoformat(entry["taken_at"]))
+            if since is None or taken >= since:
+                entries.append(entry)
+    return entries
@@ -3,10 +3,21 @@ policy_tools.py
 ────────────────────────────────────────────────────────────────────────
 Utilidades de Azure Policy para Zero‑Trust Autogen (estilo *funcional*).
 
-• get_policy_definition()   – recupera una definición por nombre/ID
-• list_policy_definitions() – máx 100 (built‑in + custom)
-• assign_policy()           – asigna la política a un scope dado
-• list_policy_assignments() – muestra asignaciones en la suscripción
+• get_policy_definition()   – una definición por nombre/ID/displayName
+                              (built‑in desde el catálogo local)
+• list_policy_definitions() – todas las páginas (built‑in + custom, $filter)
+• search_policy_definitions() – búsqueda por texto con ranking (top‑k)
+• assign_policy()           – asigna la política a un scope dado
+• bulk_assign_policies()    – muchas asignaciones en paralelo, idempotente
+• precheck_landing_zone()   – evalúa la landing zone contra políticas (local)
+• list_policy_assignments() – todas las asignaciones de la suscripción
+• list_scope_policy_assignments() – asignaciones de varias suscripciones / MG
+• sync_policy_catalog()     – refresca el catálogo local de built‑in
+• sync_policy_changes()     – diff de definiciones/asignaciones desde la última sync
+• get_policy_changes()      – changelog local de cambios por fecha
+• summarize_policy_compliance() – no conformes por asignación (servidor)
+• query_policy_states()     – estados agregados con $apply/$select/$top
+• generate_policy_report()  – informe md/json en `report/` (en streaming)
 
 Requiere en .env (o variables de entorno a runtime):
 
@@ -17,16 +28,18 @@ Requiere en .env (o variables de entorno a runtime):
 ────────────────────────────────────────────────────────────────────────
 """
 from __future__ import annotations
-import os, time, requests
+import os, time, asyncio, subprocess, httpx
+from collections import Counter
 from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
 from dotenv import load_dotenv
-import azure.identity
+from tools import arm_client, azure_scope, policy_catalog, policy_search, policy_eval
+from tools import policy_report, policy_sync
+from tools.date_filters import parse_date_filter
 
 load_dotenv()
 
 # ──────────────────────────────────────────────────────────────────────
-# credenciales & token helpers
+# credenciales
 # ──────────────────────────────────────────────────────────────────────
 def _azure_env() -> tuple[str, str, str, str]:
     """Devuelve (tenant_id, client_id, client_secret, subscription_id) o lanza error."""
@@ -40,38 +53,28 @@ def _azure_env() -> tuple[str, str, str, str]:
     return tenant, client, secret, sub_id
 
 
-# cache sencillo en módulo
-_TOKEN_CACHE: dict[str, Any] = {"token": None, "expires": None}
-
-
-def _get_token() -> str:
-    """Devuelve token válido, renovándolo 5 min antes de caducar."""
-    if _TOKEN_CACHE["token"] and _TOKEN_CACHE["expires"] and datetime.utcnow() < _TOKEN_CACHE["expires"]:
-        return _TOKEN_CACHE["token"]
-
-    tenant, client, secret, _ = _azure_env()
-    cred = azure.identity.ClientSecretCredential(tenant_id=tenant, client_id=client, client_secret=secret)
-    token = cred.get_token("https://management.azure.com/.default")
-
-    _TOKEN_CACHE["token"]   = token.token
-    _TOKEN_CACHE["expires"] = datetime.utcnow() + timedelta(seconds=token.expires_on - 300)  # 5 min margen
-    return _TOKEN_CACHE["token"]
-
-
-def _headers() -> dict:
-    return {"Authorization": f"Bearer {_get_token()}",
-            "Content-Type": "application/json"}
+def _params(filter: str | None = None) -> Dict[str, str]:
+    """api-version de Microsoft.Authorization (+ `$filter` si se da)."""
+    params = {"api-version": "2021-06-01"}
+    if filter:
+        params["$filter"] = filter
+    return params
 
 
 # ──────────────────────────────────────────────────────────────────────
 # funciones públicas
 # ──────────────────────────────────────────────────────────────────────
-def list_policy_definitions(subscription_id: str | None = None) -> List[Dict[str, Any]]:
+async def list_policy_definitions(subscription_id: str | None = None,
+                                  filter: str | None = None) -> List[Dict[str, Any]]:
     """
-    Lista las definiciones de políticas disponibles en la suscripción.
+    Lista las definiciones de políticas disponibles en la suscripción,
+    siguiendo `nextLink` hasta la última página.
 
     Args:
         subscription_id: ID de la suscripción (opcional).
+        filter: `$filter` de ARM para filtrar en servidor, p.ej.
+            "policyType eq 'BuiltIn'", "policyType eq 'Custom'" o
+            "category eq 'Security Center'" (opcional).
 
     Returns:
         Lista de definiciones de políticas.
@@ -79,36 +82,114 @@ def list_policy_definitions(subscription_id: str | None = None) -> List[Dict[str
     try:
         if not subscription_id:
             _, _, _, subscription_id = _azure_env()
-        headers = _headers()
-        url = f"https://management.azure.com/subscriptions/{subscription_id}/providers/Microsoft.Authorization/policyDefinitions?api-version=2021-06-01"
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json().get("value", [])
-    except requests.RequestException as e:
+        url = f"/subscriptions/{subscription_id}/providers/Microsoft.Authorization/policyDefinitions"
+        return [d async for d in arm_client.paginate(url, params=_params(filter))]
+    except httpx.HTTPError as e:
         print(f"Error al listar definiciones de políticas: {e}")
         return []
 
-def get_policy_definition(policy_name: str) -> Dict[str, Any]:
+async def get_policy_definition(policy_name: str) -> Dict[str, Any]:
     """
-    Recupera una definición de política por nombre o ID.
+    Recupera una definición de política por nombre, ID o displayName.
+    Las built‑in se sirven del catálogo local (`policy_catalog`), que se
+    resincroniza en segundo plano si está caducado; el resto va a ARM.
 
     Args:
-        policy_name: Nombre o ID de la política.
+        policy_name: Nombre, ID o displayName de la política.
 
     Returns:
         Definición de la política.
     """
+    policy_catalog.refresh_in_background()
+    cached = policy_catalog.lookup(policy_name)
+    if cached:
+        return cached
     try:
-        headers = _headers()
-        url = f"https://management.azure.com/providers/Microsoft.Authorization/policyDefinitions/{policy_name}?api-version=2021-06-01"
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
+        url = f"/providers/Microsoft.Authorization/policyDefinitions/{policy_name}"
+        return await arm_client.get_json(url, params={"api-version": "2021-06-01"})
+    except httpx.HTTPError as e:
         print(f"Error al obtener la definición de la política: {e}")
         return {}
 
-def assign_policy(policy_name: str, scope: str) -> Dict[str, Any]:
+async def search_policy_definitions(query: str, top_k: int = 10,
+                                    filters: Optional[Dict[str, Any]] = None
+                                    ) -> List[Dict[str, Any]]:
+    """
+    Busca definiciones built‑in por texto (BM25 sobre displayName,
+    description, category y parámetros) y devuelve sólo las `top_k` mejores
+    en forma compacta; usar `get_policy_definition` para ver una entera.
+
+    Args:
+        query: Texto libre, p.ej. "deny public blob access".
+        top_k: Nº máximo de resultados (def. 10).
+        filters: Igualdad por campo (opcional), p.ej.
+            {"category": "Storage", "effect": ["Audit", "Deny"]}.
+
+    Returns:
+        Lista de {name, id, displayName, category, effect, version, score}.
+    """
+    try:
+        if policy_catalog.catalog_version() is None:
+            await policy_catalog.sync_catalog()
+        else:
+            policy_catalog.refresh_in_background()
+    except httpx.HTTPError as e:
+        print(f"Error al sincronizar el catálogo de políticas: {e}")
+        return []
+    return policy_search.search(query, top_k=top_k, filters=filters)
+
+async def sync_policy_catalog(force: bool = False) -> Dict[str, Any]:
+    """
+    Sincroniza el catálogo local de definiciones built‑in (sólo si está
+    caducado, salvo `force`).
+
+    Returns:
+        Entradas añadidas/actualizadas/eliminadas/sin cambios.
+    """
+    try:
+        return await policy_catalog.sync_catalog(force=force)
+    except httpx.HTTPError as e:
+        print(f"Error al sincronizar el catálogo de políticas: {e}")
+        return {}
+
+async def sync_policy_changes(subscription_id: str | None = None,
+                              include_builtin: bool = False) -> Dict[str, Any]:
+    """
+    Compara definiciones (custom, y built‑in si se pide) y asignaciones de
+    la suscripción con la última sincronización y devuelve sólo lo que ha
+    cambiado: añadidos, eliminados y modificados con los campos y
+    parámetros afectados.  El diff queda además en el changelog local.
+
+    Args:
+        subscription_id: ID de la suscripción (opcional).
+        include_builtin: Incluir también las built‑in (vía catálogo local).
+
+    Returns:
+        {"since", "taken_at", "counts", "definitions", "assignments"}
+    """
+    try:
+        if not subscription_id:
+            _, _, _, subscription_id = _azure_env()
+        return await policy_sync.sync_policies(subscription_id, include_builtin)
+    except httpx.HTTPError as e:
+        print(f"Error al sincronizar políticas: {e}")
+        return {}
+
+def get_policy_changes(date_filter: str = "yesterday",
+                       subscription_id: str | None = None) -> List[Dict[str, Any]]:
+    """
+    Cambios de políticas registrados por `sync_policy_changes`, sin red.
+
+    Args:
+        date_filter: 'today', 'yesterday', 'last week', 'last N days'… ('' = todos).
+        subscription_id: Limitar a una suscripción (opcional).
+
+    Returns:
+        Lista de diffs, del más antiguo al más reciente.
+    """
+    return policy_sync.changelog(parse_date_filter(date_filter), subscription_id)
+
+async def assign_policy(policy_name: str, scope: str) -> Dict[str, Any]:
     """
     Asigna una política a un scope específico.
 
@@ -120,26 +201,125 @@ def assign_policy(policy_name: str, scope: str) -> Dict[str, Any]:
         Resultado de la asignación.
     """
     try:
-        headers = _headers()
-        url = f"https://management.azure.com/{scope}/providers/Microsoft.Authorization/policyAssignments/{policy_name}?api-version=2021-06-01"
+        url = f"/{scope.strip('/')}/providers/Microsoft.Authorization/policyAssignments/{policy_name}"
         payload = {
             "properties": {
                 "policyDefinitionId": f"/providers/Microsoft.Authorization/policyDefinitions/{policy_name}"
             }
         }
-        response = requests.put(url, headers=headers, json=payload)
+        response = await arm_client.request("PUT", url, params={"api-version": "2021-06-01"},
+                                            json=payload)
         response.raise_for_status()
         return response.json()
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"Error al asignar la política: {e}")
         return {}
 
-def list_policy_assignments(subscription_id: str | None = None) -> List[Dict[str, Any]]:
+def _definition_id(policy: str) -> str:
+    """Nombre de una built‑in → su ID completo; un ID se deja tal cual."""
+    if policy.startswith("/"):
+        return policy
+    return f"/providers/Microsoft.Authorization/policyDefinitions/{policy}"
+
+
+def _arm_parameters(parameters: Dict[str, Any] | None) -> Dict[str, Any]:
+    """{"p": 1} → {"p": {"value": 1}} (lo que ya venga en forma ARM se respeta)."""
+    return {k: v if isinstance(v, dict) and set(v) == {"value"} else {"value": v}
+            for k, v in (parameters or {}).items()}
+
+
+_ASSIGNMENT_DEFAULTS = {"parameters": {}, "enforcementMode": "Default"}
+
+
+def _same_assignment(current: Dict[str, Any], wanted: Dict[str, Any]) -> bool:
+    """¿La asignación existente ya tiene todos los campos que fijaría el PUT?"""
+    have = current.get("properties", {})
+    for field, want in wanted["properties"].items():
+        value = have.get(field) or _ASSIGNMENT_DEFAULTS.get(field)
+        if field == "policyDefinitionId":
+            value, want = (value or "").lower(), want.lower()
+        if value != want:
+            return False
+    return True
+
+
+async def _assign_one(item: Dict[str, Any]) -> Dict[str, Any]:
+    policy = item["policy"]
+    name   = item.get("name") or policy.rsplit("/", 1)[-1]
+    url    = (f"/{item['scope'].strip('/')}/providers/Microsoft.Authorization/"
+              f"policyAssignments/{name}")
+    payload = {"properties": {
+        "policyDefinitionId": _definition_id(policy),
+        "parameters":         _arm_parameters(item.get("parameters")),
+        "enforcementMode":    item.get("enforcement_mode", "Default")}}
+    if item.get("display_name"):
+        payload["properties"]["displayName"] = item["display_name"]
+    if item.get("description"):
+        payload["properties"]["description"] = item["description"]
+    result = {"policy": policy, "scope": item["scope"], "name": name}
+
+    current = await arm_client.request("GET", url, params=_params())
+    if current.status_code == 200 and _same_assignment(current.json(), payload):
+        return {**result, "status": "unchanged"}
+    if current.status_code not in (200, 404):
+        current.raise_for_status()
+
+    rsp = await arm_client.request("PUT", url, params=_params(), json=payload)
+    rsp.raise_for_status()
+    return {**result, "status": "updated" if current.status_code == 200 else "created",
+            "id": rsp.json().get("id")}
+
+
+async def bulk_assign_policies(assignments: List[Dict[str, Any]],
+                               max_concurrency: int = 16) -> Dict[str, Any]:
     """
-    Lista las asignaciones de políticas en la suscripción.
+    Asigna muchas políticas a muchos scopes en paralelo (como mucho
+    `max_concurrency` a la vez; arm_client limita además por suscripción).
+    Es idempotente: si la asignación ya existe con la misma definición,
+    parámetros, enforcementMode, displayName y descripción (los que se
+    indiquen) no se hace el PUT.  Un fallo no detiene el resto.
+
+    Args:
+        assignments: Lista de
+            {"policy": nombre o ID de la definición,
+             "scope": "/subscriptions/<id>[/resourceGroups/<rg>]",
+             "name": nombre de la asignación (def. el de la política),
+             "parameters": {"p": valor} (opcional),
+             "enforcement_mode": "Default" | "DoNotEnforce" (opcional),
+             "display_name": texto (opcional),
+             "description": texto (opcional)}
+
+    Returns:
+        {"summary": {"created": n, "updated": n, "unchanged": n, "error": n},
+         "results": [{policy, scope, name, status, id | error}, …]}  (en orden)
+    """
+    sem = asyncio.Semaphore(max_concurrency)
+
+    async def _bounded(item: Dict[str, Any]) -> Dict[str, Any]:
+        async with sem:
+            try:
+                return await _assign_one(item)
+            except (httpx.HTTPError, KeyError, ValueError) as e:
+                return {"policy": item.get("policy"), "scope": item.get("scope"),
+                        "name": item.get("name"), "status": "error", "error": str(e)}
+
+    results = await asyncio.gather(*(_bounded(a) for a in assignments))
+    return {"summary": dict(Counter(r["status"] for r in results)), "results": results}
+
+async def _assignments_in(subscription_id: str, filter: str | None) -> List[Dict[str, Any]]:
+    url = f"/subscriptions/{subscription_id}/providers/Microsoft.Authorization/policyAssignments"
+    return [a async for a in arm_client.paginate(url, params=_params(filter))]
+
+async def list_policy_assignments(subscription_id: str | None = None,
+                                  filter: str | None = None) -> List[Dict[str, Any]]:
+    """
+    Lista las asignaciones de políticas en la suscripción, siguiendo
+    `nextLink` hasta la última página.
 
     Args:
         subscription_id: ID de la suscripción (opcional).
+        filter: `$filter` de ARM (opcional), p.ej. "atScope()" o
+            "policyDefinitionId eq '<id>'".
 
     Returns:
         Lista de asignaciones de políticas.
@@ -147,15 +327,205 @@ def list_policy_assignments(subscription_id: str | None = None) -> List[Dict[str
     try:
         if not subscription_id:
             _, _, _, subscription_id = _azure_env()
-        headers = _headers()
-        url = f"https://management.azure.com/subscriptions/{subscription_id}/providers/Microsoft.Authorization/policyAssignments?api-version=2021-06-01"
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json().get("value", [])
-    except requests.RequestException as e:
+        return await _assignments_in(subscription_id, filter)
+    except httpx.HTTPError as e:
         print(f"Error al listar asignaciones de políticas: {e}")
         return []
 
+async def list_scope_policy_assignments(scope: azure_scope.Scope = "all",
+                                        filter: str | None = None,
+                                        max_concurrency: int = 16,
+                                        timeout: float = 60.0) -> Dict[str, Any]:
+    """
+    Asignaciones de varias suscripciones a la vez: "all", "mg:<grupo>" o
+    lista de suscripciones.  Se consultan en paralelo y las asignaciones
+    heredadas de grupos de administración se devuelven una sola vez.
+
+    Args:
+        scope: Alcance (ver `azure_scope`); def. todas las accesibles.
+        filter: `$filter` de ARM (opcional), como en `list_policy_assignments`.
+        max_concurrency / timeout: Las suscripciones que fallen o no
+            respondan a tiempo salen en `errors` (resultado parcial).
+
+    Returns:
+        {"scope", "assignments", "subscriptions", "succeeded", "errors"}
+        (misma forma también si no se pudo resolver el alcance).
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    try:
+        subs = await azure_scope.resolve_subscriptions(scope)
+    except (httpx.HTTPError, EnvironmentError, ValueError) as e:
+        return {"scope": scope, "assignments": [], "subscriptions": 0, "succeeded": 0,
+                "errors": {str(scope): (str(e) or type(e).__name__).splitlines()[0]}}
+
+    errors: Dict[str, Exception] = {}
+    async for sub, res in azure_scope.fan_out(
+            subs, lambda s: _assignments_in(s, filter), max_concurrency, timeout):
+        if isinstance(res, Exception):
+            errors[sub] = res
+            continue
+        for a in res:
+            merged.setdefault(a.get("id", "").lower(), a)
+    return {"scope": scope, "assignments": list(merged.values()),
+            **azure_scope.partial_summary(errors, len(subs))}
+
+def precheck_landing_zone(policies: Optional[List[str]] = None,
+                          template: str | None = None,
+                          parameters: Optional[Dict[str, Dict[str, Any]]] = None
+                          ) -> Dict[str, Any]:
+    """
+    Revisa en local, sin llamar a Azure, los recursos de la landing zone
+    generada contra definiciones del catálogo de políticas, antes del
+    what‑if de `deploy_landing_zone`.
+
+    Args:
+        policies: Nombres, IDs o displayName de las definiciones a aplicar
+            (def. todas las del catálogo local).
+        template: .bicep o plantilla ARM JSON (def. Infra/main.bicep).
+        parameters: {definición: {parámetro: valor}} como en la asignación
+            (opcional; si no, los `defaultValue`).
+
+    Returns:
+        {"status": "evaluated", "resources": n, "policies": n, "missing": [...],
+         "summary": {...}, "findings": [...]}  (resultado: violation /
+         would_modify / needs_azure / unknown).  Sin ninguna definición que
+        aplicar (catálogo vacío o sin sincronizar) `status` es
+        "no_definitions" y no hay resumen: nunca se da por buena la revisión.
+        Si la plantilla no se puede cargar o compilar, `status` es "error"
+        con `error` (y `details` con la salida de `az bicep build`).
+    """
+    if template is None:
+        from tools.bicep_tools import INFRA_DIR
+        template = str(INFRA_DIR / "main.bicep")
+    try:
+        resources = policy_eval.load_resources(template)
+    except subprocess.CalledProcessError as e:
+        return {"status": "error", "error": f"Falló la compilación de {template}",
+                "details": (e.stderr or "").strip()}
+    except (RuntimeError, OSError, ValueError) as e:    # sin az, sin fichero, JSON roto
+        return {"status": "error", "error": str(e)}
+
+    missing: List[str] = []
+    if policies is None:
+        definitions = [d for d in map(policy_catalog.lookup, policy_catalog.entries()) if d]
+    else:
+        definitions = []
+        for key in policies:
+            definition = policy_catalog.lookup(key)
+            if definition:
+                definitions.append(definition)
+            else:
+                missing.append(key)
+
+    if not definitions:
+        return {"status": "no_definitions",
+                "message": "No hay definiciones que evaluar: sincroniza el catálogo "
+                           "(sync_policy_catalog) o revisa los nombres indicados",
+                "resources": len(resources), "policies": 0, "missing": missing}
+
+    result = policy_eval.evaluate(resources, definitions, parameters)
+    return {"status": "evaluated", "resources": len(resources),
+            "policies": len(definitions), "missing": missing, **result}
+
+# ──────────────────────────────────────────────────────────────────────
+# cumplimiento (Policy Insights)
+# ──────────────────────────────────────────────────────────────────────
+_INSIGHTS_API = "2019-10-01"
+_NONCOMPLIANT = "complianceState eq 'NonCompliant'"
+_BY_ASSIGNMENT_AND_TYPE = ("groupby((policyAssignmentId, resourceType), "
+                           "aggregate($count as count))")
+
+
+def _policy_states(subscription_id: str | None, action: str) -> str:
+    if not subscription_id:
+        _, _, _, subscription_id = _azure_env()
+    return (f"/subscriptions/{subscription_id}/providers/Microsoft.PolicyInsights/"
+            f"policyStates/latest/{action}")
+
+
+async def summarize_policy_compliance(subscription_id: str | None = None,
+                                      filter: str | None = None,
+                                      top: int | None = None) -> Dict[str, Any]:
+    """
+    Resumen de cumplimiento calculado por Azure (`summarize`): recursos y
+    políticas no conformes en total y por asignación, en una sola llamada.
+
+    Args:
+        subscription_id: ID de la suscripción (opcional).
+        filter: `$filter` OData adicional (opcional), p.ej.
+            "resourceType eq 'microsoft.storage/storageaccounts'".
+        top: Nº máximo de asignaciones a devolver (opcional).
+
+    Returns:
+        {"nonCompliantResources", "nonCompliantPolicies",
+         "assignments": [{id, nonCompliantResources, nonCompliantPolicies}, …]}
+    """
+    params: Dict[str, Any] = {"api-version": _INSIGHTS_API}
+    if filter:
+        params["$filter"] = filter
+    if top:
+        params["$top"] = top
+    try:
+        rsp = await arm_client.request("POST", _policy_states(subscription_id, "summarize"),
+                                       params=params)
+        rsp.raise_for_status()
+    except httpx.HTTPError as e:
+        print(f"Error al resumir el cumplimiento de políticas: {e}")
+        return {}
+
+    summary = (rsp.json().get("value") or [{}])[0]
+    totals  = summary.get("results", {})
+    assignments = [{"id": a.get("policyAssignmentId"),
+                    "nonCompliantResources": a.get("results", {}).get("nonCompliantResources", 0),
+                    "nonCompliantPolicies":  a.get("results", {}).get("nonCompliantPolicies", 0)}
+                   for a in summary.get("policyAssignments", [])]
+    assignments.sort(key=lambda a: a["nonCompliantResources"], reverse=True)
+    return {"nonCompliantResources": totals.get("nonCompliantResources", 0),
+            "nonCompliantPolicies":  totals.get("nonCompliantPolicies", 0),
+            "assignments": assignments}
+
+async def query_policy_states(subscription_id: str | None = None,
+                              filter: str | None = _NONCOMPLIANT,
+                              apply: str | None = _BY_ASSIGNMENT_AND_TYPE,
+                              select: str | None = None, top: int | None = None,
+                              max_rows: int = 5000) -> List[Dict[str, Any]]:
+    """
+    Consulta los estados de cumplimiento (`queryResults`) agregando en el
+    servidor.  Por defecto devuelve el nº de recursos no conformes por
+    asignación y tipo de recurso; las páginas siguientes
+    (`@odata.nextLink`) se piden mientras se consumen.
+
+    Args:
+        subscription_id: ID de la suscripción (opcional).
+        filter: `$filter` OData (def. sólo NonCompliant; None para todos).
+        apply: `$apply` OData (def. groupby por asignación y tipo con
+            `$count`; None para filas sin agregar).
+        select: `$select`, p.ej. "resourceId, policyDefinitionName" (opcional).
+        top: `$top` (opcional).
+        max_rows: corte de seguridad de filas devueltas.
+
+    Returns:
+        Lista de filas (sin las propiedades `@odata.*`).
+    """
+    params: Dict[str, Any] = {"api-version": _INSIGHTS_API}
+    for key, value in (("$filter", filter), ("$apply", apply),
+                       ("$select", select), ("$top", top)):
+        if value:
+            params[key] = value
+    rows: List[Dict[str, Any]] = []
+    try:
+        async for row in arm_client.paginate(_policy_states(subscription_id, "queryResults"),
+                                             params=params, next_key="@odata.nextLink",
+                                             method="POST"):
+            rows.append({k: v for k, v in row.items() if not k.startswith("@odata")})
+            if len(rows) >= max_rows:
+                break
+    except httpx.HTTPError as e:
+        print(f"Error al consultar estados de cumplimiento: {e}")
+    if apply == _BY_ASSIGNMENT_AND_TYPE:
+        rows.sort(key=lambda r: r.get("count", 0), reverse=True)
+    return rows
+
 def save_report(report_name: str, content: str):
     """
     Guarda el contenido del informe en la carpeta `report`.
@@ -171,26 +541,45 @@ def save_report(report_name: str, content: str):
         report_file.write(content)
     return report_path
 
-def generate_policy_report(definitions: list, assignments: list) -> str:
+async def generate_policy_report(definitions: Optional[policy_report.Rows] = None,
+                                 assignments: Optional[policy_report.Rows] = None,
+                                 fmt: str = "md",
+                                 compliance: Optional[policy_report.Rows] = None,
+                                 subscription_id: str | None = None) -> str:
     """
-    Genera un informe detallado de las políticas y asignaciones.
+    Genera un informe detallado de las políticas y asignaciones en la
+    carpeta `report` (escritura en streaming y atómica, ver `policy_report`).
 
     Args:
-        definitions: Lista de definiciones de políticas.
-        assignments: Lista de asignaciones de políticas.
+        definitions: Definiciones de políticas (lista o generador, también
+            asíncrono).  Def. todas las de la suscripción, leídas de ARM
+            página a página sin reunirlas en memoria.
+        assignments: Asignaciones de políticas (ídem).
+        fmt: "md" (def.) o "json".
+        compliance: Salida de `query_policy_states` o las `assignments` de
+            `summarize_policy_compliance` para la columna de no conformes
+            (opcional).
+        subscription_id: Suscripción de la que leer lo que no se pase
+            (opcional).
 
     Returns:
-        Nombre del archivo del informe generado.
+        Nombre del archivo del informe generado ("" si ARM falla).
     """
-    report_content = """# Informe de Políticas de Azure\n\n## Definiciones de Políticas\n"""
-    for definition in definitions:
-        report_content += f"- {definition.get('displayName', 'Sin nombre')}\n"
-
-    report_content += "\n## Asignaciones de Políticas\n"
-    for assignment in assignments:
-        report_content += f"- {assignment.get('name', 'Sin nombre')}\n"
+    if definitions is None or assignments is None:
+        if not subscription_id:
+            _, _, _, subscription_id = _azure_env()
+        base = f"/subscriptions/{subscription_id}/providers/Microsoft.Authorization"
+        if definitions is None:
+            definitions = arm_client.paginate(f"{base}/policyDefinitions", params=_params())
+        if assignments is None:
+            assignments = arm_client.paginate(f"{base}/policyAssignments", params=_params())
 
-    report_name = "policy_report.md"
-    save_report(report_name, report_content)
+    report_name = f"policy_report.{fmt}"
+    try:
+        await policy_report.write_policy_report(
+            definitions, assignments, os.path.join(os.getcwd(), "report", report_name),
+            fmt=fmt, compliance=compliance)
+    except httpx.HTTPError as e:
+        print(f"Error al generar el informe de políticas: {e}")
+        return ""
     return report_name
-
@@ -0,0 +1,303 @@
+"""
+posture_store.py
+────────────────────────────────────────────────────────────────────────
+Histórico local de la postura de seguridad (SQLite) para responder a
+preguntas de tendencia sin volver a descargar nada de Azure.
+
+Cada snapshot guarda por suscripción el Secure Score, la puntuación de
+cada control (secureScoreControls) y las recomendaciones abiertas
+(estado Unhealthy; Healthy y NotApplicable no son hallazgos):
+
+    snapshots       (id, subscription_id, taken_at, score, max, pct, granularity)
+    controls        (snapshot_id, control, current, max, pct, healthy, unhealthy, n/a)
+    findings        dimensión: una fila por recomendación × recurso, con
+                    severity, category, first_seen, last_seen y opened_at
+                    (última vez que se abrió: igual a first_seen salvo que
+                    se resolviera y volviera a aparecer)
+    finding_facts   hechos: (snapshot_id, finding_id, status)
+
+con índices por tiempo, suscripción y severidad.
+
+• save_snapshot()           – guarda un snapshot (y aplica la retención)
+• score_trend()             – Secure Score por suscripción en los últimos N días
+• control_trend()           – evolución de un control
+• new_findings()            – hallazgos abiertos o reabiertos desde una fecha
+• latest_findings()         – estado guardado del último snapshot
+• last_snapshot()           – score y fecha del último snapshot
+• apply_retention()         – reduce snapshots antiguos a diario / semanal
+• store_stats()             – nº de snapshots, hallazgos y tamaño
+
+Retención: todos los snapshots de los últimos POSTURE_RAW_DAYS; después
+el último de cada día hasta POSTURE_DAILY_DAYS; después el último de cada
+semana.
+
+Variables de entorno (opcionales):
+    POSTURE_STORE_DIR       def. ~/.cache/zerotrust-autogen
+    POSTURE_RAW_DAYS        def. 14
+    POSTURE_DAILY_DAYS      def. 90
+────────────────────────────────────────────────────────────────────────
+"""
+from __future__ import annotations
+import os, time, pathlib, sqlite3, threading
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Iterable, Optional
+
+_DB: sqlite3.Connection | None = None
+_LOCK = threading.Lock()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY, subscription_id TEXT NOT NULL, taken_at REAL NOT NULL,
+    score REAL, max REAL, pct REAL, granularity TEXT NOT NULL DEFAULT 'raw');
+CREATE INDEX IF NOT EXISTS ix_snapshots_sub_time ON snapshots(subscription_id, taken_at);
+CREATE INDEX IF NOT EXISTS ix_snapshots_time ON snapshots(taken_at);
+
+CREATE TABLE IF NOT EXISTS controls (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    control TEXT NOT NULL, current REAL, max REAL, pct REAL,
+    healthy INTEGER, unhealthy INTEGER, not_applicable INTEGER,
+    PRIMARY KEY (snapshot_id, control)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_controls_control ON controls(control);
+
+CREATE TABLE IF NOT EXISTS findings (
+    id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE, subscription_id TEXT NOT NULL,
+    assessment TEXT, name TEXT, category TEXT, severity TEXT, resource_id TEXT,
+    first_seen REAL NOT NULL, last_seen REAL NOT NULL, opened_at REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS ix_findings_sub_sev ON findings(subscription_id, severity);
+CREATE INDEX IF NOT EXISTS ix_findings_opened ON findings(opened_at);
+
+CREATE TABLE IF NOT EXISTS finding_facts (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    finding_id INTEGER NOT NULL REFERENCES findings(id),
+    status TEXT NOT NULL,
+    PRIMARY KEY (snapshot_id, finding_id)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_facts_finding ON finding_facts(finding_id);
+"""
+
+
+def _db() -> sqlite3.Connection:
+    """Abre (una vez) la base del histórico.  Llamar con `_LOCK`."""
+    global _DB
+    if _DB is None:
+        folder = pathlib.Path(os.getenv("POSTURE_STORE_DIR")
+                              or pathlib.Path.home() / ".cache" / "zerotrust-autogen")
+        folder.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(folder / "posture.sqlite", check_same_thread=False)
+        db.execute("PRAGMA foreign_keys = ON")
+        db.execute("PRAGMA journal_mode = WAL")
+        db.executescript(_SCHEMA)
+        _DB = db
+    return _DB
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="seconds")
+
+
+def finding_key(subscription_id: str, row: Dict[str, Any]) -> str:
+    """Recomendación × recurso (el mismo control en otro recurso es otro hallazgo)."""
+    return f"{subscription_id.lower()}|{row.get('id', '')}|{(row.get('resourceId') or '').lower()}"
+
+
+# ──────────────────────────────────────────────────────────────────────
+# escritura
+# ──────────────────────────────────────────────────────────────────────
+def _upsert_findings(db: sqlite3.Connection, subscription_id: str, snapshot_id: int,
+                     taken_at: float, findings: Iterable[Dict[str, Any]]) -> int:
+    """Hallazgos del snapshot; los que no estaban en el anterior de la
+    suscripción (nuevos o reabiertos) toman `opened_at = taken_at`."""
+    previous = db.execute("SELECT MAX(id) FROM snapshots WHERE subscription_id = ? AND id < ?",
+                          (subscription_id, snapshot_id)).fetchone()[0]
+    n = 0
+    for row in findings:
+        key = finding_key(subscription_id, row)
+        db.execute("""INSERT INTO findings (key, subscription_id, assessment, name, category,
+                                            severity, resource_id, first_seen, last_seen,
+                                            opened_at)
+                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                      ON CONFLICT(key) DO UPDATE SET
+                          last_seen = excluded.last_seen, severity = excluded.severity,
+                          name = excluded.name, category = excluded.category,
+                          opened_at = CASE WHEN EXISTS (
+                                          SELECT 1 FROM finding_facts
+                                          WHERE snapshot_id = ? AND finding_id = findings.id)
+                                      THEN findings.opened_at ELSE excluded.opened_at END""",
+                   (key, subscription_id, row.get("id"), row.get("name"), row.get("category"),
+                    row.get("severity"), row.get("resourceId"), taken_at, taken_at, taken_at,
+                    previous))
+        fid = db.execute("SELECT id FROM findings WHERE key = ?", (key,)).fetchone()[0]
+        db.execute("INSERT OR REPLACE INTO finding_facts VALUES (?, ?, ?)",
+                   (snapshot_id, fid, row.get("status") or "Unhealthy"))
+        n += 1
+    return n
+
+
+def save_snapshot(subscription_id: str, score: Dict[str, Any],
+                  controls: Iterable[Dict[str, Any]],
+                  findings: Iterable[Dict[str, Any]],
+                  taken_at: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Guarda un snapshot de una suscripción.
+
+    Args:
+        score: Salida de `get_secure_score` (currentScore, maxScore, percentageScore).
+        controls: {control, current, max, pct, healthy, unhealthy, notApplicable}.
+        findings: Filas de `list_posture_recommendations` con estado Unhealthy.
+    """
+    taken_at = taken_at or time.time()
+    with _LOCK:
+        db = _db()
+        with db:
+            cur = db.execute("INSERT INTO snapshots (subscription_id, taken_at, score, max, pct) "
+                             "VALUES (?, ?, ?, ?, ?)",
+                             (subscription_id, taken_at, score.get("currentScore"),
+                              score.get("maxScore"), score.get("percentageScore")))
+            sid = cur.lastrowid
+            db.executemany("INSERT OR REPLACE INTO controls VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                           [(sid, c["control"], c.get("current"), c.get("max"), c.get("pct"),
+                             c.get("healthy"), c.get("unhealthy"), c.get("notApplicable"))
+                            for c in controls])
+            n = _upsert_findings(db, subscription_id, sid, taken_at, findings)
+    retention = apply_retention()
+    return {"snapshot_id": sid, "subscription_id": subscription_id,
+            "taken_at": _iso(taken_at), "findings": n, "retention": retention}
+
+
+def apply_retention(now: Optional[float] = None) -> Dict[str, int]:
+    """Deja el último snapshot de cada día (tras RAW_DAYS) y de cada semana
+    (tras DAILY_DAYS); borra los demás con sus controles y hechos."""
+    now   = now or time.time()
+    raw   = now - float(os.getenv("POSTURE_RAW_DAYS", "14")) * 86400
+    daily = now - float(os.getenv("POSTURE_DAILY_DAYS", "90")) * 86400
+    removed = {"daily": 0, "weekly": 0}
+    with _LOCK:
+        db = _db()
+        with db:
+            for label, bucket, lo, hi in (
+                    ("daily",  "%Y-%m-%d", daily, raw),
+                    ("weekly", "%Y-%W",    0.0,   daily)):
+                keep = f"""SELECT MAX(id) FROM snapshots
+                           WHERE taken_at >= ? AND taken_at < ?
+                           GROUP BY subscription_id,
+                                    strftime('{bucket}', taken_at, 'unixepoch')"""
+                cur = db.execute(f"DELETE FROM snapshots WHERE taken_at >= ? AND taken_at < ? "
+                                 f"AND id NOT IN ({keep})", (lo, hi, lo, hi))
+                removed[label] = cur.rowcount
+                db.execute("UPDATE snapshots SET granularity = ? "
+                           "WHERE taken_at >= ? AND taken_at < ?", (label, lo, hi))
+            if removed["daily"] or removed["weekly"]:
+                db.execute("""DELETE FROM findings WHERE id NOT IN
+                              (SELECT DISTINCT finding_id FROM finding_facts)""")
+    return removed
+
+
+# ──────────────────────────────────────────────────────────────────────
+# consultas
+# ──────────────────────────────────────────────────────────────────────
+def _sub_clause(subscription_id: Optional[str], column: str = "subscription_id") -> tuple[str, tuple]:
+    return (f" AND {column} = ?", (subscription_id,)) if subscription_id else ("", ())
+
+
+def score_trend(days: int = 30, subscription_id: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """{suscripción: [{taken_at, score, max, pct}, …]} de los últimos `days` días."""
+    clause, args = _sub_clause(subscription_id)
+    with _LOCK:
+        rows = _db().execute(
+            "SELECT subscription_id, taken_at, score, max, pct FROM snapshots "
+            "WHERE taken_at >= ?" + clause + " ORDER BY subscription_id, taken_at",
+            (time.time() - days * 86400, *args)).fetchall()
+    trend: Dict[str, List[Dict[str, Any]]] = {}
+    for sub, ts, score, max_, pct in rows:
+        trend.setdefault(sub, []).append({"taken_at": _iso(ts), "score": score,
+                                          "max": max_, "pct": pct})
+    return trend
+
+
+def control_trend(control: str, days: int = 30,
+                  subscription_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Evolución de un control (nombre exacto o parte de él)."""
+    clause, args = _sub_clause(subscription_id, "s.subscription_id")
+    with _LOCK:
+        rows = _db().execute(
+            "SELECT s.subscription_id, s.taken_at, c.control, c.current, c.max, c.pct, "
+            "       c.unhealthy FROM controls c JOIN snapshots s ON s.id = c.snapshot_id "
+            "WHERE s.taken_at >= ? AND c.control LIKE ?" + clause +
+            " ORDER BY s.subscription_id, s.taken_at",
+            (time.time() - days * 86400, f"%{control}%", *args)).fetchall()
+    return [{"subscription_id": r[0], "taken_at": _iso(r[1]), "control": r[2],
+             "current": r[3], "max": r[4], "pct": r[5], "unhealthy": r[6]} for r in rows]
+
+
+def _latest_ids(db: sqlite3.Connection, subscription_id: Optional[str]) -> List[int]:
+    clause, args = _sub_clause(subscription_id)
+    return [r[0] for r in db.execute(
+        "SELECT MAX(id) FROM snapshots WHERE 1 = 1" + clause + " GROUP BY subscription_id",
+        args)]
+
+
+def new_findings(since: float, severity: Optional[List[str]] = None,
+                 subscription_id: Optional[str] = None,
+                 limit: int = 200) -> List[Dict[str, Any]]:
+    """Hallazgos abiertos desde `since` (epoch), nuevos o reabiertos tras
+    resolverse, que siguen abiertos en el último snapshot de su suscripción."""
+    clause, args = _sub_clause(subscription_id, "f.subscription_id")
+    sev = ""
+    if severity:
+        sev = f" AND f.severity IN ({', '.join('?' * len(severity))})"
+        args = (*args, *severity)
+    with _LOCK:
+        db  = _db()
+        ids = _latest_ids(db, subscription_id)
+        if not ids:
+            return []
+        rows = db.execute(
+            "SELECT f.subscription_id, f.assessment, f.name, f.category, f.severity, "
+            "       f.resource_id, f.first_seen, f.opened_at, x.status "
+            "FROM findings f JOIN finding_facts x ON x.finding_id = f.id "
+            f"WHERE x.snapshot_id IN ({', '.join('?' * len(ids))}) AND f.opened_at >= ?"
+            + clause + sev +
+            " ORDER BY CASE f.severity WHEN 'High' THEN 0 WHEN 'Medium' THEN 1 ELSE 2 END,"
+            "          f.opened_at DESC LIMIT ?",
+            (*ids, since, *args, limit)).fetchall()
+    return [{"subscriptionId": r[0], "id": r[1], "name": r[2], "category": r[3],
+             "severity": r[4], "resourceId": r[5], "firstSeen": _iso(r[6]),
+             "openedAt": _iso(r[7]), "reopened": r[7] > r[6], "status": r[8]}
+            for r in rows]
+
+
+def latest_findings(subscription_id: str) -> Dict[str, Dict[str, Any]]:
+    """{clave: hallazgo} abiertos en el último snapshot de la suscripción."""
+    with _LOCK:
+        db  = _db()
+        ids = _latest_ids(db, subscription_id)
+        if not ids:
+            return {}
+        rows = db.execute(
+            "SELECT f.key, f.assessment, f.name, f.category, f.severity, f.resource_id, "
+            "       x.status FROM findings f JOIN finding_facts x ON x.finding_id = f.id "
+            "WHERE x.snapshot_id = ?", (ids[0],)).fetchall()
+    return {r[0]: {"id": r[1], "name": r[2], "category": r[3], "severity": r[4],
+                   "resourceId": r[5], "status": r[6]} for r in rows}
+
+
+def last_snapshot(subscription_id: str) -> Optional[Dict[str, Any]]:
+    with _LOCK:
+        row = _db().execute(
+            "SELECT id, taken_at, score, max, pct FROM snapshots WHERE subscription_id = ? "
+            "ORDER BY taken_at DESC LIMIT 1", (subscription_id,)).fetchone()
+    if not row:
+        return None
+    return {"snapshot_id": row[0], "taken_at": row[1], "currentScore": row[2],
+            "maxScore": row[3], "percentageScore": row[4]}
+
+
+def store_stats() -> Dict[str, Any]:
+    with _LOCK:
+        db = _db()
+        snaps, subs = db.execute("SELECT COUNT(*), COUNT(DISTINCT subscription_id) "
+                                 "FROM snapshots").fetchone()
+        findings = db.execute("SELECT COUNT(*) FROM findings").fetchone()[0]
+        pages, size = (db.execute("PRAGMA page_count").fetchone()[0],
+                       db.execute("PRAGMA page_size").fetchone()[0])
+    return {"snapshots": snaps, "subscriptions": subs, "findings": findings,
+            "size_mb": round(pages * size / 1024 / 1024, 2)}
@@ -9,6 +9,19 @@ Funciones expuestas
 • get_secure_score()                 → dict   - score numérico + %  
 • list_posture_recommendations(...)  → list   - recomendaciones (filtro fecha opc.)  
 • get_detailed_recommendation(id)    → dict   - detalles + recursos afectados
+• get_recommendation_details(ids)    → dict   - detalle en lote, recursos agregados
+• query_resource_graph(kql)          → list   - consulta KQL a Resource Graph
+• record_posture_snapshot()          → dict   - guarda score/controles/hallazgos
+• get_score_trend(days)              → dict   - Secure Score histórico (local)
+• get_control_trend(control)         → list   - evolución de un control (local)
+• get_new_findings(date_filter)      → list   - hallazgos nuevos (local)
+• refresh_posture()                  → dict   - refresco incremental (sólo cambios)
+
+Las llamadas a ARM son asíncronas y pasan por `arm_client` (pool,
+timeouts, reintentos con backoff y límite de concurrencia).
+Con `scope` ("all", "mg:<grupo>" o lista de suscripciones, ver
+`azure_scope`) cubren varias suscripciones y devuelven resultados
+agregados, parciales si alguna no responde a tiempo.
 
 Requiere en .env (o variables de entorno):
 
@@ -16,16 +29,17 @@ Requiere en .env (o variables de entorno):
 ────────────────────────────────────────────────────────────────────────
 """
 from __future__ import annotations
-import os, re, requests
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+import os, asyncio, httpx
+from typing import List, Dict, Any, Optional, AsyncIterator, Union
+from datetime import datetime, timezone
 from dotenv import load_dotenv
-import azure.identity
+from tools import arm_client, resource_graph, azure_scope, posture_store
+from tools.date_filters import parse_date_filter
 
 load_dotenv()
 
 # ──────────────────────────────────────────────────────────────────────
-# credenciales & token helpers
+# credenciales
 # ──────────────────────────────────────────────────────────────────────
 def _azure_env() -> tuple[str, str, str, str]:
     tenant  = os.getenv("TENANT_ID")
@@ -38,70 +52,16 @@ def _azure_env() -> tuple[str, str, str, str]:
     return tenant, client, secret, sub_id
 
 
-_TOKEN: dict[str, Any] = {"value": None, "exp": None}
-
-
-def _get_token() -> str:
-    """Devuelve un token de AAD con caché de 5 min de margen."""
-    if _TOKEN["value"] and _TOKEN["exp"] and datetime.utcnow() < _TOKEN["exp"]:
-        return _TOKEN["value"]
-
-    tenant, client, secret, _ = _azure_env()
-    cred  = azure.identity.ClientSecretCredential(tenant_id=tenant, client_id=client, client_secret=secret)
-    token = cred.get_token("https://management.azure.com/.default")
-
-    _TOKEN["value"] = token.token
-    _TOKEN["exp"]   = datetime.utcnow() + timedelta(seconds=token.expires_on - 300)
-    return _TOKEN["value"]
-
-
-def _headers() -> dict:
-    return {"Authorization": f"Bearer {_get_token()}",
-            "Content-Type": "application/json"}
-
-
 # ──────────────────────────────────────────────────────────────────────
 # posture helpers
 # ──────────────────────────────────────────────────────────────────────
-def _parse_date_filter(date_filter: str) -> Optional[datetime]:
-    """Convierte 'today', 'last week', 'last 30 days'… a datetime límite."""
-    if not date_filter:
-        return None
-    now = datetime.utcnow()
-    df  = date_filter.lower().strip()
-
-    if df == "today":
-        return datetime(now.year, now.month, now.day)
-    if df == "yesterday":
-        return datetime(now.year, now.month, now.day) - timedelta(days=1)
-    if df == "this week":
-        return now - timedelta(days=now.weekday())
-    if df == "last week":
-        return now - timedelta(days=7)
-
-    m = re.match(r"last\s+(\d+)\s+days?", df)
-    if m:
-        return now - timedelta(days=int(m.group(1)))
-    m = re.match(r"last\s+(\d+)\s+months?", df)
-    if m:
-        return now - timedelta(days=30*int(m.group(1)))
-
-    # si no se entiende → None
-    return None
-
-
 # ──────────────────────────────────────────────────────────────────────
 # API calls
 # ──────────────────────────────────────────────────────────────────────
-def get_secure_score() -> Dict[str, Any]:
-    """Devuelve Secure Score (current, max, % y lastUpdated)."""
-    _, _, _, sub = _azure_env()
-    url = (f"https://management.azure.com/subscriptions/{sub}"
-           "/providers/Microsoft.Security/secureScores/ascScore"
-           "?api-version=2020-01-01")
-    rsp = requests.get(url, headers=_headers(), timeout=30)
-    rsp.raise_for_status()
-    data = rsp.json()
+async def _secure_score(sub: str) -> Dict[str, Any]:
+    url = (f"/subscriptions/{sub}"
+           "/providers/Microsoft.Security/secureScores/ascScore")
+    data = await arm_client.get_json(url, params={"api-version": "2020-01-01"})
 
     cur = data.get("properties", {}).get("score", {}).get("current", 0)
     max_ = data.get("properties", {}).get("score", {}).get("max", 100)
@@ -114,86 +74,138 @@ def get_secure_score() -> Dict[str, Any]:
     }
 
 
-def list_posture_recommendations(date_filter: str | None = None) -> List[Dict[str, Any]]:
-    """Lista recomendaciones fallidas, ordenadas por severidad (High→Low)."""
-    _, _, _, sub = _azure_env()
-    url = (f"https://management.azure.com/subscriptions/{sub}"
-           "/providers/Microsoft.Security/assessments"
-           "?api-version=2020-01-01")
-    rsp = requests.get(url, headers=_headers(), timeout=60)
-    rsp.raise_for_status()
-    assessments = rsp.json().get("value", [])
-
-    recs: List[Dict[str, Any]] = []
-    for ass in assessments:
-        stat = ass.get("properties", {}).get("status", {}).get("code", "")
-        if stat == "Healthy":
+async def get_secure_score(scope: azure_scope.Scope = None, max_concurrency: int = 16,
+                           timeout: float = 60.0) -> Dict[str, Any]:
+    """
+    Devuelve Secure Score (current, max, % y lastUpdated).
+
+    Con `scope` ("all", "mg:<grupo>" o lista de suscripciones) consulta
+    todas las suscripciones en paralelo y agrega: score total ponderado por
+    `maxScore`, detalle por suscripción (peor primero) y errores o
+    suscripciones sin respuesta a tiempo (resultado parcial).
+    """
+    if scope is None:
+        _, _, _, sub = _azure_env()
+        return await _secure_score(sub)
+
+    subs = await azure_scope.resolve_subscriptions(scope)
+    per_sub: List[Dict[str, Any]] = []
+    errors: Dict[str, Exception] = {}
+    cur = max_ = 0.0
+    async for sub, res in azure_scope.fan_out(subs, _secure_score, max_concurrency, timeout):
+        if isinstance(res, Exception):
+            errors[sub] = res
             continue
-
-        meta = ass.get("properties", {}).get("metadata", {})
-        recs.append({
-            "id":   ass.get("name"),
-            "name": ass.get("properties", {}).get("displayName", "Unknown"),
-            "category":  meta.get("category", "Unknown"),
-            "severity":  meta.get("severity", "Low"),
-            "status":    stat,
-            "description": meta.get("description", ""),
-            "createdAt": ass.get("properties", {}).get("timeGenerated", "")
-        })
-
-    # filtro fecha
-    if date_filter:
-        threshold = _parse_date_filter(date_filter)
-        if threshold:
-            tmp = []
-            for r in recs:
-                try:
-                    dt = datetime.strptime(r["createdAt"].split(".")[0], "%Y-%m-%dT%H:%M:%S")
-                    if dt >= threshold:
-                        tmp.append(r)
-                except Exception:
-                    tmp.append(r)
-            recs = tmp
-
-    order = {"High": 0, "Medium": 1, "Low": 2}
-    recs.sort(key=lambda x: order.get(x["severity"], 3))
-    return recs
-
-
-def get_detailed_recommendation(recommendation_id: str) -> Dict[str, Any]:
-    """Devuelve detalles + recursos afectados para la recomendación dada."""
-    _, _, _, sub = _azure_env()
-    hdr = _headers()
-
-    ass_url = (f"https://management.azure.com/subscriptions/{sub}"
-               f"/providers/Microsoft.Security/assessments/{recommendation_id}"
-               "?api-version=2020-01-01")
-    ass_rsp = requests.get(ass_url, headers=hdr, timeout=30)
-    ass_rsp.raise_for_status()
-    ass = ass_rsp.json()
-
-    # sub‑assessments (recursos afectados)
-    affected: List[Dict[str, str]] = []
-    sub_url = (f"https://management.azure.com/subscriptions/{sub}"
-               f"/providers/Microsoft.Security/assessments/{recommendation_id}/subassessments"
-               "?api-version=2019-01-01-preview")
+        per_sub.append({"subscriptionId": sub, **res})
+        cur  += res["currentScore"]
+        max_ += res["maxScore"]
+    per_sub.sort(key=lambda r: r["percentageScore"])
+    return {"currentScore": round(cur, 2), "maxScore": max_,
+            "percentageScore": round(cur / max_ * 100, 2) if max_ else 0.0,
+            "bySubscription": per_sub, **azure_scope.partial_summary(errors, len(subs))}
+
+
+_SEVERITIES = ("High", "Medium", "Low")
+_STATUSES   = ("Unhealthy", "Healthy", "NotApplicable")
+
+
+def _recommendations_kql(threshold: Optional[datetime], severity: Optional[List[str]],
+                         status: Optional[List[str]],
+                         changed_since: Optional[datetime] = None) -> str:
+    """KQL sobre securityresources con filtros, proyección y orden en servidor.
+    `changed_since` limita a assessments cuyo estado cambió desde esa fecha."""
+    lines = ["securityresources",
+             "| where type == 'microsoft.security/assessments'",
+             "| extend status = tostring(properties.status.code),",
+             "         severity = tostring(properties.metadata.severity),",
+             "         createdAt = coalesce(tostring(properties.timeGenerated),",
+             "                              tostring(properties.status.firstEvaluationDate))"]
+    status   = [s for s in status or [] if s in _STATUSES]
+    severity = [s for s in severity or [] if s in _SEVERITIES]
+    if status:
+        lines.append("| where status in (" + ", ".join(map(resource_graph.kql_string, status)) + ")")
+    else:
+        lines.append("| where status != 'Healthy'")
+    if severity:
+        lines.append("| where severity in (" +
+                     ", ".join(map(resource_graph.kql_string, severity)) + ")")
+    if changed_since:
+        lines.append("| where todatetime(properties.status.statusChangeDate) >= "
+                     f"datetime({changed_since.strftime('%Y-%m-%dT%H:%M:%S')})")
+    if threshold:
+        lines.append(f"| where isempty(createdAt) or todatetime(createdAt) >= "
+                     f"datetime({threshold.strftime('%Y-%m-%dT%H:%M:%S')})")
+    lines += ["| extend rank = case(severity == 'High', 0, severity == 'Medium', 1,",
+              "                     severity == 'Low', 2, 3)",
+              "| order by rank asc",
+              "| project id = name,",
+              "          name = tostring(properties.displayName),",
+              "          category = coalesce(tostring(properties.metadata.category),",
+              "                              tostring(properties.metadata.categories[0]), 'Unknown'),",
+              "          severity = iff(isempty(severity), 'Low', severity),",
+              "          status,",
+              "          description = tostring(properties.metadata.description),",
+              "          createdAt,",
+              "          resourceId = tostring(properties.resourceDetails.Id),",
+              "          subscriptionId"]
+    return "\n".join(lines)
+
+
+async def query_resource_graph(query: str, scope: azure_scope.Scope = None,
+                               max_rows: int = 1000) -> List[Dict[str, Any]]:
+    """
+    Ejecuta una consulta KQL en Azure Resource Graph (tablas `resources`,
+    `securityresources`, `policyresources`, …) y devuelve sus filas.
+    Filtrar y proyectar en la propia consulta (`where`, `project`,
+    `summarize`) para traer sólo lo necesario.
+
+    Args:
+        query: Consulta KQL.
+        scope: Suscripción(es), "mg:<grupo>" o "all" (def. SUBSCRIPTION_ID).
+        max_rows: Máximo de filas devueltas (def. 1000).
+
+    Returns:
+        Lista de filas (dict por fila).
+    """
     try:
-        sub_rsp = requests.get(sub_url, headers=hdr, timeout=30)
-        if sub_rsp.status_code == 200:
-            for s in sub_rsp.json().get("value", []):
-                rid = s.get("properties", {}).get("resourceDetails", {}).get("id", "")
-                rtype = "Unknown"
-                parts = rid.split("/")
-                if len(parts) > 7:
-                    rtype = f"{parts[6]}/{parts[7]}"
-                affected.append({
-                    "resourceId": rid,
-                    "resourceType": rtype,
-                    "status": s.get("properties", {}).get("status", {}).get("code", "Unknown")
-                })
-    except Exception:
-        pass  # seguimos sin recursos
-
+        return [row async for row in resource_graph.query(
+            query, max_rows=max_rows, **await azure_scope.graph_scope(scope))]
+    except httpx.HTTPStatusError as e:
+        print(f"Error en la consulta de Resource Graph: {e.response.text[:500]}")
+        return []
+
+
+async def list_posture_recommendations(date_filter: str | None = None,
+                                       severity: Optional[List[str]] = None,
+                                       status: Optional[List[str]] = None,
+                                       max_results: Optional[int] = None,
+                                       scope: azure_scope.Scope = None
+                                       ) -> List[Dict[str, Any]]:
+    """
+    Lista recomendaciones fallidas, ordenadas por severidad (High→Low).
+    El filtrado (estado, severidad, fecha), la proyección y el orden se
+    hacen en Resource Graph sobre `securityresources`.
+
+    Args:
+        date_filter: 'today', 'last week', 'last 30 days'… (opcional).
+        severity: p.ej. ["High", "Medium"] (opcional).
+        status: p.ej. ["Unhealthy"] (def. todo menos Healthy).
+        max_results: Máximo de recomendaciones (opcional).
+        scope: Suscripción(es), "mg:<grupo>" o "all" (def. SUBSCRIPTION_ID);
+            Resource Graph cubre todo el alcance en la misma consulta.
+    """
+    kql = _recommendations_kql(parse_date_filter(date_filter),
+                               severity, status)
+    return [row async for row in resource_graph.query(
+        kql, max_rows=max_results, **await azure_scope.graph_scope(scope))]
+
+
+def _resource_type(resource_id: str) -> str:
+    parts = resource_id.split("/")
+    return f"{parts[6]}/{parts[7]}" if len(parts) > 7 else "Unknown"
+
+
+def _assessment_fields(ass: Dict[str, Any]) -> Dict[str, Any]:
     meta = ass.get("properties", {}).get("metadata", {})
     return {
         "id":   ass.get("name"),
@@ -204,5 +216,307 @@ def get_detailed_recommendation(recommendation_id: str) -> Dict[str, Any]:
         "description": meta.get("description", ""),
         "remediation": meta.get("remediationDescription", ""),
         "createdAt":   ass.get("properties", {}).get("timeGenerated", ""),
-        "affectedResources": affected
     }
+
+
+async def _affected_resources(sub: str, recommendation_id: str) -> AsyncIterator[Dict[str, str]]:
+    """Recursos afectados (sub‑assessments), siguiendo `nextLink`.  Un 404
+    significa que la recomendación no tiene sub‑assessments."""
+    url = (f"/subscriptions/{sub}"
+           f"/providers/Microsoft.Security/assessments/{recommendation_id}/subassessments")
+    try:
+        async for s in arm_client.paginate(url, params={"api-version": "2019-01-01-preview"}):
+            rid = s.get("properties", {}).get("resourceDetails", {}).get("id", "")
+            yield {
+                "resourceId": rid,
+                "resourceType": _resource_type(rid),
+                "status": s.get("properties", {}).get("status", {}).get("code", "Unknown")
+            }
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code != 404:
+            raise
+
+
+async def get_detailed_recommendation(recommendation_id: str) -> Dict[str, Any]:
+    """Devuelve detalles + recursos afectados para la recomendación dada."""
+    _, _, _, sub = _azure_env()
+
+    ass_url = (f"/subscriptions/{sub}"
+               f"/providers/Microsoft.Security/assessments/{recommendation_id}")
+    ass = await arm_client.get_json(ass_url, params={"api-version": "2020-01-01"})
+
+    # sub‑assessments (recursos afectados)
+    affected: List[Dict[str, str]] = []
+    result = _assessment_fields(ass)
+    try:
+        async for res in _affected_resources(sub, recommendation_id):
+            affected.append(res)
+    except httpx.HTTPError as e:
+        result["affectedResourcesError"] = str(e).splitlines()[0]
+    result["affectedResources"] = affected
+    return result
+
+
+async def _aggregated_detail(sub: str, recommendation_id: str,
+                             sample_size: int) -> Dict[str, Any]:
+    ass_url = (f"/subscriptions/{sub}"
+               f"/providers/Microsoft.Security/assessments/{recommendation_id}")
+
+    async def _groups() -> Dict[tuple, Dict[str, Any]]:
+        groups: Dict[tuple, Dict[str, Any]] = {}
+        async for res in _affected_resources(sub, recommendation_id):
+            g = groups.setdefault((res["resourceType"], res["status"]),
+                                  {"resourceType": res["resourceType"],
+                                   "status": res["status"], "count": 0, "sample": []})
+            g["count"] += 1
+            if len(g["sample"]) < sample_size:
+                g["sample"].append(res["resourceId"])
+        return groups
+
+    groups_task = asyncio.create_task(_groups())
+    try:
+        ass    = await arm_client.get_json(ass_url, params={"api-version": "2020-01-01"})
+        groups = await groups_task
+    except BaseException:
+        groups_task.cancel()                          # si falla el assessment, no sigue paginando
+        await asyncio.gather(groups_task, return_exceptions=True)
+        raise
+    by_type = sorted(groups.values(), key=lambda g: g["count"], reverse=True)
+    return {**_assessment_fields(ass), "subscriptionId": sub,
+            "affected": {"total": sum(g["count"] for g in by_type), "byTypeAndStatus": by_type}}
+
+
+async def get_recommendation_details(recommendations: List[Union[str, Dict[str, Any]]],
+                                     sample_size: int = 5,
+                                     max_concurrency: int = 8) -> Dict[str, Any]:
+    """
+    Detalle de muchas recomendaciones en una sola llamada: cada assessment
+    y todas las páginas de sus sub‑assessments se piden en paralelo, y los
+    recursos afectados se resumen por tipo y estado (nº + muestra) en vez
+    de listarse enteros.
+
+    Args:
+        recommendations: IDs de recomendación, o directamente las filas de
+            `list_posture_recommendations` (usa su `subscriptionId`).
+        sample_size: IDs de recurso de muestra por grupo (def. 5).
+        max_concurrency: Recomendaciones en paralelo (def. 8).
+
+    Returns:
+        {"results": [detalle con "affected": {total, byTypeAndStatus}],
+         "errors": [{subscription, id, error}]}  (el mismo ID puede fallar
+        en una suscripción y no en otra)
+    """
+    results: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Optional[str]]] = []
+    targets: Dict[tuple, None] = {}                   # (sub, id) sin repetir, en orden
+    for item in recommendations:
+        rid = item if isinstance(item, str) else item.get("id", "")
+        sub = None if isinstance(item, str) else item.get("subscriptionId")
+        try:
+            targets.setdefault((sub or _azure_env()[3], rid))
+        except EnvironmentError as e:
+            errors.append({"subscription": sub, "id": rid, "error": str(e)})
+
+    sem = asyncio.Semaphore(max_concurrency)
+
+    async def _one(sub: str, rid: str):
+        async with sem:
+            try:
+                return sub, rid, await _aggregated_detail(sub, rid, sample_size)
+            except httpx.HTTPError as e:
+                return sub, rid, e
+
+    tasks = [asyncio.create_task(_one(sub, rid)) for sub, rid in targets]
+    try:
+        done = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:                            # un fallo inesperado no deja nada colgando
+            task.cancel()
+    for sub, rid, res in done:
+        if isinstance(res, Exception):
+            errors.append({"subscription": sub, "id": rid,
+                           "error": str(res).splitlines()[0] if str(res) else type(res).__name__})
+        else:
+            results.append(res)
+    order = {"High": 0, "Medium": 1, "Low": 2}
+    results.sort(key=lambda r: (order.get(r["severity"], 3), -r["affected"]["total"]))
+    return {"results": results, "errors": errors}
+
+
+# ──────────────────────────────────────────────────────────────────────
+# histórico (posture_store)
+# ──────────────────────────────────────────────────────────────────────
+async def _score_controls(sub: str) -> List[Dict[str, Any]]:
+    url = f"/subscriptions/{sub}/providers/Microsoft.Security/secureScoreControls"
+    controls = []
+    async for c in arm_client.paginate(url, params={"api-version": "2020-01-01"}):
+        props = c.get("properties", {})
+        score = props.get("score", {})
+        controls.append({"control": props.get("displayName") or c.get("name"),
+                         "current": score.get("current"), "max": score.get("max"),
+                         "pct": round((score.get("percentage") or 0) * 100, 2),
+                         "healthy": props.get("healthyResourceCount"),
+                         "unhealthy": props.get("unhealthyResourceCount"),
+                         "notApplicable": props.get("notApplicableResourceCount")})
+    return controls
+
+
+async def record_posture_snapshot(scope: azure_scope.Scope = None, max_concurrency: int = 8,
+                                  timeout: float = 120.0) -> Dict[str, Any]:
+    """
+    Guarda en el histórico local (`posture_store`) el Secure Score, los
+    controles y las recomendaciones abiertas (Unhealthy) de cada suscripción.
+    Las recomendaciones salen de una sola consulta de Resource Graph; score
+    y controles se piden por suscripción en paralelo.
+
+    Returns:
+        {"saved": [{subscription_id, taken_at, findings}], "errors": {...}, …}
+    """
+    subs = await azure_scope.resolve_subscriptions(scope)
+    by_sub: Dict[str, List[Dict[str, Any]]] = {s.lower(): [] for s in subs}
+    async for row in resource_graph.query(_recommendations_kql(None, None, ["Unhealthy"]),
+                                          subscriptions=subs):
+        by_sub.setdefault((row.get("subscriptionId") or "").lower(), []).append(row)
+
+    async def _capture(sub: str):
+        return await asyncio.gather(_secure_score(sub), _score_controls(sub))
+
+    saved, errors = [], {}
+    async for sub, res in azure_scope.fan_out(subs, _capture, max_concurrency, timeout):
+        if isinstance(res, Exception):
+            errors[sub] = res
+            continue
+        score, controls = res
+        info = posture_store.save_snapshot(sub, score, controls, by_sub.get(sub.lower(), []))
+        saved.append({k: info[k] for k in ("subscription_id", "taken_at", "findings")})
+    return {"saved": saved, **azure_scope.partial_summary(errors, len(subs))}
+
+
+def get_score_trend(days: int = 30, subscription_id: Optional[str] = None) -> Dict[str, Any]:
+    """Secure Score guardado de los últimos `days` días, por suscripción (sin red)."""
+    return posture_store.score_trend(days, subscription_id)
+
+
+def get_control_trend(control: str, days: int = 30,
+                      subscription_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Evolución guardada de un control del Secure Score (sin red)."""
+    return posture_store.control_trend(control, days, subscription_id)
+
+
+def get_new_findings(date_filter: str = "this week", severity: Optional[List[str]] = None,
+                     subscription_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Hallazgos abiertos desde `date_filter` ('today', 'this week',
+    'last 30 days'…), nuevos o reabiertos, que siguen abiertos en el
+    último snapshot (sin red).
+
+    Args:
+        severity: p.ej. ["High"] (def. todas).
+    """
+    threshold = parse_date_filter(date_filter) or datetime(1970, 1, 1)
+    since = threshold.replace(tzinfo=timezone.utc).timestamp()
+    return posture_store.new_findings(since, severity, subscription_id)
+
+
+_DELTA_MARGIN_S = 300             # solape con la sync anterior (retraso de indexación de ARG)
+_DELTA_LIST_MAX = 200
+_FINDING_FIELDS = ("id", "name", "category", "severity", "resourceId", "status")
+
+
+def _deleted_resources_kql(since: datetime) -> str:
+    return "\n".join([
+        "resourcechanges",
+        "| extend changeType = tostring(properties.changeType),",
+        "         changeTime = todatetime(properties.changeAttributes.timestamp),",
+        "         targetId = tolower(tostring(properties.targetResourceId))",
+        "| where changeType == 'Delete'",
+        f"| where changeTime >= datetime({since.strftime('%Y-%m-%dT%H:%M:%S')})",
+        "| project targetId"])
+
+
+def _apply_delta(sub: str, state: Dict[str, Dict[str, Any]], rows: List[Dict[str, Any]],
+                 deleted: set) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Aplica los cambios de estado a `state` (in situ) y devuelve el diff.
+    Como en `record_posture_snapshot`, sólo Unhealthy es un hallazgo
+    abierto: pasar a Healthy o a NotApplicable lo resuelve.
+    """
+    added, resolved, changed = [], [], []
+    for row in rows:
+        key  = posture_store.finding_key(sub, row)
+        prev = state.get(key)
+        if row.get("status") == "Unhealthy":
+            cur = {k: row.get(k) for k in _FINDING_FIELDS}
+            if prev is None:
+                added.append(cur)
+            elif prev.get("severity") != cur["severity"] or prev.get("status") != cur["status"]:
+                changed.append({**cur, "before": {"severity": prev.get("severity"),
+                                                  "status": prev.get("status")}})
+            state[key] = cur
+        elif prev is not None:
+            resolved.append({**prev, "status": row.get("status") or "Unknown"})
+            del state[key]
+    for key, finding in list(state.items()):
+        if (finding.get("resourceId") or "").lower() in deleted:
+            resolved.append({**finding, "status": "ResourceDeleted"})
+            del state[key]
+    return {"added": added, "resolved": resolved, "changed": changed}
+
+
+async def refresh_posture(scope: azure_scope.Scope = None, max_concurrency: int = 8,
+                          timeout: float = 120.0) -> Dict[str, Any]:
+    """
+    Refresco incremental del histórico: para cada suscripción con snapshot
+    previo sólo se traen los assessments cuyo estado cambió desde entonces
+    (`statusChangeDate` en Resource Graph) y los recursos borrados
+    (`resourcechanges`), se aplica el delta al último estado guardado y se
+    guarda un snapshot nuevo.  Las suscripciones sin snapshot se capturan
+    completas con `record_posture_snapshot`.
+
+    Returns:
+        {"deltas": [{subscription_id, since, counts, added, resolved, changed}],
+         "full": [...], "errors": {...}, …}
+    """
+    subs = await azure_scope.resolve_subscriptions(scope)
+    last = {s: posture_store.last_snapshot(s) for s in subs}
+    full = [s for s in subs if not last[s]]
+    incr = [s for s in subs if last[s]]
+    errors: Dict[str, Exception] = {}
+    result: Dict[str, Any] = {"deltas": [], "full": []}
+
+    if full:
+        captured = await record_posture_snapshot(full, max_concurrency, timeout)
+        result["full"] = captured["saved"]
+        errors.update({s: Exception(msg) for s, msg in captured["errors"].items()})
+
+    if incr:
+        since = datetime.fromtimestamp(min(last[s]["taken_at"] for s in incr) - _DELTA_MARGIN_S,
+                                       timezone.utc).replace(tzinfo=None)
+        rows_by_sub: Dict[str, List[Dict[str, Any]]] = {}
+        async for row in resource_graph.query(
+                _recommendations_kql(None, None, list(_STATUSES), changed_since=since),
+                subscriptions=incr):
+            rows_by_sub.setdefault((row.get("subscriptionId") or "").lower(), []).append(row)
+        deleted = {row["targetId"] async for row in resource_graph.query(
+                       _deleted_resources_kql(since), subscriptions=incr)}
+
+        async def _capture(sub: str):
+            return await asyncio.gather(_secure_score(sub), _score_controls(sub))
+
+        async for sub, res in azure_scope.fan_out(incr, _capture, max_concurrency, timeout):
+            if isinstance(res, Exception):
+                errors[sub] = res
+                continue
+            score, controls = res
+            state = posture_store.latest_findings(sub)
+            delta = _apply_delta(sub, state, rows_by_sub.get(sub.lower(), []), deleted)
+            posture_store.save_snapshot(sub, score, controls, state.values())
+            result["deltas"].append({
+                "subscription_id": sub,
+                "since": datetime.fromtimestamp(last[sub]["taken_at"], timezone.utc)
+                                 .isoformat(timespec="seconds"),
+                "score": {"before": last[sub]["percentageScore"],
+                          "after": score["percentageScore"]},
+                "counts": {k: len(v) for k, v in delta.items()},
+                **{k: v[:_DELTA_LIST_MAX] for k, v in delta.items()}})
+    return {**result, **azure_scope.partial_summary(errors, len(subs))}
@@ -0,0 +1,88 @@
+"""
+resource_graph.py
+────────────────────────────────────────────────────────────────────────
+Consultas KQL a Azure Resource Graph a través de `arm_client`.
+
+El filtrado, la proyección y el orden se hacen en el servidor; las
+páginas se piden con `$skipToken` y se generan fila a fila, pidiendo la
+siguiente mientras se consume la actual.
+
+• query()                   – genera las filas de una consulta KQL
+• kql_string()              – literal de cadena KQL escapado
+────────────────────────────────────────────────────────────────────────
+"""
+from __future__ import annotations
+import asyncio
+from typing import Dict, List, Any, AsyncIterator, Optional
+
+from tools import arm_client
+
+_URL = "/providers/Microsoft.ResourceGraph/resources"
+_API_VERSION = "2022-10-01"
+_MAX_PAGE = 1000                                   # tope de $top del servicio
+
+
+def kql_string(value: str) -> str:
+    """'texto' para KQL con comillas y barras escapadas."""
+    return "'" + str(value).replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+async def _page(body: Dict[str, Any]) -> Dict[str, Any]:
+    rsp = await arm_client.request("POST", _URL, params={"api-version": _API_VERSION},
+                                   json=body)
+    rsp.raise_for_status()
+    return rsp.json()
+
+
+async def query(kql: str, subscriptions: Optional[List[str]] = None,
+                management_groups: Optional[List[str]] = None,
+                page_size: int = _MAX_PAGE,
+                max_rows: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Ejecuta `kql` y genera sus filas (objectArray) siguiendo `$skipToken`.
+
+    Args:
+        kql: Consulta KQL (tablas resources, securityresources, …).
+        subscriptions: Suscripciones a consultar (opcional).
+        management_groups: Grupos de administración (opcional).  Sin ninguno
+            de los dos (None), todas las suscripciones accesibles; una lista
+            vacía no genera filas ni consulta nada.
+        page_size: Filas por página (máx. 1000).
+        max_rows: Deja de pedir páginas al llegar a este nº de filas.
+    """
+    if subscriptions == [] or management_groups == []:
+        return
+    body: Dict[str, Any] = {"query": kql,
+                            "options": {"resultFormat": "objectArray",
+                                        "$top": min(page_size, _MAX_PAGE)}}
+    if subscriptions:
+        body["subscriptions"] = subscriptions
+    if management_groups:
+        body["managementGroups"] = management_groups
+
+    page    = await _page(body)
+    emitted = 0
+    while True:
+        token = page.get("$skipToken")
+        if max_rows is not None and emitted + len(page.get("data", [])) >= max_rows:
+            token = None
+        task = None
+        if token:
+            nxt  = {**body, "options": {**body["options"], "$skipToken": token}}
+            task = asyncio.create_task(_page(nxt))
+
+        consumed = False
+        try:
+            for row in page.get("data", []):
+                if max_rows is not None and emitted >= max_rows:
+                    break
+                emitted += 1
+                yield row
+            consumed = True
+        finally:
+            if task and not consumed:
+                task.cancel()
+
+        if task is None:
+            return
+        page = await task